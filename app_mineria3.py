@@ -3,40 +3,51 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import copy
+import io
+import os
+import uuid
+from mineria.block_model import BlockModel, optimal_cutoff
+from mineria.cache import CachedModel
+from mineria.excel_io import export_scenario_book, import_scenario_book, write_template
+from mineria.charts import (BAR_LIMIT, COMPARISON_FORMAT, COMPARISON_VIEWS, VIEW_BARS, build_comparison_frame, build_comparison_view,
+                            build_op_costs_pie, build_waterfall, comparison_view_key, resolve_comparison_view)
+from mineria.fleet_opt import FleetOptimizer
+from mineria.goal_seek import OUTPUT_LABELS, OUTPUTS, goal_seek
+from mineria.jobs import STATUS_LABELS, JobRunner
+from mineria.haulage_des import des_adjusted_inputs, des_params_from_inputs, run_replications
+from mineria.lom import EDITABLE_COLUMNS, LifeOfMine
+from mineria.model import DEFAULT_INPUTS, PARAM_LABELS, PARAM_NAMES, inputs_hash
+from mineria.store import ScenarioStore, scenario_record
+from mineria.montecarlo import MC_VARIABLES, run_monte_carlo
+from mineria.profiling import RerunProfiler
+from mineria.sensitivity import sensitivities, spider, tornado
 
 # --- Configuración de Página ---
 st.set_page_config(layout="wide", page_title="Simulador Minero Detallado+")
 
 # --- Inicializar Session State ---
 default_states = {
-    'mining_scenarios_detailed': [],
     'run_counter_detailed': 0,
-    # Targets
-    'tonnes_mined_target': 120000,
-    'strip_ratio': 3.0,
-    'plant_feed_target': 100000,
-    # --- NUEVO: Voladura ---
-    'tonnes_blasted_period': 480000, # Ejemplo: (Ore + Waste) = 120k * (1+3)
-    'load_factor_kg_t': 0.35, # kg de explosivo por tonelada volada
-    'explosive_cost_usd_kg': 1.20, # $/kg de explosivo
-    # Flota
-    'truck_count': 10, 'truck_op_hours_period': 6000, 'truck_payload': 100, 'avg_cycle_time_min': 30.0,
-    'loader_count': 3, 'loader_op_hours_period': 1800, 'loader_rate_tph': 500,
-    # Planta
-    'plant_op_hours_period': 650, 'plant_throughput_tph': 160,
-    # Metalurgia y Mercado
-    'grade_pct': 1.0, 'recovery_pct': 85.0, 'metal_price': 3.50, 'exchange_rate': 1.0,
-    # Costos Unitarios y Fijos
-    # --- AJUSTADO: Costo P&V ahora es solo Perforación y Accesorios ---
-    'cost_drill_acc_per_t_blasted': 0.80, # $/tonelada VOLADA (sin explosivo)
-    'cost_load_per_hr': 250.0, 'cost_haul_per_hr': 300.0, 'cost_process_per_hr': 5000.0,
-    'cost_maint_fixed': 200000.0, 'cost_ga_fixed': 300000.0,
+    # Inputs del escenario (Targets, Voladura, Flota, Planta, Metalurgia, Costos)
+    **DEFAULT_INPUTS,
+    # Monte Carlo
+    'mc_result': None,
+    'mc_result_key': None,  # (hash de inputs, distribuciones, correlaciones) con que se calculó mc_result
+    # Simulación de acarreo
+    'des_result': None,
+    'des_result_params': None,  # parámetros de la simulación que produjo des_result
+    # Identificador de la sesión: dueña de sus escenarios guardados y de sus trabajos en segundo plano
+    'session_id': uuid.uuid4().hex,
+    # Aviso pendiente del panel de trabajos
+    'jobs_notice': None,
 }
 for key, default_value in default_states.items():
     if key not in st.session_state:
         st.session_state[key] = default_value
 
+# --- Diagnóstico de Rendimiento (activado desde la barra lateral; sin costo si está apagado) ---
+profiler = RerunProfiler(enabled=st.session_state.get('debug_profile', False))
+
 # --- Título y Descripción ---
 st.title("⛏️ Simulador Minero Detallado+ (v4.2 - Voladura)")
 st.markdown("""
@@ -44,138 +55,107 @@ Simula resultados financieros y operativos incluyendo costos detallados de **Per
 Ajuste parámetros y observe el impacto en costos, KPIs y rentabilidad.
 """)
 
-# --- Modelo de Cálculo Detallado (MODIFICADO) ---
-def calculate_detailed_metrics(
-    # Targets
-    tonnes_mined_target, strip_ratio, plant_feed_target,
-    # === NUEVO: Voladura ===
-    tonnes_blasted_period, load_factor_kg_t, explosive_cost_usd_kg,
-    # Flota Carga/Acarreo
-    truck_count, truck_op_hours_period, truck_payload, avg_cycle_time_min,
-    loader_count, loader_op_hours_period, loader_rate_tph,
-    # Planta
-    plant_op_hours_period, plant_throughput_tph,
-    # Metalurgia y Mercado
-    grade_pct, recovery_pct, metal_price, exchange_rate,
-    # Costos Unitarios y Fijos
-    # === AJUSTADO ===
-    cost_drill_acc_per_t_blasted, # Costo Perforación y Accesorios por ton volada
-    cost_load_per_hr, cost_haul_per_hr, cost_process_per_hr,
-    cost_maint_fixed, cost_ga_fixed):
-    """Calcula métricas financieras y operativas desde parámetros detallados."""
-    results = {}
-    kpis = {}
-    errors = []
-    warnings = []
-
-    # --- Validaciones Básicas ---
-    # ... (validaciones anteriores) ...
-    if tonnes_blasted_period <= 0: errors.append("Toneladas Voladas debe ser > 0")
-    if load_factor_kg_t <= 0: errors.append("Factor Carga Explosivo debe ser > 0")
-    if explosive_cost_usd_kg < 0: errors.append("Costo Explosivo no puede ser negativo")
-    if cost_drill_acc_per_t_blasted < 0: errors.append("Costo Perf.&Acc. no puede ser negativo")
-    # ... (resto de validaciones) ...
-    if tonnes_mined_target <= 0: errors.append("Target Toneladas Minadas debe ser > 0")
-    if strip_ratio < 0: errors.append("Strip Ratio no puede ser negativo")
-    if plant_feed_target <= 0: errors.append("Target Alimentación Planta debe ser > 0")
-    if avg_cycle_time_min <= 0: errors.append("Tiempo Ciclo Camión debe ser > 0")
-    #... (añadir más validaciones si es necesario)
-
-    if errors: return None, None, errors, warnings
-    try:
-        # --- Cálculos de Productividad y Capacidad (sin cambios) ---
-        total_loader_hours_avail = loader_count * loader_op_hours_period
-        potential_tonnes_loaded = total_loader_hours_avail * loader_rate_tph
-        kpis['potential_tonnes_loaded'] = potential_tonnes_loaded; kpis['total_loader_hours_avail'] = total_loader_hours_avail
-        total_truck_hours_avail = truck_count * truck_op_hours_period
-        trips_per_truck_hour = 60.0 / avg_cycle_time_min
-        potential_tonnes_hauled_per_truck_hour = trips_per_truck_hour * truck_payload
-        potential_tonnes_hauled = total_truck_hours_avail * potential_tonnes_hauled_per_truck_hour
-        kpis['potential_tonnes_hauled'] = potential_tonnes_hauled; kpis['total_truck_hours_avail'] = total_truck_hours_avail; kpis['trips_per_truck_hour'] = trips_per_truck_hour; kpis['potential_tph_per_truck'] = potential_tonnes_hauled_per_truck_hour
-        potential_tonnes_processed = plant_op_hours_period * plant_throughput_tph
-        kpis['potential_tonnes_processed'] = potential_tonnes_processed; kpis['plant_op_hours_period'] = plant_op_hours_period
-
-        # --- Determinación de Toneladas Reales (sin cambios) ---
-        actual_tonnes_mined = tonnes_mined_target
-        actual_waste_moved = actual_tonnes_mined * strip_ratio
-        actual_total_material_moved = actual_tonnes_mined + actual_waste_moved
-        actual_tonnes_processed = plant_feed_target
-
-        # --- Advertencias de Capacidad (sin cambios) ---
-        if actual_total_material_moved > potential_tonnes_loaded: warnings.append(f"Movido ({actual_total_material_moved:,.0f}t) > Cap. Carga ({potential_tonnes_loaded:,.0f}t)")
-        if actual_total_material_moved > potential_tonnes_hauled: warnings.append(f"Movido ({actual_total_material_moved:,.0f}t) > Cap. Acarreo ({potential_tonnes_hauled:,.0f}t)")
-        if actual_tonnes_processed > potential_tonnes_processed: warnings.append(f"Procesado ({actual_tonnes_processed:,.0f}t) > Cap. Proceso ({potential_tonnes_processed:,.0f}t)")
-        # Advertencia si las toneladas voladas no coinciden con el material movido target
-        # (Puede ser intencional si hay cambios de inventario en cancha)
-        if not np.isclose(tonnes_blasted_period, actual_total_material_moved):
-             warnings.append(f"Toneladas Voladas ({tonnes_blasted_period:,.0f}t) != Material Movido Target ({actual_total_material_moved:,.0f}t)")
-
-
-        # === MODIFICADO: Cálculos de Costos por Área ===
-
-        # --- Costo Perforación y Voladura Detallado ---
-        # 1. Costo Explosivos
-        total_explosive_kg = tonnes_blasted_period * load_factor_kg_t
-        cost_explosives_total = total_explosive_kg * explosive_cost_usd_kg
-        results['cost_explosives'] = cost_explosives_total
-        kpis['total_explosive_kg'] = total_explosive_kg
-
-        # 2. Costo Perforación y Accesorios (basado en ton voladas)
-        cost_drill_acc_total = tonnes_blasted_period * cost_drill_acc_per_t_blasted
-        results['cost_drill_accessories'] = cost_drill_acc_total
-
-        # 3. Costo Total P&V
-        cost_pv_total = cost_explosives_total + cost_drill_acc_total
-        results['cost_drill_blast_total'] = cost_pv_total # Renombrado para claridad interna
-
-        # --- Costo Carga, Acarreo, Proceso (sin cambios en la lógica) ---
-        required_loader_hours = actual_total_material_moved / (loader_rate_tph * loader_count) if (loader_rate_tph * loader_count) > 0 else float('inf')
-        actual_loader_hours_used = min(required_loader_hours, total_loader_hours_avail)
-        if required_loader_hours > total_loader_hours_avail: warnings.append("Hr carga req > disp.")
-        cost_load_total = actual_loader_hours_used * cost_load_per_hr; results['cost_loading'] = cost_load_total; kpis['actual_loader_hours_used'] = actual_loader_hours_used
-
-        required_truck_hours = actual_total_material_moved / (potential_tonnes_hauled_per_truck_hour * truck_count) if (potential_tonnes_hauled_per_truck_hour * truck_count) > 0 else float('inf')
-        actual_truck_hours_used = min(required_truck_hours, total_truck_hours_avail)
-        if required_truck_hours > total_truck_hours_avail: warnings.append("Hr acarreo req > disp.")
-        cost_haul_total = actual_truck_hours_used * cost_haul_per_hr; results['cost_hauling'] = cost_haul_total; kpis['actual_truck_hours_used'] = actual_truck_hours_used
-
-        required_plant_hours = actual_tonnes_processed / plant_throughput_tph if plant_throughput_tph > 0 else float('inf')
-        actual_plant_hours_used = min(required_plant_hours, plant_op_hours_period)
-        if required_plant_hours > plant_op_hours_period: warnings.append("Hr planta req > disp.")
-        cost_process_total = actual_plant_hours_used * cost_process_per_hr; results['cost_processing'] = cost_process_total; kpis['actual_plant_hours_used'] = actual_plant_hours_used
-
-        # --- Costos Fijos (sin cambios) ---
-        results['cost_maintenance_fixed'] = cost_maint_fixed
-        results['cost_ga_fixed'] = cost_ga_fixed
-
-        # --- Costo Total y Unitarios (usando nuevo costo P&V) ---
-        total_operational_cost = cost_pv_total + cost_load_total + cost_haul_total + cost_process_total # Modificado
-        total_cost = total_operational_cost + cost_maint_fixed + cost_ga_fixed
-        results['total_operational_cost'] = total_operational_cost
-        results['total_cost'] = total_cost
-        results['cost_per_tonne_mined'] = total_cost / actual_tonnes_mined if actual_tonnes_mined else 0
-        results['cost_per_tonne_processed'] = total_cost / actual_tonnes_processed if actual_tonnes_processed else 0
-        kpis['cost_per_total_tonne_moved'] = total_cost / actual_total_material_moved if actual_total_material_moved else 0
-
-        # --- Ingresos y Rentabilidad (sin cambios) ---
-        grade_decimal = grade_pct / 100.0; recovery_decimal = recovery_pct / 100.0
-        metal_produced_units = actual_tonnes_processed * grade_decimal * recovery_decimal
-        revenue = metal_produced_units * metal_price / exchange_rate
-        results['revenue'] = revenue; results['metal_produced_units'] = metal_produced_units
-        operating_profit = revenue - total_cost
-        results['operating_profit'] = operating_profit
-        results['profit_per_tonne_processed'] = operating_profit / actual_tonnes_processed if actual_tonnes_processed else 0
-
-        # --- KPIs Operativos Adicionales (sin cambios) ---
-        kpis['actual_tonnes_per_truck_hr'] = actual_total_material_moved / actual_truck_hours_used if actual_truck_hours_used > 0 else 0
-        kpis['actual_tonnes_per_loader_hr'] = actual_total_material_moved / actual_loader_hours_used if actual_loader_hours_used > 0 else 0
-        kpis['actual_tph_plant'] = actual_tonnes_processed / actual_plant_hours_used if actual_plant_hours_used > 0 else 0
-
-        return results, kpis, errors, warnings
-
-    except Exception as e:
-        return None, None, [f"Error inesperado en cálculo: {e}"], warnings
-
+# --- Modelo de Cálculo Detallado (en mineria/model.py) ---
+
+# --- Almacén de Escenarios (compartido entre sesiones, persistente en disco) ---
+@st.cache_resource
+def get_scenario_store():
+    return ScenarioStore(os.environ.get('MINERIA_STORE_PATH', 'escenarios_mineria.sqlite'))
+
+# --- Cola de Trabajos en Segundo Plano (un pool de procesos por servidor, compartido entre sesiones) ---
+@st.cache_resource
+def get_job_runner():
+    return JobRunner()
+
+def render_jobs_panel(polling):
+    """Lista de trabajos de la sesión con progreso, parciales y acciones (se re-ejecuta sola mientras haya trabajos en curso)."""
+    runner = get_job_runner()
+    jobs = runner.jobs(st.session_state.session_id)
+    if st.session_state.jobs_notice:
+        st.success(st.session_state.jobs_notice); st.session_state.jobs_notice = None
+    if not jobs:
+        st.caption("No hay trabajos enviados desde esta sesión.")
+    for job in jobs:
+        with st.container(border=True):
+            job_c1, job_c2 = st.columns([4, 1])
+            shared = f" · compartido por {len(job.owners)} sesiones" if len(job.owners) > 1 else ""
+            job_c1.markdown(f"**{job.label}** · {STATUS_LABELS[job.status]} · {job.elapsed:,.1f} s{shared}")
+            if job.status == 'running': job_c1.progress(job.progress, text=f"{job.done}/{job.total} bloques")
+            if job.status == 'failed': job_c1.error(job.error)
+            if job_c2.button("✖️ Cancelar" if job.status == 'running' else "🗑️ Quitar", key=f"job_cancel_{job.id}"):
+                runner.cancel(job.id, st.session_state.session_id)
+                st.rerun()
+            job_result = job.partial()
+            if job_result is None: continue
+            if job.kind == 'montecarlo':
+                job_m1, job_m2, job_m3, job_m4 = st.columns(4)
+                job_m1.metric("Margen P10", f"$ {job_result['p10_operating_profit']:,.0f}")
+                job_m2.metric("Margen P50", f"$ {job_result['p50_operating_profit']:,.0f}")
+                job_m3.metric("Margen P90", f"$ {job_result['p90_operating_profit']:,.0f}")
+                job_m4.metric("Prob. de Pérdida", f"{job_result['prob_loss']:.1%}", help=f"{job_result['n_draws']:,} simulaciones")
+                if job.status == 'done' and job_c2.button("🎲 Ver en Monte Carlo", key=f"job_load_{job.id}"):
+                    st.session_state.mc_result = job_result
+                    st.session_state.mc_result_key = (inputs_hash(job.spec['base']), job.spec['distributions'], job.spec.get('correlations'))
+                    st.rerun()
+            else:
+                job_profit = job_result['columns']['operating_profit']
+                job_valid = job_result['computed'] & (job_result['error_mask'] == 0)
+                job_n = len(job_profit)
+                if job_valid.any():
+                    job_best = int(np.argmax(np.where(job_valid, job_profit, -np.inf)))
+                    job_best_at = ", ".join(f"{PARAM_LABELS[name]} = {values[i]:,.4g}" for (name, values), i
+                                            in zip(job_result['axes'], np.unravel_index(job_best, [len(v) for _n, v in job_result['axes']])))
+                    st.caption(f"{int(job_result['computed'].sum()):,} de {job_n:,} puntos calculados · mejor margen hasta ahora: $ {job_profit[job_best]:,.0f} ({job_best_at})")
+                if job.status == 'done':
+                    if job.saved: job_c2.caption(f"{job.saved:,} escenarios guardados")
+                    elif job_c2.button("💾 Guardar en Escenarios", key=f"job_save_{job.id}"):
+                        job_saved = runner.save_to_store(job.id, get_scenario_store(), owner=st.session_state.session_id)
+                        st.session_state.jobs_notice = f"{job_saved:,} escenarios del barrido guardados; aparecen en el análisis comparativo."
+                        st.rerun()
+                if st.checkbox("Ver gráfico", key=f"job_view_{job.id}"):
+                    with profiler.phase('figura:trabajo_barrido'):
+                        job_axes = job_result['axes']
+                        if len(job_axes) == 1:
+                            fig_job = go.Figure(go.Scatter(x=job_axes[0][1], y=job_profit, mode='lines'))
+                            fig_job.update_layout(xaxis_title=PARAM_LABELS[job_axes[0][0]], yaxis_title="Margen Operativo ($)")
+                        else:
+                            fig_job = go.Figure(go.Heatmap(x=job_axes[1][1], y=job_axes[0][1], z=job_profit.reshape(len(job_axes[0][1]), -1),
+                                                           colorbar=dict(title="Margen ($)")))
+                            fig_job.update_layout(xaxis_title=PARAM_LABELS[job_axes[1][0]], yaxis_title=PARAM_LABELS[job_axes[0][0]])
+                        fig_job.update_layout(title=f"Margen Operativo: {job.label}")
+                        st.plotly_chart(fig_job, use_container_width=True, key=f"job_fig_{job.id}")
+    # Al terminar el último trabajo se re-ejecuta la app completa (deja de refrescarse sola)
+    if polling and not any(job.status == 'running' for job in jobs): st.rerun()
+
+@st.cache_data
+def scenario_template_bytes():
+    """Plantilla Excel de importación (encabezados + escenario base)."""
+    buffer = io.BytesIO(); write_template(buffer)
+    return buffer.getvalue()
+
+def apply_fleet_solution(opt_result):
+    """Callback: copia la flota óptima a los widgets de la barra lateral."""
+    for state_key, widget_key in (('truck_count', 'fleet_truck_n'), ('loader_count', 'fleet_loader_n'), ('plant_op_hours_period', 'plant_hrs')):
+        st.session_state[state_key] = opt_result[state_key]
+        # Se descarta el estado del widget para que se re-cree con value=st.session_state[state_key]
+        st.session_state.pop(widget_key, None)
+
+def apply_cutoff_solution(best):
+    """Callback: lleva ley de cabeza, strip ratio y toneladas voladas de la ley de corte óptima a la barra lateral."""
+    strip = round(best['strip_ratio'], 2)  # voladas = movido con el strip ratio redondeado que verá el widget
+    values = {'grade_pct': min(round(best['head_grade_pct'], 2), 10.0), 'strip_ratio': strip,
+              'tonnes_blasted_period': int(round(st.session_state.tonnes_mined_target * (1.0 + strip)))}
+    for (state_key, value), widget_key in zip(values.items(), ('metal_grade', 'target_sr', 'blast_tonnes')):
+        st.session_state[state_key] = value
+        st.session_state.pop(widget_key, None)
+
+# --- Modelo de Bloques (índice ordenado persistido junto al archivo, abierto como memmap) ---
+@st.cache_resource
+def get_block_model(path, mtime, tonnage_col, grade_col, ore_col):
+    # mtime es parte de la clave: si el archivo cambia se vuelve a ingerir
+    return BlockModel.load(path, tonnage_col=tonnage_col, grade_col=grade_col, ore_col=ore_col)
+
+profiler.lap('inicio')
 
 # --- Barra Lateral de Inputs (AÑADIR NUEVOS INPUTS) ---
 st.sidebar.header("📉 Parámetros del Escenario Detallado")
@@ -233,20 +213,27 @@ with st.sidebar.expander("💰 Costos Unitarios y Fijos"):
     # Guardar estado
     st.session_state.cost_load_per_hr=cost_load_per_hr; st.session_state.cost_haul_per_hr=cost_haul_per_hr; st.session_state.cost_process_per_hr=cost_process_per_hr; st.session_state.cost_maint_fixed=cost_maint_fixed; st.session_state.cost_ga_fixed=cost_ga_fixed;
 
+profiler.lap('barra_lateral')
+
 # --- Ejecutar Cálculo ---
-results, kpis, errors, warnings = calculate_detailed_metrics(
-    tonnes_mined_target, strip_ratio, plant_feed_target,
-    # --- Pasar nuevos inputs ---
-    tonnes_blasted_period, load_factor_kg_t, explosive_cost_usd_kg,
-    truck_count, truck_op_hours_period, truck_payload, avg_cycle_time_min,
-    loader_count, loader_op_hours_period, loader_rate_tph,
-    plant_op_hours_period, plant_throughput_tph,
-    grade_pct, recovery_pct, metal_price, exchange_rate,
-    # --- Pasar costo Perf&Acc ---
-    cost_drill_acc_per_t_blasted,
-    cost_load_per_hr, cost_haul_per_hr, cost_process_per_hr,
-    cost_maint_fixed, cost_ga_fixed
-)
+# Inputs del escenario actual como dict (para la caché y los modos en lote / Monte Carlo)
+current_inputs = {
+    "tonnes_mined_target": tonnes_mined_target, "strip_ratio": strip_ratio, "plant_feed_target": plant_feed_target,
+    "tonnes_blasted_period": tonnes_blasted_period, "load_factor_kg_t": load_factor_kg_t, "explosive_cost_usd_kg": explosive_cost_usd_kg,
+    "truck_count": truck_count, "truck_op_hours_period": truck_op_hours_period, "truck_payload": truck_payload, "avg_cycle_time_min": avg_cycle_time_min,
+    "loader_count": loader_count, "loader_op_hours_period": loader_op_hours_period, "loader_rate_tph": loader_rate_tph,
+    "plant_op_hours_period": plant_op_hours_period, "plant_throughput_tph": plant_throughput_tph,
+    "grade_pct": grade_pct, "recovery_pct": recovery_pct, "metal_price": metal_price, "exchange_rate": exchange_rate,
+    "cost_drill_acc_per_t_blasted": cost_drill_acc_per_t_blasted,
+    "cost_load_per_hr": cost_load_per_hr, "cost_haul_per_hr": cost_haul_per_hr,
+    "cost_process_per_hr": cost_process_per_hr, "cost_maint_fixed": cost_maint_fixed, "cost_ga_fixed": cost_ga_fixed,
+}
+# Caché por sesión: solo se recalculan las secciones (y figuras) cuyos inputs cambiaron
+if 'model_cache' not in st.session_state:
+    st.session_state.model_cache = CachedModel(maxsize=128)
+model_cache = st.session_state.model_cache
+with profiler.phase('calculate_detailed_metrics'):
+    results, kpis, errors, warnings = model_cache.evaluate(current_inputs)
 
 # --- Mostrar Resultados y KPIs ---
 st.markdown("---")
@@ -273,24 +260,329 @@ elif results and kpis: # Solo mostrar si no hubo errores fatales
     with vcol1:
         st.subheader("Desglose Costos Operacionales")
         # === MODIFICADO: Incluir desglose P&V ===
-        cost_op_data = {
-            'Componente': ['Perf. & Acc.', 'Explosivos', 'Carga', 'Acarreo', 'Procesamiento'],
-            'Valor': [results.get('cost_drill_accessories', 0), results.get('cost_explosives', 0),
-                      results.get('cost_loading', 0), results.get('cost_hauling', 0),
-                      results.get('cost_processing', 0)]
-        }
+        op_cost_values = (results.get('cost_drill_accessories', 0), results.get('cost_explosives', 0),
+                          results.get('cost_loading', 0), results.get('cost_hauling', 0),
+                          results.get('cost_processing', 0))
         # === FIN MODIFICADO ===
-        df_op_costs = pd.DataFrame(cost_op_data).query("Valor > 0")
-        if not df_op_costs.empty:
-            fig_op_costs = px.pie(df_op_costs, values='Valor', names='Componente', title='Costos Operacionales Variables', hole=0.3)
-            fig_op_costs.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig_op_costs, use_container_width=True)
+        with profiler.phase('figura:torta_costos'):
+            fig_op_costs = model_cache.figure('op_costs_pie', op_cost_values, lambda: build_op_costs_pie(op_cost_values))
+            if fig_op_costs is not None:
+                st.plotly_chart(fig_op_costs, use_container_width=True)
 
     with vcol2:
         # (Cascada de rentabilidad - sin cambios)
         st.subheader("Cascada de Rentabilidad")
-        waterfall_data = {'Concepto': ['Ingresos', 'Costo Operacional', 'Costos Fijos (M&GA)', 'Margen Operativo'], 'Valor': [results.get('revenue', 0), -abs(results.get('total_operational_cost', 0)), -abs(results.get('cost_maintenance_fixed', 0) + results.get('cost_ga_fixed', 0)), results.get('operating_profit', 0)] }
-        df_waterfall = pd.DataFrame(waterfall_data); fig_waterfall = go.Figure(go.Waterfall(name="Rentabilidad", orientation="v", measure=["absolute", "relative", "relative", "total"], x=df_waterfall['Concepto'], y=df_waterfall['Valor'], textposition="outside", increasing={"marker": {"color": "green"}}, decreasing={"marker": {"color": "red"}}, totals={"marker": {"color": "blue"}} )); fig_waterfall.update_layout(title="Ingresos -> Margen Operativo", showlegend=False); st.plotly_chart(fig_waterfall, use_container_width=True)
+        waterfall_values = (results.get('revenue', 0), -abs(results.get('total_operational_cost', 0)), -abs(results.get('cost_maintenance_fixed', 0) + results.get('cost_ga_fixed', 0)), results.get('operating_profit', 0))
+        with profiler.phase('figura:cascada'):
+            fig_waterfall = model_cache.figure('waterfall', waterfall_values, lambda: build_waterfall(waterfall_values)); st.plotly_chart(fig_waterfall, use_container_width=True)
+    profiler.lap('resultados')
+
+    # --- NUEVO: Análisis de Riesgo Monte Carlo ---
+    st.markdown("---")
+    with st.expander("🎲 Análisis de Riesgo (Monte Carlo)"):
+        st.caption("Distribuciones triangulares (mín/moda/máx = valor actual ± %) para las variables inciertas. Precio y tipo de cambio pueden correlacionarse.")
+        # Un control de ± % por variable de MC_VARIABLES: (etiqueta, ± % por defecto, paso, key)
+        mc_spread_widgets = {'metal_price': ("± Precio Metal (%)", 20.0, 5.0, "mc_sp_price"), 'grade_pct': ("± Ley (%)", 10.0, 5.0, "mc_sp_grade"),
+                             'recovery_pct': ("± Recuperación (%)", 5.0, 1.0, "mc_sp_rec"), 'avg_cycle_time_min': ("± Tiempo Ciclo (%)", 15.0, 5.0, "mc_sp_cycle"),
+                             'load_factor_kg_t': ("± Factor Carga (%)", 10.0, 5.0, "mc_sp_lf"), 'exchange_rate': ("± Tipo de Cambio (%)", 5.0, 1.0, "mc_sp_fx")}
+        mc_cols = st.columns(3)
+        mc_spreads = {}
+        for mc_i, mc_name in enumerate(MC_VARIABLES):
+            mc_label, mc_value, mc_step, mc_key = mc_spread_widgets[mc_name]
+            mc_spreads[mc_name] = mc_cols[mc_i * len(mc_cols) // len(MC_VARIABLES)].number_input(mc_label, min_value=0.0, max_value=90.0, value=mc_value, step=mc_step, key=mc_key)
+        mc_col4, mc_col5 = st.columns(2)
+        mc_corr_price_fx = mc_col4.slider("Correlación Precio / Tipo de Cambio", min_value=-0.95, max_value=0.95, value=0.0, step=0.05, key="mc_corr")
+        mc_n_draws = mc_col5.select_slider("N° de Simulaciones", options=[10_000, 100_000, 1_000_000, 10_000_000], value=100_000, key="mc_n")
+
+        mc_distributions = {name: ('triangular', current_inputs[name] * (1 - sp / 100.0), current_inputs[name], current_inputs[name] * (1 + sp / 100.0))
+                            for name, sp in mc_spreads.items() if sp > 0}
+        mc_correlations = {('metal_price', 'exchange_rate'): mc_corr_price_fx} if mc_corr_price_fx and {'metal_price', 'exchange_rate'} <= set(mc_distributions) else None
+        mc_btn1, mc_btn2 = st.columns(2)
+        if mc_btn2.button("⏳ Ejecutar en Segundo Plano", key="mc_background"):
+            try:
+                get_job_runner().submit('montecarlo', {'base': current_inputs, 'distributions': mc_distributions, 'n_draws': mc_n_draws,
+                                                       'correlations': mc_correlations},
+                                        owner=st.session_state.session_id, label=f"Monte Carlo ({mc_n_draws:,} simulaciones)")
+                st.info("Trabajo enviado: el progreso se ve en '⏳ Trabajos en Segundo Plano'.")
+            except ValueError as e:
+                st.error(str(e))
+        if mc_btn1.button("▶️ Ejecutar Monte Carlo", key="mc_run"):
+            with st.spinner("Simulando..."):
+                try:
+                    st.session_state.mc_result = run_monte_carlo(current_inputs, mc_distributions, n_draws=mc_n_draws, correlations=mc_correlations)
+                    st.session_state.mc_result_key = (inputs_hash(current_inputs), mc_distributions, mc_correlations)
+                except ValueError as e:
+                    st.error(str(e))
+
+        mc_result = st.session_state.get('mc_result')
+        if mc_result:
+            if st.session_state.mc_result_key != (inputs_hash(current_inputs), mc_distributions, mc_correlations):
+                st.warning("Resultado calculado con otros inputs o rangos de incertidumbre: vuelva a ejecutar Monte Carlo para el escenario actual.")
+            mc_m1, mc_m2, mc_m3, mc_m4 = st.columns(4)
+            mc_m1.metric("Margen P10", f"$ {mc_result['p10_operating_profit']:,.0f}")
+            mc_m2.metric("Margen P50", f"$ {mc_result['p50_operating_profit']:,.0f}")
+            mc_m3.metric("Margen P90", f"$ {mc_result['p90_operating_profit']:,.0f}")
+            mc_m4.metric("Prob. de Pérdida", f"{mc_result['prob_loss']:.1%}")
+            if mc_result['n_invalid']: st.warning(f"{mc_result['n_invalid']:,} simulaciones descartadas por parámetros inválidos.")
+            with profiler.phase('figura:montecarlo'):
+                mc_edges = mc_result['hist_edges']
+                df_mc_hist = pd.DataFrame({'Costo / t Proc. ($/t)': (mc_edges[:-1] + mc_edges[1:]) / 2, 'Frecuencia': mc_result['hist_counts']})
+                fig_mc_hist = px.bar(df_mc_hist, x='Costo / t Proc. ($/t)', y='Frecuencia', title=f"Distribución Costo / t Procesada ({mc_result['n_draws']:,} simulaciones)")
+                fig_mc_hist.update_traces(marker_line_width=0); fig_mc_hist.update_layout(bargap=0)
+                st.plotly_chart(fig_mc_hist, use_container_width=True)
+
+    profiler.lap('analisis:montecarlo')
+
+    # --- NUEVO: Sensibilidad Analítica (Tornado / Spider) ---
+    with st.expander("📐 Sensibilidad (Tornado / Spider)"):
+        sens_outputs = {"Margen Operativo ($)": 'operating_profit', "Costo / t Procesada ($/t)": 'cost_per_tonne_processed'}
+        sens_col1, sens_col2, sens_col3 = st.columns(3)
+        sens_output_label = sens_col1.selectbox("Métrica", list(sens_outputs), key="sens_output")
+        sens_pct = sens_col2.slider("Variación Tornado (± %)", min_value=1, max_value=50, value=10, step=1, key="sens_pct")
+        sens_top_n = sens_col3.slider("N° de Variables", min_value=3, max_value=len(PARAM_NAMES), value=10, step=1, key="sens_top_n")
+        sens_output = sens_outputs[sens_output_label]
+        try:
+            sens_table, sens_info = sensitivities(current_inputs)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            region_names = {'loading': 'Carga', 'hauling': 'Acarreo', 'processing': 'Planta'}
+            st.caption("Tramo activo de cada recorte de horas: " + ", ".join(
+                f"{region_names[k]}: {'limitado por horas disp.' if v == 'clamped' else 'horas requeridas'}{' (en el quiebre)' if sens_info['at_kink'][k] else ''}"
+                for k, v in sens_info['regions'].items()))
+
+            # Tornado (valores exactos en ± %, una sola evaluación en lote)
+            sens_base = sens_info[sens_output]
+            with profiler.phase('figura:tornado'):
+                tornado_rows = tornado(current_inputs, pct=sens_pct, output=sens_output)[:sens_top_n][::-1]
+                tornado_labels = [PARAM_LABELS[row['name']] for row in tornado_rows]
+                fig_tornado = go.Figure()
+                fig_tornado.add_trace(go.Bar(y=tornado_labels, x=[row['low'] - sens_base for row in tornado_rows], base=sens_base, orientation='h', name=f"-{sens_pct}%", marker_color='indianred'))
+                fig_tornado.add_trace(go.Bar(y=tornado_labels, x=[row['high'] - sens_base for row in tornado_rows], base=sens_base, orientation='h', name=f"+{sens_pct}%", marker_color='seagreen'))
+                fig_tornado.update_layout(barmode='overlay', title=f"Tornado: {sens_output_label} (base {sens_base:,.2f})", height=max(300, 30 * len(tornado_rows)))
+                st.plotly_chart(fig_tornado, use_container_width=True)
+
+            # Spider para las 6 variables de mayor impacto
+            with profiler.phase('figura:spider'):
+                spider_names = [row['name'] for row in tornado_rows[::-1][:6]]
+                spider_pcts, spider_values = spider(current_inputs, spider_names, pct_range=2 * sens_pct, output=sens_output)
+                df_spider = pd.DataFrame([{'Variación (%)': pct, 'Variable': PARAM_LABELS[name], sens_output_label: value}
+                                          for name, values in spider_values.items() for pct, value in zip(spider_pcts, values)])
+                fig_spider = px.line(df_spider, x='Variación (%)', y=sens_output_label, color='Variable', markers=True, title=f"Spider: {sens_output_label}")
+                st.plotly_chart(fig_spider, use_container_width=True)
+
+            # Tabla de derivadas y elasticidades
+            df_sens = pd.DataFrame([{'Variable': PARAM_LABELS[name], 'Valor': current_inputs[name],
+                                     'Derivada': row['d_' + sens_output], 'Elasticidad': row['e_' + sens_output]}
+                                    for name, row in sens_table.items()])
+            df_sens = df_sens.reindex(df_sens['Elasticidad'].abs().sort_values(ascending=False).index)
+            st.dataframe(df_sens.style.format({'Valor': "{:,.2f}", 'Derivada': "{:,.4g}", 'Elasticidad': "{:.3f}"}, na_rep='-'), hide_index=True)
+
+    profiler.lap('analisis:sensibilidad')
+
+    # --- NUEVO: Simulación de Eventos Discretos de Acarreo ---
+    with st.expander("🚛 Simulación de Acarreo (Eventos Discretos)"):
+        st.caption("Simula colas en cargadores y agrupamiento de camiones con tiempos estocásticos. El ciclo efectivo simulado reemplaza al tiempo de ciclo fijo en el modelo de costos.")
+        des_col1, des_col2, des_col3 = st.columns(3)
+        des_cv = des_col1.slider("Variabilidad de tiempos (CV)", min_value=0.0, max_value=1.0, value=0.25, step=0.05, key="des_cv")
+        des_hours = des_col2.number_input("Horas a simular", min_value=24.0, max_value=8760.0, value=720.0, step=24.0, key="des_hours")
+        des_reps = des_col3.number_input("Réplicas", min_value=1, max_value=64, value=8, step=1, key="des_reps")
+        des_dumps = des_col1.number_input("Puntos de descarga", min_value=1, max_value=10, value=1, step=1, key="des_dumps")
+
+        if st.button("▶️ Simular Flota", key="des_run"):
+            try:
+                des_params = des_params_from_inputs(current_inputs, cv=des_cv, sim_hours=des_hours, dump_points=des_dumps)
+                with st.spinner("Simulando flota..."):
+                    st.session_state.des_result = run_replications(des_params, n_reps=int(des_reps))
+                st.session_state.des_result_params = des_params
+            except ValueError as e:
+                st.error(str(e))
+
+        des_result = st.session_state.get('des_result')
+        try:
+            des_current_params = des_params_from_inputs(current_inputs, cv=des_cv, sim_hours=des_hours, dump_points=des_dumps)
+        except ValueError:
+            des_current_params = None
+        if des_result and des_current_params != st.session_state.des_result_params:
+            # Ciclo y productividad simulados para otra flota / ciclo: no se aplican al escenario actual
+            st.warning("La simulación corresponde a otra flota, ciclo o parámetros de simulación: vuelva a simular para el escenario actual.")
+        elif des_result:
+            des_sum = des_result['summary']
+            des_m1, des_m2, des_m3, des_m4 = st.columns(4)
+            des_m1.metric("Ton / hr Camión (simulado)", f"{des_sum['actual_tonnes_per_truck_hr']['mean']:,.1f} t/hr", f"{des_sum['actual_tonnes_per_truck_hr']['mean'] - kpis.get('potential_tph_per_truck', 0):,.1f} vs. ciclo fijo")
+            des_m2.metric("Ciclo Efectivo", f"{des_sum['effective_cycle_time_min']['mean']:,.1f} min", f"± {des_sum['effective_cycle_time_min']['ci95']:.2f} (IC95%)", delta_color="off")
+            des_m3.metric("Cola Prom. Cargador", f"{des_sum['mean_loader_queue_min']['mean']:,.1f} min", f"P90 {des_sum['p90_loader_queue_min']['mean']:,.1f} min", delta_color="off")
+            des_m4.metric("Utilización Cargadores", f"{des_sum['loader_utilization']['mean']:.1%}")
+
+            des_results, des_kpis, des_errors, des_warnings = model_cache.evaluate(des_adjusted_inputs(current_inputs, des_sum))
+            if des_errors:
+                for error in des_errors: st.error(error)
+            else:
+                st.markdown("##### Modelo de costos con ciclo simulado")
+                des_c1, des_c2, des_c3 = st.columns(3)
+                des_c1.metric("Margen Operativo", f"$ {des_results['operating_profit']:,.0f}", f"{des_results['operating_profit'] - results['operating_profit']:,.0f}")
+                des_c2.metric("Costo / t Procesada", f"$ {des_results['cost_per_tonne_processed']:,.2f}", f"{des_results['cost_per_tonne_processed'] - results['cost_per_tonne_processed']:,.2f}", delta_color="inverse")
+                des_c3.metric("Cap. Acarreo", f"{des_kpis['potential_tonnes_hauled']:,.0f} t", f"{des_kpis['potential_tonnes_hauled'] - kpis['potential_tonnes_hauled']:,.0f} t")
+                for warning in des_warnings:
+                    if warning not in warnings: st.warning(warning)
+
+    profiler.lap('analisis:acarreo_des')
+
+    # --- NUEVO: Optimización de Flota (MILP) ---
+    with st.expander("🧮 Optimización de Flota (MILP)"):
+        st.caption("Busca N° de camiones, N° de cargadores y horas de planta que cumplen los targets al menor costo (con los targets fijos, también el mayor margen). Incluya costos de posesión por unidad: sin ellos el modelo siempre abarata al agregar equipos.")
+        opt_col1, opt_col2, opt_col3 = st.columns(3)
+        opt_truck_max = opt_col1.number_input("Máx. Camiones", min_value=1, max_value=500, value=60, step=1, key="opt_truck_max")
+        opt_truck_cost = opt_col2.number_input("Costo Posesión Camión ($/unidad/Periodo)", min_value=0.0, value=20000.0, step=1000.0, format="%.0f", key="opt_truck_cost")
+        opt_loader_max = opt_col2.number_input("Máx. Cargadores", min_value=1, max_value=100, value=20, step=1, key="opt_loader_max")
+        opt_loader_cost = opt_col3.number_input("Costo Posesión Cargador ($/unidad/Periodo)", min_value=0.0, value=50000.0, step=1000.0, format="%.0f", key="opt_loader_cost")
+        opt_plant_hour_cost = opt_col3.number_input("Costo Hora Planta Disponible ($/hr)", min_value=0.0, value=0.0, step=10.0, format="%.0f", key="opt_plant_cost")
+
+        # Un optimizador por sesión: reutiliza el MILP construido entre re-ejecuciones
+        if 'fleet_optimizer' not in st.session_state:
+            st.session_state.fleet_optimizer = FleetOptimizer()
+        fleet_optimizer = st.session_state.fleet_optimizer
+        fleet_optimizer.truck_range = (1, int(opt_truck_max)); fleet_optimizer.loader_range = (1, int(opt_loader_max))
+
+        if st.button("▶️ Optimizar Flota", key="opt_run"):
+            st.session_state.opt_active = True
+        if st.session_state.get('opt_active'):
+            # Re-optimiza en cada re-ejecución: si solo cambiaron costos/precios es un re-solve en caliente
+            opt_result = fleet_optimizer.optimize(current_inputs, truck_unit_cost=opt_truck_cost, loader_unit_cost=opt_loader_cost, plant_hour_cost=opt_plant_hour_cost)
+            if opt_result['status'] != 'Optimal':
+                st.error(f"Sin solución ({opt_result['status']}): revise los máximos de flota o las horas disponibles.")
+            else:
+                opt_m1, opt_m2, opt_m3, opt_m4 = st.columns(4)
+                opt_m1.metric("N° Camiones", opt_result['truck_count'], opt_result['truck_count'] - truck_count)
+                opt_m2.metric("N° Cargadores", opt_result['loader_count'], opt_result['loader_count'] - loader_count)
+                opt_m3.metric("Horas Planta", opt_result['plant_op_hours_period'], opt_result['plant_op_hours_period'] - plant_op_hours_period)
+                opt_m4.metric("Margen Operativo", f"$ {opt_result['results']['operating_profit']:,.0f}", f"{opt_result['results']['operating_profit'] - results['operating_profit']:,.0f}")
+                st.caption(f"Costo total (con posesión): $ {opt_result['total_cost_with_ownership']:,.0f} · Resuelto en {opt_result['solve_time_s'] * 1000:,.1f} ms"
+                           f"{' (modelo reconstruido)' if opt_result['rebuilt'] else ' (arranque en caliente)' if opt_result['warm_start'] else ' (sin re-resolver)'}")
+                st.button("✅ Aplicar al Escenario", key="opt_apply", on_click=apply_fleet_solution, args=(opt_result,))
+
+    profiler.lap('analisis:flota')
+
+    # --- NUEVO: Modelo de Bloques / Ley de Corte ---
+    with st.expander("🧱 Modelo de Bloques (Ley-Tonelaje y Ley de Corte)"):
+        st.caption("Archivo CSV, Parquet o .npy estructurado con tonelaje, ley (%) y marca mineral/estéril (opcional). Se ingiere una vez; cambios de precio o costos reutilizan el índice ordenado sin volver a leerlo.")
+        bm_path = st.text_input("Ruta del modelo de bloques", value="", key="bm_path")
+        bm_col1, bm_col2, bm_col3 = st.columns(3)
+        bm_tonnage_col = bm_col1.text_input("Columna Tonelaje", value="tonnage", key="bm_tonnage_col")
+        bm_grade_col = bm_col2.text_input("Columna Ley (%)", value="grade", key="bm_grade_col")
+        bm_ore_col = bm_col3.text_input("Columna Mineral/Estéril", value="is_ore", key="bm_ore_col")
+
+        if bm_path:
+            try:
+                block_model = get_block_model(bm_path, os.path.getmtime(bm_path), bm_tonnage_col, bm_grade_col, bm_ore_col)
+                best_cutoff, cutoff_curve = optimal_cutoff(block_model, current_inputs)
+            except (OSError, KeyError, ValueError, ImportError) as e:
+                st.error(f"No se pudo leer el modelo de bloques: {e}")
+            else:
+                st.caption(f"{block_model.meta['n_blocks']:,} bloques ({block_model.meta['n_ore_blocks']:,} de mineral) · {block_model.total_tonnes:,.0f} t totales")
+                with profiler.phase('figura:ley_tonelaje'):
+                    fig_gt = go.Figure()
+                    fig_gt.add_trace(go.Scatter(x=cutoff_curve['cutoff'], y=cutoff_curve['ore_tonnes'], name="Toneladas Mineral", mode="lines"))
+                    fig_gt.add_trace(go.Scatter(x=cutoff_curve['cutoff'], y=cutoff_curve['head_grade_pct'], name="Ley Media (%)", yaxis="y2"))
+                    fig_gt.update_layout(title="Curva Ley-Tonelaje", xaxis_title="Ley de Corte (%)", yaxis_title="Toneladas",
+                                         yaxis2=dict(title="Ley Media (%)", overlaying="y", side="right"), legend=dict(orientation="h"))
+                    if best_cutoff: fig_gt.add_vline(x=best_cutoff['cutoff'], line_dash="dash", annotation_text="Óptima")
+                    st.plotly_chart(fig_gt, use_container_width=True)
+                if not best_cutoff:
+                    st.warning("Ninguna ley de corte deja margen positivo dentro de la capacidad de carga y acarreo con los inputs actuales.")
+                else:
+                    bm_m1, bm_m2, bm_m3, bm_m4 = st.columns(4)
+                    bm_m1.metric("Ley de Corte Óptima", f"{best_cutoff['cutoff']:.3f} %")
+                    bm_m2.metric("Ley de Cabeza", f"{best_cutoff['head_grade_pct']:.3f} %", f"{best_cutoff['head_grade_pct'] - grade_pct:.3f}")
+                    bm_m3.metric("Strip Ratio", f"{best_cutoff['strip_ratio']:.2f}", f"{best_cutoff['strip_ratio'] - strip_ratio:.2f}", delta_color="inverse")
+                    bm_m4.metric("Margen Operativo", f"$ {best_cutoff['operating_profit']:,.0f}", f"{best_cutoff['operating_profit'] - results['operating_profit']:,.0f}")
+                    st.caption(f"Reservas: {best_cutoff['ore_tonnes']:,.0f} t de mineral ({best_cutoff['n_periods']:,.1f} periodos al target actual) · Margen total del pit: $ {best_cutoff['pit_profit']:,.0f}")
+                    st.button("✅ Aplicar Ley de Corte al Escenario", key="bm_apply", on_click=apply_cutoff_solution, args=(best_cutoff,))
+
+    profiler.lap('analisis:modelo_bloques')
+
+    # --- NUEVO: Vida de la Mina (Multi-Periodo) ---
+    with st.expander("📅 Vida de la Mina (Multi-Periodo)"):
+        st.caption("Plan por periodos con targets, precios, flota e inversión editables. Lo volado y no movido queda en cancha de tronado y el mineral no procesado en cancha ROM. Al editar un periodo solo se recalculan ese y los siguientes.")
+        lom_c1, lom_c2, lom_c3, lom_c4 = st.columns(4)
+        lom_periods = lom_c1.number_input("N° Periodos", min_value=1, max_value=2000, value=120, step=12, key="lom_periods")
+        lom_ppy = lom_c2.number_input("Periodos por Año", min_value=1, max_value=365, value=12, step=1, key="lom_ppy")
+        lom_rate = lom_c3.number_input("Tasa de Descuento Anual (%)", min_value=0.0, max_value=100.0, value=8.0, step=0.5, key="lom_rate")
+        lom_broken0 = lom_c4.number_input("Stock Inicial Tronado (t)", min_value=0.0, value=0.0, step=10000.0, format="%.0f", key="lom_broken0")
+        lom_ore0 = lom_c4.number_input("Stock Inicial Mineral ROM (t)", min_value=0.0, value=0.0, step=10000.0, format="%.0f", key="lom_ore0")
+
+        if st.button("▶️ Crear Plan desde Escenario Actual", key="lom_init"):
+            lom_plan = LifeOfMine(current_inputs, lom_periods)
+            st.session_state.lom_plan = lom_plan
+            st.session_state.lom_table = pd.DataFrame({name: lom_plan.schedule[name] for name in EDITABLE_COLUMNS},
+                                                      index=pd.RangeIndex(1, lom_plan.n_periods + 1, name="Periodo"))
+            st.session_state.pop('lom_editor', None)  # descarta ediciones del plan anterior
+        lom_plan = st.session_state.get('lom_plan')
+        if lom_plan is not None:
+            lom_edited = st.data_editor(st.session_state.lom_table, key="lom_editor", height=250, use_container_width=True,
+                                        column_config={name: st.column_config.NumberColumn(PARAM_LABELS.get(name, "Inversión ($)")) for name in EDITABLE_COLUMNS})
+            # Columnas no editables siguen a la barra lateral; solo se marcan sucios los periodos que cambian
+            lom_plan.update_columns({name: np.full(lom_plan.n_periods, float(current_inputs[name])) for name in PARAM_NAMES if name not in EDITABLE_COLUMNS})
+            lom_plan.update_columns({name: lom_edited[name].fillna(0).to_numpy(dtype=np.float64) for name in EDITABLE_COLUMNS})
+            lom_plan.set_initial_stocks(broken=lom_broken0, ore=lom_ore0)
+            lom_plan.evaluate()
+            lom_fin = lom_plan.financials(discount_rate_pct=lom_rate, periods_per_year=lom_ppy)
+            lom_out = lom_plan.outputs
+
+            lom_m1, lom_m2, lom_m3, lom_m4 = st.columns(4)
+            lom_m1.metric("VAN", f"$ {lom_fin['npv']:,.0f}")
+            lom_m2.metric("TIR Anual", f"{lom_fin['irr_pct']:.1f} %" if np.isfinite(lom_fin['irr_pct']) else "N/A")
+            lom_m3.metric("Recuperación", f"Periodo {lom_fin['payback_period']}" if lom_fin['payback_period'] else "N/A")
+            lom_m4.metric("Metal Total", f"{lom_fin['total_metal']:,.0f}")
+            lom_recomputed = lom_plan.last_recomputed
+            st.caption(f"Recalculados periodos {lom_recomputed[0] + 1}–{lom_recomputed[1]} de {lom_plan.n_periods}" if lom_recomputed else "Sin cambios: no se recalculó ningún periodo")
+            lom_error_periods = int(np.count_nonzero(lom_plan.error_mask))
+            if lom_error_periods: st.error(f"{lom_error_periods} periodos con inputs inválidos (sin resultados).")
+            lom_short = int(np.count_nonzero(lom_out['moved_shortfall'] > 0)), int(np.count_nonzero(lom_out['feed_shortfall'] > 0))
+            if any(lom_short): st.warning(f"Cancha insuficiente: {lom_short[0]} periodos sin tronado suficiente para mover el target, {lom_short[1]} periodos sin mineral suficiente para alimentar la planta.")
+            lom_capacity_periods = int(np.count_nonzero(lom_plan.warning_mask))
+            if lom_capacity_periods: st.warning(f"{lom_capacity_periods} periodos con advertencias de capacidad u horas.")
+
+            lom_x = np.arange(1, lom_plan.n_periods + 1)
+            with profiler.phase('figura:vida_mina_flujo'):
+                fig_lom_cf = go.Figure()
+                fig_lom_cf.add_trace(go.Bar(x=lom_x, y=lom_out['cash_flow'], name="Flujo de Caja"))
+                fig_lom_cf.add_trace(go.Scatter(x=lom_x, y=np.cumsum(lom_fin['discounted_cash_flow']), name="Flujo Descontado Acumulado", mode="lines"))
+                fig_lom_cf.update_layout(title="Flujo de Caja por Periodo", xaxis_title="Periodo", legend=dict(orientation="h"))
+                st.plotly_chart(fig_lom_cf, use_container_width=True)
+            with profiler.phase('figura:vida_mina_canchas'):
+                fig_lom_stock = go.Figure()
+                fig_lom_stock.add_trace(go.Scatter(x=lom_x, y=lom_out['broken_stock'], name="Cancha Tronado (t)", mode="lines"))
+                fig_lom_stock.add_trace(go.Scatter(x=lom_x, y=lom_out['ore_stock'], name="Cancha Mineral ROM (t)", mode="lines"))
+                fig_lom_stock.update_layout(title="Inventario en Canchas", xaxis_title="Periodo", legend=dict(orientation="h"))
+                st.plotly_chart(fig_lom_stock, use_container_width=True)
+
+    profiler.lap('analisis:vida_mina')
+
+    # --- NUEVO: Trabajos en Segundo Plano (barridos y Monte Carlo sin bloquear la app) ---
+    with st.expander("⏳ Trabajos en Segundo Plano"):
+        st.caption("Barrido de uno o dos inputs alrededor del escenario actual, calculado en un pool de procesos mientras se sigue usando la app. Un trabajo idéntico enviado desde otra sesión se comparte (mismo cálculo). Los barridos terminados se pueden guardar como escenarios.")
+        bg_col1, bg_col2, bg_col3 = st.columns(3)
+        bg_var1 = bg_col1.selectbox("Input 1", PARAM_NAMES, index=PARAM_NAMES.index('metal_price'), format_func=PARAM_LABELS.get, key="bg_var1")
+        bg_pct1 = bg_col2.number_input("Rango Input 1 (± %)", min_value=1.0, max_value=90.0, value=30.0, step=5.0, key="bg_pct1")
+        bg_steps1 = bg_col3.number_input("Pasos Input 1", min_value=2, max_value=2000, value=200, step=50, key="bg_steps1")
+        bg_var2 = bg_col1.selectbox("Input 2", ('',) + PARAM_NAMES, index=1 + PARAM_NAMES.index('grade_pct'),
+                                    format_func=lambda name: PARAM_LABELS[name] if name else "(ninguno)", key="bg_var2")
+        bg_pct2 = bg_col2.number_input("Rango Input 2 (± %)", min_value=1.0, max_value=90.0, value=30.0, step=5.0, key="bg_pct2")
+        bg_steps2 = bg_col3.number_input("Pasos Input 2", min_value=2, max_value=2000, value=200, step=50, key="bg_steps2")
+        if st.button("⏳ Enviar Barrido", key="bg_sweep"):
+            bg_axes = [[name, current_inputs[name] * (1 - pct / 100.0), current_inputs[name] * (1 + pct / 100.0), int(steps)]
+                       for name, pct, steps in ((bg_var1, bg_pct1, bg_steps1), (bg_var2, bg_pct2, bg_steps2)) if name]
+            try:
+                get_job_runner().submit('sweep', {'base': current_inputs, 'axes': bg_axes}, owner=st.session_state.session_id,
+                                        label="Barrido " + " × ".join(PARAM_LABELS[axis[0]] for axis in bg_axes))
+            except ValueError as e:
+                st.error(str(e))
+        st.markdown("---")
+        jobs_polling = any(job.status == 'running' for job in get_job_runner().jobs(st.session_state.session_id))
+        st.fragment(run_every=1.0 if jobs_polling else None)(render_jobs_panel)(jobs_polling)
+
+    profiler.lap('analisis:trabajos')
 
     # --- Guardar Escenario Actual (MODIFICADO PARA NUEVOS INPUTS) ---
     st.markdown("---")
@@ -299,103 +591,169 @@ elif results and kpis: # Solo mostrar si no hubo errores fatales
     scenario_name_input = st.text_input("Nombre para este escenario:", f"Escenario Detallado {current_run_id_detailed + 1}", key=f"scn_name_det_{current_run_id_detailed}")
 
     if st.button("💾 Guardar Escenario Detallado Actual", key=f"save_scn_det_{current_run_id_detailed}"):
-        # === MODIFICADO: Capturar todos los inputs nuevos/ajustados ===
-        scenario_data = {
-            "name": scenario_name_input if scenario_name_input else f"Escenario Detallado {current_run_id_detailed + 1}",
-            # Inputs
-            "tonnes_mined_target": tonnes_mined_target, "strip_ratio": strip_ratio, "plant_feed_target": plant_feed_target,
-            "tonnes_blasted_period": tonnes_blasted_period, "load_factor_kg_t": load_factor_kg_t, "explosive_cost_usd_kg": explosive_cost_usd_kg, # Voladura
-            "truck_count": truck_count, "truck_op_hours_period": truck_op_hours_period, "truck_payload": truck_payload, "avg_cycle_time_min": avg_cycle_time_min,
-            "loader_count": loader_count, "loader_op_hours_period": loader_op_hours_period, "loader_rate_tph": loader_rate_tph,
-            "plant_op_hours_period": plant_op_hours_period, "plant_throughput_tph": plant_throughput_tph,
-            "grade_pct": grade_pct, "recovery_pct": recovery_pct, "metal_price": metal_price, "exchange_rate": exchange_rate,
-            "cost_drill_acc_per_t_blasted": cost_drill_acc_per_t_blasted, # Ajustado
-            "cost_load_per_hr": cost_load_per_hr, "cost_haul_per_hr": cost_haul_per_hr,
-            "cost_process_per_hr": cost_process_per_hr, "cost_maint_fixed": cost_maint_fixed, "cost_ga_fixed": cost_ga_fixed,
-            # Outputs (Resultados y KPIs)
-            "revenue": results.get('revenue'), "total_cost": results.get('total_cost'), "operating_profit": results.get('operating_profit'),
-            "cost_per_tonne_processed": results.get('cost_per_tonne_processed'), "profit_per_tonne_processed": results.get('profit_per_tonne_processed'),
-            "actual_tonnes_per_truck_hr": kpis.get('actual_tonnes_per_truck_hr'), "actual_tonnes_per_loader_hr": kpis.get('actual_tonnes_per_loader_hr'),
-            "actual_tph_plant": kpis.get('actual_tph_plant'), "cost_per_total_tonne_moved": kpis.get('cost_per_total_tonne_moved'),
-            "cost_explosives_total": results.get('cost_explosives'), # Guardar costo específico
-            "cost_drill_acc_total": results.get('cost_drill_accessories') # Guardar costo específico
-        }
-        # === FIN MODIFICADO ===
-        st.session_state.mining_scenarios_detailed.append(copy.deepcopy(scenario_data))
+        # Inputs + Outputs (Resultados y KPIs), anexados al almacén persistente
+        scenario_data = scenario_record(scenario_name_input if scenario_name_input else f"Escenario Detallado {current_run_id_detailed + 1}",
+                                        current_inputs, results, kpis)
+        get_scenario_store().append(scenario_data, owner=st.session_state.session_id)
         st.session_state.run_counter_detailed += 1
         st.success(f"Escenario '{scenario_data['name']}' guardado!")
         # st.experimental_rerun() # Comentado
 
+profiler.lap('guardar')
+
 # --- Sección de Análisis Comparativo (MODIFICADO PARA NUEVOS DATOS) ---
 st.markdown("---")
 st.subheader("📊 Análisis Comparativo de Escenarios Detallados Guardados")
-scenarios_guardados_det = st.session_state.get('mining_scenarios_detailed', [])
-if not scenarios_guardados_det:
-    st.info("Aún no has guardado ningún escenario detallado.")
+scenario_store = get_scenario_store()
+
+# --- Importar / Exportar libros Excel (lectura y escritura en streaming, evaluación en lote) ---
+with st.expander("📥 Importar / 📤 Exportar Escenarios (Excel)"):
+    xl_col1, xl_col2 = st.columns(2)
+    with xl_col1:
+        st.caption("Una fila por escenario; encabezados `name` y los nombres de los inputs (o sus etiquetas). Los inputs ausentes toman el valor por defecto.")
+        xl_file = st.file_uploader("Libro de escenarios (.xlsx)", type=["xlsx"], key="xl_upload")
+        if xl_file is not None and st.button("📥 Importar Escenarios", key="xl_import"):
+            try:
+                with st.spinner("Importando y evaluando escenarios..."):
+                    xl_summary = import_scenario_book(xl_file, scenario_store, owner=st.session_state.session_id)
+            except (OSError, ValueError, KeyError) as e:
+                st.error(f"No se pudo leer el libro: {e}")
+            else:
+                st.success(f"{xl_summary['imported']:,} de {xl_summary['rows']:,} escenarios importados.")
+                if xl_summary['missing']: st.info("Inputs completados con valores por defecto: " + ", ".join(PARAM_LABELS[name] for name in xl_summary['missing']))
+                if xl_summary['invalid']:
+                    st.warning(f"{xl_summary['invalid']:,} filas rechazadas (se muestran las primeras {len(xl_summary['rejected'])}).")
+                    st.dataframe(pd.DataFrame([{'Fila': r['row'], 'Escenario': r['name'], 'Errores': "; ".join(r['errors'])} for r in xl_summary['rejected']]), hide_index=True)
+        st.download_button("📄 Descargar Plantilla", data=scenario_template_bytes(), file_name="plantilla_escenarios.xlsx", key="xl_template")
+    with xl_col2:
+        st.caption("Todos los escenarios guardados con inputs, resultados, KPIs, errores y advertencias.")
+        if st.button("📤 Generar Libro de Resultados", key="xl_export"):
+            with st.spinner("Escribiendo libro..."):
+                xl_buffer = io.BytesIO()
+                xl_rows = export_scenario_book(scenario_store, xl_buffer)
+            st.session_state.xl_export_bytes = xl_buffer.getvalue()
+            st.caption(f"{xl_rows:,} escenarios exportados.")
+        if st.session_state.get('xl_export_bytes'):
+            st.download_button("⬇️ Descargar Excel", data=st.session_state.xl_export_bytes, file_name="escenarios_mineria.xlsx", key="xl_download")
+
+n_scenarios_guardados = scenario_store.count()
+if not n_scenarios_guardados:
+    st.info("Aún no hay escenarios detallados guardados.")
 else:
-    st.write(f"Tienes {len(scenarios_guardados_det)} escenario(s) detallado(s) guardado(s).")
-    if st.button("🗑️ Limpiar Escenarios Detallados", key="clear_scenarios_det"):
-        st.session_state.mining_scenarios_detailed = []
-        st.experimental_rerun()
-
-    # === MODIFICADO: Añadir/Ajustar columnas en comparación ===
-    comparison_data_det = []
-    for sc in scenarios_guardados_det:
-        # Calcular Costo P&V total para mostrar
-        pv_cost = sc.get('cost_explosives_total', 0) + sc.get('cost_drill_acc_total', 0)
-        ton_blasted = sc.get('tonnes_blasted_period', 0)
-        pv_cost_per_ton_blasted = pv_cost / ton_blasted if ton_blasted else 0
-
-        comparison_data_det.append({
-            "Escenario": sc.get('name'),
-            "Margen Operativo ($)": sc.get('operating_profit'),
-            "Costo / t Proc. ($/t)": sc.get('cost_per_tonne_processed'),
-            "Costo P&V / t Volada ($/t)": pv_cost_per_ton_blasted, # Nueva Métrica
-            "Factor Carga (kg/t)": sc.get('load_factor_kg_t'), # Nuevo Input
-            "Ton / hr Camión (t/hr)": sc.get('actual_tonnes_per_truck_hr'),
-            "Ton / hr Planta (t/hr)": sc.get('actual_tph_plant'),
-            #"Ley (%)": sc.get('grade_pct'), # Opcional quitar algunas para no saturar
-            #"Recup (%)": sc.get('recovery_pct'),
-            "Precio Metal ($)": sc.get('metal_price'),
-        })
-    df_comparison_det = pd.DataFrame(comparison_data_det)
-
-    # Ajustar formato
-    format_comp = {
-        "Margen Operativo ($)": "S/. {:,.0f}",
-        "Costo / t Proc. ($/t)": "S/. {:,.2f}",
-        "Costo P&V / t Volada ($/t)": "S/. {:,.2f}", # Nuevo Formato
-        "Factor Carga (kg/t)": "{:.2f}", # Nuevo Formato
-        "Ton / hr Camión (t/hr)": "{:,.1f}",
-        "Ton / hr Planta (t/hr)": "{:,.1f}",
-        #"Ley (%)": "{:.2f}%",
-        #"Recup (%)": "{:.1f}%",
-        "Precio Metal ($)": "S/. {:,.2f}"
-    }
-    st.dataframe(df_comparison_det.style.format(format_comp, na_rep='-'))
+    # El almacén es compartido entre sesiones: limpiar solo borra lo guardado desde esta sesión
+    n_scenarios_propios = scenario_store.count({'owner': st.session_state.session_id})
+    st.write(f"Hay {n_scenarios_guardados:,} escenario(s) detallado(s) guardado(s), {n_scenarios_propios:,} desde esta sesión.")
+    clear_col1, clear_col2 = st.columns(2)
+    if clear_col1.button("🗑️ Limpiar Mis Escenarios (esta sesión)", key="clear_scenarios_det", disabled=not n_scenarios_propios):
+        scenario_store.clear(owner=st.session_state.session_id)
+        st.rerun()
+    with clear_col2.popover("⚠️ Limpiar Todos (todas las sesiones)"):
+        st.warning(f"Borra los {n_scenarios_guardados:,} escenarios guardados, incluidos los de otros usuarios.")
+        clear_all_confirm = st.checkbox("Confirmo que quiero borrar todos los escenarios", key="clear_scenarios_all_confirm")
+        if st.button("🗑️ Borrar Todos", key="clear_scenarios_all", disabled=not clear_all_confirm):
+            scenario_store.clear()
+            st.session_state.pop('clear_scenarios_all_confirm', None)
+            st.rerun()
+
+    # === Punto de equilibrio / búsqueda de objetivo para todos los escenarios (en lote) ===
+    with st.expander("🎯 Punto de Equilibrio / Buscar Objetivo (todos los escenarios)"):
+        st.caption("Valor de UN input que lleva la salida elegida al objetivo en cada escenario guardado, con el resto de los inputs fijos. Se resuelve en lote y en forma cerrada entre los quiebres de capacidad (horas de carga, acarreo y planta).")
+        gs_col1, gs_col2, gs_col3 = st.columns(3)
+        gs_variable = gs_col1.selectbox("Input a resolver", PARAM_NAMES, index=PARAM_NAMES.index('metal_price'), format_func=PARAM_LABELS.get, key="gs_variable")
+        gs_output = gs_col2.selectbox("Salida", OUTPUTS, format_func=OUTPUT_LABELS.get, key="gs_output")
+        gs_target = gs_col3.number_input("Objetivo", value=0.0, step=1.0, format="%.2f", key="gs_target")
+        if st.button("▶️ Resolver para Todos", key="gs_run"):
+            with st.spinner("Resolviendo..."):
+                gs_columns = scenario_store.column_arrays(('name',) + PARAM_NAMES)
+                gs = goal_seek(gs_columns, gs_variable, gs_target, output=gs_output)
+                gs_current = goal_seek(current_inputs, gs_variable, gs_target, output=gs_output)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                gs_change = np.where(gs['base'] != 0, (gs['solution'] / gs['base'] - 1.0) * 100.0, np.nan)
+            st.session_state.gs_result = {
+                'title': f"{PARAM_LABELS[gs_variable]} para {OUTPUT_LABELS[gs_output]} = {gs_target:,.2f}",
+                'current': (gs_current['base'][0], gs_current['solution'][0]),
+                'frame': pd.DataFrame({"Escenario": gs_columns['name'], "Valor Actual": gs['base'],
+                                       "Valor Objetivo": gs['solution'], "Cambio (%)": gs_change}),
+            }
+        gs_result = st.session_state.get('gs_result')
+        if gs_result:
+            gs_frame = gs_result['frame']
+            gs_solved = gs_frame["Valor Objetivo"].notna()
+            st.markdown(f"**{gs_result['title']}**")
+            gs_m1, gs_m2, gs_m3 = st.columns(3)
+            gs_m1.metric("Escenarios con Solución", f"{int(gs_solved.sum()):,} de {len(gs_frame):,}")
+            gs_m2.metric("Mediana del Valor Objetivo", f"{gs_frame['Valor Objetivo'].median():,.4g}" if gs_solved.any() else "-")
+            gs_cur_base, gs_cur_sol = gs_result['current']
+            gs_m3.metric("Escenario Actual", f"{gs_cur_sol:,.4g}" if np.isfinite(gs_cur_sol) else "Sin solución",
+                         f"{gs_cur_sol - gs_cur_base:,.4g}" if np.isfinite(gs_cur_sol) else None)
+            if gs_solved.any():
+                # Histograma agregado en el servidor (no se envían todos los puntos al navegador)
+                with profiler.phase('figura:goal_seek'):
+                    gs_counts, gs_bins = np.histogram(gs_frame.loc[gs_solved, "Valor Objetivo"], bins=min(50, int(gs_solved.sum())))
+                    fig_gs = go.Figure(go.Bar(x=0.5 * (gs_bins[:-1] + gs_bins[1:]), y=gs_counts, width=np.diff(gs_bins)))
+                    fig_gs.update_layout(title="Distribución del Valor Objetivo", xaxis_title=gs_result['title'].split(" para ")[0], yaxis_title="N° Escenarios")
+                    st.plotly_chart(fig_gs, use_container_width=True)
+            st.caption("Sin solución: la salida no alcanza el objetivo para ningún valor positivo del input (o no depende de él). Se muestran hasta 1.000 filas; la descarga incluye todas.")
+            st.dataframe(gs_frame.head(1000).style.format({"Valor Actual": "{:,.4g}", "Valor Objetivo": "{:,.4g}", "Cambio (%)": "{:+,.1f}"}, na_rep='Sin solución'), hide_index=True)
+            st.download_button("⬇️ Descargar CSV", data=gs_frame.to_csv(index=False).encode('utf-8'), file_name="punto_equilibrio.csv", key="gs_download")
+
+    # === Filtros (resueltos en SQL): se aplican a la tabla y a los gráficos ===
+    comp_metric_options = {"Margen Operativo ($)": 'operating_profit', "Costo / t Proc. ($/t)": 'cost_per_tonne_processed',
+                           "Factor Carga (kg/t)": 'load_factor_kg_t', "Ton / hr Camión (t/hr)": 'actual_tonnes_per_truck_hr',
+                           "Ton / hr Planta (t/hr)": 'actual_tph_plant', "Precio Metal ($)": 'metal_price'}
+
+    def reset_comp_page():
+        st.session_state.pop('comp_page', None)
+
+    flt_col1, flt_col2, flt_col3, flt_col4 = st.columns(4)
+    comp_filter_name = flt_col1.text_input("Nombre contiene", value="", key="comp_filter_name", on_change=reset_comp_page)
+    comp_filter_label = flt_col2.selectbox("Filtrar rango de", ["(sin filtro)"] + list(comp_metric_options), key="comp_filter_col", on_change=reset_comp_page)
+    comp_filter_min = flt_col3.number_input("Mínimo", value=None, format="%.2f", key="comp_filter_min", on_change=reset_comp_page)
+    comp_filter_max = flt_col4.number_input("Máximo", value=None, format="%.2f", key="comp_filter_max", on_change=reset_comp_page)
+    comp_filters = {'name': comp_filter_name.strip()}
+    if comp_filter_label in comp_metric_options: comp_filters[comp_metric_options[comp_filter_label]] = (comp_filter_min, comp_filter_max)
+    n_comp_filtered = scenario_store.count(comp_filters)
+    if n_comp_filtered != n_scenarios_guardados: st.caption(f"{n_comp_filtered:,} escenario(s) cumplen el filtro.")
+
+    # === Tabla paginada: solo se carga la página visible desde el almacén ===
+    comp_sort_options = {"Orden de guardado": 'id', **comp_metric_options, "Nombre": 'name'}
+    pg_col1, pg_col2, pg_col3, pg_col4 = st.columns(4)
+    comp_sort_label = pg_col1.selectbox("Ordenar por", list(comp_sort_options), key="comp_sort")
+    comp_desc = pg_col2.checkbox("Descendente", value=False, key="comp_desc")
+    comp_page_size = pg_col3.selectbox("Filas por página", [25, 50, 100, 500], index=1, key="comp_page_size", on_change=reset_comp_page)
+    comp_n_pages = max(n_comp_filtered - 1, 0) // comp_page_size + 1
+    comp_page = pg_col4.number_input(f"Página (de {comp_n_pages:,})", min_value=1, max_value=comp_n_pages, value=1, step=1, key="comp_page")
+    with profiler.phase('almacen:lectura_pagina'):
+        comparison_page = scenario_store.page(offset=(comp_page - 1) * comp_page_size, limit=comp_page_size,
+                                              order_by=comp_sort_options[comp_sort_label], descending=comp_desc, filters=comp_filters)
+    with profiler.phase('dataframe:comparativo'):
+        df_comparison_det = build_comparison_frame(comparison_page)
+
+    with profiler.phase('st.dataframe:estilo_comparativo'):
+        st.dataframe(df_comparison_det.style.format(COMPARISON_FORMAT, na_rep='-'))
     # === FIN MODIFICADO ===
 
-    # Gráficos comparativos (Se puede añadir uno para Costo P&V / t Volada)
-    if len(df_comparison_det) > 1:
-        # (Gráficos existentes - sin cambios)
-        col_comp1, col_comp2 = st.columns(2)
-        with col_comp1: fig_comp_profit_det = px.bar(df_comparison_det, x='Escenario', y='Margen Operativo ($)', title='Comparación Margen Operativo', text_auto='.2s'); st.plotly_chart(fig_comp_profit_det, use_container_width=True)
-        with col_comp2: fig_comp_cost_det = px.bar(df_comparison_det, x='Escenario', y='Costo / t Proc. ($/t)', title='Comparación Costo / t Procesada', text_auto='.2f'); st.plotly_chart(fig_comp_cost_det, use_container_width=True)
-
-        # --- NUEVO Gráfico Comparativo P&V ---
-        col_comp5, col_comp6 = st.columns(2) # Usar nuevos nombres de columna
-        with col_comp5:
-            fig_comp_pv_cost = px.bar(df_comparison_det, x='Escenario', y='Costo P&V / t Volada ($/t)', title='Comparación Costo P&V / t Volada', text_auto='.2f', labels={'Costo P&V / t Volada ($/t)': 'Costo P&V (S/./t)'})
-            st.plotly_chart(fig_comp_pv_cost, use_container_width=True)
-        with col_comp6:
-             fig_comp_load_factor = px.bar(df_comparison_det, x='Escenario', y='Factor Carga (kg/t)', title='Comparación Factor de Carga', text_auto='.2f', labels={'Factor Carga (kg/t)': 'Factor Carga (kg/t)'})
-             st.plotly_chart(fig_comp_load_factor, use_container_width=True)
-        # --- FIN NUEVO ---
-
-        # (Gráficos KPI existentes - sin cambios)
-        col_comp3, col_comp4 = st.columns(2)
-        with col_comp3: fig_comp_truck_kpi = px.bar(df_comparison_det, x='Escenario', y='Ton / hr Camión (t/hr)', title='Comparación Prod. Camiones', text_auto='.1f'); st.plotly_chart(fig_comp_truck_kpi, use_container_width=True)
-        with col_comp4: fig_comp_plant_kpi = px.bar(df_comparison_det, x='Escenario', y='Ton / hr Planta (t/hr)', title='Comparación Prod. Planta', text_auto='.1f'); st.plotly_chart(fig_comp_plant_kpi, use_container_width=True)
+    # Gráficos comparativos (Margen, Costo/t, P&V, Factor de Carga, Prod. Camiones y Planta), de a dos por fila.
+    # Barras para pocos escenarios (o el top-N del orden elegido); sobre BAR_LIMIT, histogramas agregados o dispersión WebGL.
+    # Las figuras se cachean por hash del conjunto guardado + filtros + vista: re-ejecuciones sin cambios no releen ni reconstruyen.
+    vw_col1, vw_col2 = st.columns([3, 1])
+    comp_view = vw_col1.radio("Vista de gráficos", COMPARISON_VIEWS, horizontal=True, key="comp_view")
+    comp_top_n = vw_col2.number_input("Top-N (barras)", min_value=2, max_value=500, value=50, step=10, key="comp_top_n",
+                                      help="Barras de los primeros N escenarios según 'Ordenar por' y 'Descendente'. En 'Automática' se grafican todos si no pasan de %d." % BAR_LIMIT)
+    comp_view, comp_top_n = resolve_comparison_view(comp_view, n_comp_filtered, comp_top_n)
+    comp_sort_column = comp_sort_options[comp_sort_label]
+
+    comp_view_key = comparison_view_key(scenario_store.set_hash(), comp_filters, comp_view, comp_top_n, comp_sort_column, comp_desc)
+    with profiler.phase('figura:comparativos (lectura y construcción)'):
+        comparison_figs = model_cache.figure_set('comparativo', comp_view_key,
+                                                 lambda: build_comparison_view(scenario_store, comp_view, comp_filters, comp_top_n, comp_sort_column, comp_desc))
+    if comparison_figs:
+        if comp_view == VIEW_BARS and n_comp_filtered > comp_top_n:
+            st.caption(f"Barras de los primeros {comp_top_n:,} de {n_comp_filtered:,} escenarios según '{comp_sort_label}'.")
+        for fig_left, fig_right in zip(comparison_figs[::2], comparison_figs[1::2]):
+            col_comp_left, col_comp_right = st.columns(2)
+            for col_comp, fig_comp in ((col_comp_left, fig_left), (col_comp_right, fig_right)):
+                with col_comp, profiler.phase(f"figura:{fig_comp.layout.title.text}"): st.plotly_chart(fig_comp, use_container_width=True)
 
 
 # --- Notas Finales (Ajustar nota sobre P&V) ---
@@ -404,4 +762,31 @@ st.caption("""
 *Modelo Detallado Simplificado.* Las relaciones entre equipos, tiempos de ciclo y costos pueden ser más complejas.
 **El costo de P&V se calcula sumando el costo de explosivos (basado en ton. voladas y factor de carga) y el costo de perforación/accesorios (basado en $/t volada).**
 Ajuste los costos unitarios y factores de conversión de metal a su caso específico.
-""")
\ No newline at end of file
+""")
+profiler.lap('comparativo')
+
+# --- Panel de Diagnóstico (tiempos por fase, cachés y memoria de la sesión) ---
+st.sidebar.markdown("---")
+st.sidebar.checkbox("🛠️ Diagnóstico de Rendimiento", key="debug_profile",
+                    help="Mide cada re-ejecución por fase y la registra como JSON (logger 'mineria.profiling'; archivo si se define MINERIA_PROFILE_LOG).")
+if profiler.enabled:
+    st.session_state.profile_runs = st.session_state.get('profile_runs', 0) + 1
+    profile_cache_stats = model_cache.stats()
+    profile_record = profiler.finish(run=st.session_state.profile_runs, cache_stats=profile_cache_stats, session_state=st.session_state,
+                                     previous_cache_stats=st.session_state.get('profile_cache_stats'))
+    st.session_state.profile_cache_stats = profile_cache_stats  # foto para descontar en la próxima re-ejecución
+    profile_history = st.session_state.setdefault('profile_history', [])
+    profile_history.append(profile_record['total_s'] * 1000.0); del profile_history[:-50]
+    with st.sidebar.expander("⏱️ Última Re-ejecución", expanded=True):
+        prof_m1, prof_m2 = st.columns(2)
+        prof_m1.metric("Tiempo Total", f"{profile_record['total_s'] * 1000:,.0f} ms")
+        prof_m2.metric("Memoria Sesión", f"{profile_record['session_state_bytes'] / 1e6:,.2f} MB")
+        prof_m1.metric("Aciertos Caché", f"{profile_record['cache_hits']:,}", help="En esta re-ejecución")
+        prof_m2.metric("Fallos Caché", f"{profile_record['cache_misses']:,}", help="En esta re-ejecución")
+        st.dataframe(pd.DataFrame([{'Fase': ph['name'], 'ms': ph['seconds'] * 1000.0, 'Tipo': 'tramo' if ph['kind'] == 'lap' else 'bloque'}
+                                   for ph in profile_record['phases']]).style.format({'ms': "{:,.1f}"}), hide_index=True)
+        st.caption("Tiempo total por re-ejecución (ms, últimas 50)")
+        st.line_chart(profile_history, height=120)
+        st.caption("Claves de session_state más pesadas (bytes)")
+        st.dataframe(pd.Series(profile_record['session_state_top'], name="bytes"))
+        st.json(profile_record, expanded=False)
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""Benchmarks del modelo y del camino de render de la app.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench.py -o bench.json
+    python benchmarks/bench.py -o nuevo.json --baseline bench.json --threshold 0.2
+
+Mide la latencia de calculate_detailed_metrics, el throughput del motor en lote
+(1e3 a 1e7 escenarios), la tabla comparativa para N escenarios guardados, las
+figuras Plotly (torta, cascada, las seis barras comparativas y las vistas
+agregadas para 50k escenarios) y una ejecución completa del script con el
+AppTest de Streamlit. Escribe JSON; con
+--baseline compara cada medición y marca como regresión las que empeoran más
+que --threshold (devuelve código 1 si hay alguna).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mineria import DEFAULT_INPUTS, PARAM_NAMES, calculate_detailed_metrics, calculate_detailed_metrics_batch  # noqa: E402
+from mineria.store import ScenarioStore  # noqa: E402
+
+
+def _timeit(fn, repeat=5, number=1):
+    """Mediana y mínimo (segundos por llamada) de `repeat` rondas de `number` llamadas."""
+    rounds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number): fn()
+        rounds.append((time.perf_counter() - t0) / number)
+    return {'median_s': statistics.median(rounds), 'min_s': min(rounds), 'repeat': repeat, 'number': number}
+
+
+def _random_columns(n, rng):
+    """Escenarios alrededor de los valores por defecto (±20% en cada input)."""
+    return {name: DEFAULT_INPUTS[name] * rng.uniform(0.8, 1.2, n) for name in PARAM_NAMES}
+
+
+# --- Modelo ---
+def bench_scalar(quick):
+    number = 2000 if quick else 20000
+    out = _timeit(lambda: calculate_detailed_metrics(**DEFAULT_INPUTS), repeat=5, number=number)
+    out['us_per_call'] = out['median_s'] * 1e6
+    return {'scalar_latency': out}
+
+
+def bench_batch(quick, max_rows, chunk_rows=1_000_000):
+    """Throughput del motor en lote; sobre `chunk_rows` se evalúa por bloques (como la CLI)."""
+    rng = np.random.default_rng(0)
+    out = {}
+    sizes = [10 ** k for k in range(3, 8) if 10 ** k <= max_rows]
+    chunk = _random_columns(min(max(sizes), chunk_rows), rng)
+    for n in sizes:
+        cols = chunk if n >= chunk_rows else {k: v[:n] for k, v in chunk.items()}
+        calls = max(n // chunk_rows, 1)
+
+        def run():
+            for _ in range(calls): calculate_detailed_metrics_batch(cols)
+
+        res = _timeit(run, repeat=2 if (quick or n >= 10 ** 6) else 5)
+        res['rows'] = n; res['rows_per_s'] = n / res['median_s']
+        out[f'batch_{n:.0e}'.replace('+0', '')] = res
+    return out
+
+
+# --- Tabla comparativa y figuras ---
+def _filled_store(n, rng):
+    store = ScenarioStore(':memory:')
+    cols = _random_columns(n, rng)
+    results, kpis, _e, _w = calculate_detailed_metrics_batch(cols)
+    store.append_columns([f"Escenario {i + 1}" for i in range(n)], cols, results, kpis)
+    return store
+
+
+def bench_comparison(quick, sizes):
+    from mineria.charts import COMPARISON_FORMAT, build_comparison_frame
+    rng = np.random.default_rng(1)
+    out = {}
+    for n in sizes:
+        store = _filled_store(n, rng)
+        out[f'comparison_read_{n}'] = _timeit(lambda: store.page(0, n), repeat=3)
+        page = store.page(0, n)
+        out[f'comparison_frame_{n}'] = _timeit(lambda: build_comparison_frame(page), repeat=3)
+        df = build_comparison_frame(page)
+        out[f'comparison_style_{n}'] = _timeit(lambda: df.style.format(COMPARISON_FORMAT, na_rep='-').to_html(), repeat=3)
+        store.close()
+    return out
+
+
+def bench_figures(quick, n_bars, n_aggregated):
+    from mineria.charts import (COMPARISON_COLUMNS, build_comparison_bars, build_comparison_frame, build_comparison_histograms,
+                                build_comparison_scatter, build_op_costs_pie, build_waterfall, comparison_metrics)
+    results = calculate_detailed_metrics(**DEFAULT_INPUTS)[0]
+    op_costs = (results['cost_drill_accessories'], results['cost_explosives'], results['cost_loading'],
+                results['cost_hauling'], results['cost_processing'])
+    waterfall = (results['revenue'], -abs(results['total_operational_cost']),
+                 -abs(results['cost_maintenance_fixed'] + results['cost_ga_fixed']), results['operating_profit'])
+    repeat = 3 if quick else 10
+    out = {'figure_pie': _timeit(lambda: build_op_costs_pie(op_costs), repeat=repeat),
+           'figure_waterfall': _timeit(lambda: build_waterfall(waterfall), repeat=repeat)}
+    store = _filled_store(n_bars, np.random.default_rng(2))
+    df = build_comparison_frame(store.page(0, n_bars))
+    out[f'figure_comparison_bars_{n_bars}'] = _timeit(lambda: build_comparison_bars(df), repeat=repeat)
+    store.close()
+    # Vistas agregadas para muchos escenarios: lectura de columnas + histogramas / Scattergl
+    store = _filled_store(n_aggregated, np.random.default_rng(4))
+    out[f'comparison_columns_{n_aggregated}'] = _timeit(lambda: store.column_arrays(COMPARISON_COLUMNS), repeat=3)
+    columns = store.column_arrays(COMPARISON_COLUMNS)
+    metrics = comparison_metrics(columns)
+    out[f'figure_comparison_hist_{n_aggregated}'] = _timeit(lambda: build_comparison_histograms(metrics), repeat=repeat)
+    out[f'figure_comparison_scattergl_{n_aggregated}'] = _timeit(lambda: build_comparison_scatter(columns['id'], metrics), repeat=repeat)
+    store.close()
+    return out
+
+
+# --- App completa (AppTest, sin navegador) ---
+def bench_apptest(quick, n_saved):
+    from streamlit.testing.v1 import AppTest
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['MINERIA_STORE_PATH'] = os.path.join(tmp, 'bench.sqlite')
+        if n_saved: _fill_store_file(os.environ['MINERIA_STORE_PATH'], n_saved)
+        app = os.path.join(ROOT, 'app_mineria3.py')
+        t0 = time.perf_counter()
+        at = AppTest.from_file(app, default_timeout=300).run()
+        out['apptest_first_run'] = {'median_s': time.perf_counter() - t0, 'min_s': time.perf_counter() - t0, 'repeat': 1, 'number': 1}
+        if at.exception: raise RuntimeError(f"La app lanzó una excepción: {at.exception[0].message}")
+        # Re-ejecuciones con un input cambiado (camino típico al mover un widget)
+        values = iter(np.linspace(5.0, 7.0, 20))
+        out['apptest_rerun'] = _timeit(lambda: at.number_input(key="metal_price_in").set_value(float(next(values))).run(),
+                                       repeat=2 if quick else 5)
+        os.environ.pop('MINERIA_STORE_PATH')
+    return out
+
+
+def _fill_store_file(path, n):
+    store = ScenarioStore(path)
+    cols = _random_columns(n, np.random.default_rng(3))
+    results, kpis, _e, _w = calculate_detailed_metrics_batch(cols)
+    store.append_columns([f"Escenario {i + 1}" for i in range(n)], cols, results, kpis)
+    store.close()
+
+
+# --- Comparación con línea base ---
+def compare(current, baseline, threshold):
+    """Filas (nombre, base, actual, razón, regresión) para las mediciones presentes en ambos.
+
+    Se compara el mínimo de las rondas, menos sensible al ruido que la mediana.
+    """
+    rows = []
+    for name, res in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base: continue
+        ratio = res['min_s'] / base['min_s'] if base['min_s'] else float('inf')
+        rows.append((name, base['min_s'], res['min_s'], ratio, ratio > 1.0 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del simulador minero.")
+    parser.add_argument('-o', '--output', help="Archivo JSON de resultados (por defecto: stdout)")
+    parser.add_argument('--baseline', help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--threshold', type=float, default=0.20, help="Empeoramiento relativo tolerado (0.20 = 20%%)")
+    parser.add_argument('--quick', action='store_true', help="Menos repeticiones y tamaños más chicos")
+    parser.add_argument('--max-batch', type=float, default=1e7, help="Mayor tamaño de lote a medir")
+    parser.add_argument('--only', nargs='*', choices=('scalar', 'batch', 'comparison', 'figures', 'apptest'),
+                        help="Solo estos grupos")
+    args = parser.parse_args(argv)
+
+    max_batch = int(min(args.max_batch, 1e5 if args.quick else 1e7))
+    comparison_sizes = (100, 1000) if args.quick else (100, 1000, 10000, 50000)
+    groups = {
+        'scalar': lambda: bench_scalar(args.quick),
+        'batch': lambda: bench_batch(args.quick, max_batch),
+        'comparison': lambda: bench_comparison(args.quick, comparison_sizes),
+        'figures': lambda: bench_figures(args.quick, 50, 5000 if args.quick else 50000),
+        'apptest': lambda: bench_apptest(args.quick, 50),
+    }
+    results = {}
+    for name in args.only or groups:
+        print(f"[bench] {name}...", file=sys.stderr)
+        results.update(groups[name]())
+
+    import pandas as pd
+    import plotly
+    report = {'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                       'numpy': np.__version__, 'pandas': pd.__version__, 'plotly': plotly.__version__,
+                       'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'quick': args.quick},
+              'results': results}
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f: baseline = json.load(f)
+        rows = compare(report, baseline, args.threshold)
+        report['comparison'] = {name: {'baseline_s': b, 'current_s': c, 'ratio': r, 'regression': bool(reg)}
+                                for name, b, c, r, reg in rows}
+        for name, b, c, r, reg in rows:
+            print(f"{name:<34} {b * 1e3:>12.3f} ms -> {c * 1e3:>12.3f} ms  x{r:5.2f}{'  REGRESIÓN' if reg else ''}", file=sys.stderr)
+        if any(row[4] for row in rows): exit_code = 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f: f.write(text + '\n')
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
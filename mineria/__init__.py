@@ -0,0 +1,6 @@
+"""Núcleo de cálculo del Simulador Minero (sin dependencias de UI)."""
+from .model import PARAM_NAMES, DEFAULT_INPUTS, calculate_detailed_metrics
+from .batch import (
+    ERROR_FLAGS, WARNING_FLAGS,
+    calculate_detailed_metrics_batch, decode_flags,
+)
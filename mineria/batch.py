@@ -0,0 +1,222 @@
+"""Motor vectorizado de `calculate_detailed_metrics` sobre arreglos de escenarios.
+
+Evalúa N escenarios de una sola vez con NumPy. Los resultados y KPIs se
+devuelven en columnas (un arreglo por métrica, mismas claves que la versión
+escalar) y los errores/advertencias como máscaras de bits por fila.
+"""
+import numpy as np
+
+from .model import PARAM_NAMES
+
+# --- Bits de Error (mismo orden y texto que las validaciones escalares) ---
+ERR_BLASTED = 1 << 0
+ERR_LOAD_FACTOR = 1 << 1
+ERR_EXPLOSIVE_COST = 1 << 2
+ERR_DRILL_ACC_COST = 1 << 3
+ERR_MINED_TARGET = 1 << 4
+ERR_STRIP_RATIO = 1 << 5
+ERR_PLANT_FEED = 1 << 6
+ERR_CYCLE_TIME = 1 << 7
+ERR_UNEXPECTED = 1 << 8  # p.ej. Tipo de Cambio = 0 (ZeroDivisionError en escalar)
+
+ERROR_FLAGS = (
+    (ERR_BLASTED, "Toneladas Voladas debe ser > 0"),
+    (ERR_LOAD_FACTOR, "Factor Carga Explosivo debe ser > 0"),
+    (ERR_EXPLOSIVE_COST, "Costo Explosivo no puede ser negativo"),
+    (ERR_DRILL_ACC_COST, "Costo Perf.&Acc. no puede ser negativo"),
+    (ERR_MINED_TARGET, "Target Toneladas Minadas debe ser > 0"),
+    (ERR_STRIP_RATIO, "Strip Ratio no puede ser negativo"),
+    (ERR_PLANT_FEED, "Target Alimentación Planta debe ser > 0"),
+    (ERR_CYCLE_TIME, "Tiempo Ciclo Camión debe ser > 0"),
+    (ERR_UNEXPECTED, "Error inesperado en cálculo"),
+)
+
+# --- Bits de Advertencia ---
+WARN_LOAD_CAPACITY = 1 << 0
+WARN_HAUL_CAPACITY = 1 << 1
+WARN_PROCESS_CAPACITY = 1 << 2
+WARN_BLAST_MISMATCH = 1 << 3
+WARN_LOADER_HOURS = 1 << 4
+WARN_TRUCK_HOURS = 1 << 5
+WARN_PLANT_HOURS = 1 << 6
+
+WARNING_FLAGS = (
+    (WARN_LOAD_CAPACITY, "Movido > Cap. Carga"),
+    (WARN_HAUL_CAPACITY, "Movido > Cap. Acarreo"),
+    (WARN_PROCESS_CAPACITY, "Procesado > Cap. Proceso"),
+    (WARN_BLAST_MISMATCH, "Toneladas Voladas != Material Movido Target"),
+    (WARN_LOADER_HOURS, "Hr carga req > disp."),
+    (WARN_TRUCK_HOURS, "Hr acarreo req > disp."),
+    (WARN_PLANT_HOURS, "Hr planta req > disp."),
+)
+
+
+def decode_flags(mask, flags=WARNING_FLAGS):
+    """Traduce una máscara de bits (de una fila) a la lista de mensajes."""
+    mask = int(mask)
+    return [msg for bit, msg in flags if mask & bit]
+
+
+def as_columns(params):
+    """Normaliza los parámetros a un dict nombre -> arreglo float64 de largo N.
+
+    Devuelve (columnas, N). Junto con validation_mask y metrics_columns es la
+    base que comparten el motor, el plan de vida de mina y el goal seek.
+    """
+    if isinstance(params, np.ndarray):
+        if params.ndim != 2 or params.shape[1] != len(PARAM_NAMES):
+            raise ValueError(f"Se esperaba un arreglo (N, {len(PARAM_NAMES)}) en el orden de PARAM_NAMES")
+        cols = {name: params[:, i] for i, name in enumerate(PARAM_NAMES)}
+    else:
+        # dict de arreglos/escalares o DataFrame (acceso por nombre de columna)
+        missing = [name for name in PARAM_NAMES if name not in params]
+        if missing: raise ValueError(f"Faltan parámetros: {', '.join(missing)}")
+        cols = {name: params[name] for name in PARAM_NAMES}
+    cols = {name: np.asarray(value, dtype=np.float64) for name, value in cols.items()}
+    n = max((v.size for v in cols.values() if v.ndim > 0), default=1)
+    return {name: np.broadcast_to(v.reshape(-1) if v.ndim else v, (n,)) for name, v in cols.items()}, n
+
+
+def _safe_div(num, den, cond):
+    """num / den donde cond, 0 en otro caso (equivale a `x / y if cond else 0`)."""
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=cond)
+
+
+def calculate_detailed_metrics_batch(params):
+    """Versión vectorizada de calculate_detailed_metrics.
+
+    `params` puede ser un dict (o DataFrame) con las columnas de PARAM_NAMES,
+    cuyos valores pueden ser escalares o arreglos de largo N, o bien un arreglo
+    (N, 25) en el orden de PARAM_NAMES.
+
+    Devuelve (results, kpis, error_mask, warning_mask): results y kpis son dicts
+    de arreglos de largo N con las mismas claves que la versión escalar (NaN en
+    las filas con error); las máscaras son uint16 (ver ERROR_FLAGS/WARNING_FLAGS).
+    """
+    p, n = as_columns(params)
+    error_mask = validation_mask(p, n)
+    results, kpis, warning_mask = metrics_columns(p, n)
+
+    # Filas con error: sin resultados (la versión escalar devuelve None)
+    failed = error_mask != 0
+    if failed.any():
+        for block in (results, kpis):
+            for key, value in block.items():
+                value = np.array(value, dtype=np.float64)
+                value[failed] = np.nan
+                block[key] = value
+        # La versión escalar conserva las advertencias si falla dentro del try
+        warning_mask[(error_mask & ~np.uint16(ERR_UNEXPECTED)) != 0] = 0
+    return results, kpis, error_mask, warning_mask
+
+
+def validation_mask(p, n):
+    """Validaciones Básicas como máscara de bits (ver ERROR_FLAGS)."""
+    error_mask = np.zeros(n, dtype=np.uint16)
+    error_mask[p['tonnes_blasted_period'] <= 0] |= ERR_BLASTED
+    error_mask[p['load_factor_kg_t'] <= 0] |= ERR_LOAD_FACTOR
+    error_mask[p['explosive_cost_usd_kg'] < 0] |= ERR_EXPLOSIVE_COST
+    error_mask[p['cost_drill_acc_per_t_blasted'] < 0] |= ERR_DRILL_ACC_COST
+    error_mask[p['tonnes_mined_target'] <= 0] |= ERR_MINED_TARGET
+    error_mask[p['strip_ratio'] < 0] |= ERR_STRIP_RATIO
+    error_mask[p['plant_feed_target'] <= 0] |= ERR_PLANT_FEED
+    error_mask[p['avg_cycle_time_min'] <= 0] |= ERR_CYCLE_TIME
+    # La versión escalar no valida el tipo de cambio: con 0 cae en el except
+    error_mask[(error_mask == 0) & (p['exchange_rate'] == 0)] |= ERR_UNEXPECTED
+    return error_mask
+
+
+def capacity_hours(p):
+    """(requeridas, disponibles) de carga, acarreo y planta: los tres recortes min(requerido, disponible)."""
+    actual_total_material_moved = p['tonnes_mined_target'] + p['tonnes_mined_target'] * p['strip_ratio']
+    loader_den = p['loader_rate_tph'] * p['loader_count']
+    truck_den = 60.0 / p['avg_cycle_time_min'] * p['truck_payload'] * p['truck_count']
+    return ((np.where(loader_den > 0, actual_total_material_moved / loader_den, np.inf), p['loader_count'] * p['loader_op_hours_period']),
+            (np.where(truck_den > 0, actual_total_material_moved / truck_den, np.inf), p['truck_count'] * p['truck_op_hours_period']),
+            (np.where(p['plant_throughput_tph'] > 0, p['plant_feed_target'] / p['plant_throughput_tph'], np.inf), p['plant_op_hours_period']))
+
+
+def metrics_columns(p, n):
+    """Cálculo vectorizado sin validar (columnas ya normalizadas con as_columns).
+
+    Devuelve (results, kpis, warning_mask); las filas que no pasarían las
+    validaciones quedan con los valores que den las fórmulas.
+    """
+    warning_mask = np.zeros(n, dtype=np.uint16)
+    results = {}
+    kpis = {}
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # --- Productividad y Capacidad ---
+        (required_loader_hours, total_loader_hours_avail), (required_truck_hours, total_truck_hours_avail), \
+            (required_plant_hours, _plant_hours) = capacity_hours(p)
+        potential_tonnes_loaded = total_loader_hours_avail * p['loader_rate_tph']
+        kpis['potential_tonnes_loaded'] = potential_tonnes_loaded; kpis['total_loader_hours_avail'] = total_loader_hours_avail
+        trips_per_truck_hour = 60.0 / p['avg_cycle_time_min']
+        potential_tonnes_hauled_per_truck_hour = trips_per_truck_hour * p['truck_payload']
+        potential_tonnes_hauled = total_truck_hours_avail * potential_tonnes_hauled_per_truck_hour
+        kpis['potential_tonnes_hauled'] = potential_tonnes_hauled; kpis['total_truck_hours_avail'] = total_truck_hours_avail; kpis['trips_per_truck_hour'] = trips_per_truck_hour; kpis['potential_tph_per_truck'] = potential_tonnes_hauled_per_truck_hour
+        potential_tonnes_processed = p['plant_op_hours_period'] * p['plant_throughput_tph']
+        kpis['potential_tonnes_processed'] = potential_tonnes_processed; kpis['plant_op_hours_period'] = p['plant_op_hours_period'].copy()
+
+        # --- Toneladas Reales ---
+        actual_tonnes_mined = p['tonnes_mined_target']
+        actual_waste_moved = actual_tonnes_mined * p['strip_ratio']
+        actual_total_material_moved = actual_tonnes_mined + actual_waste_moved
+        actual_tonnes_processed = p['plant_feed_target']
+
+        # --- Advertencias de Capacidad ---
+        warning_mask[actual_total_material_moved > potential_tonnes_loaded] |= WARN_LOAD_CAPACITY
+        warning_mask[actual_total_material_moved > potential_tonnes_hauled] |= WARN_HAUL_CAPACITY
+        warning_mask[actual_tonnes_processed > potential_tonnes_processed] |= WARN_PROCESS_CAPACITY
+        warning_mask[~np.isclose(p['tonnes_blasted_period'], actual_total_material_moved)] |= WARN_BLAST_MISMATCH
+
+        # --- Perforación y Voladura ---
+        total_explosive_kg = p['tonnes_blasted_period'] * p['load_factor_kg_t']
+        cost_explosives_total = total_explosive_kg * p['explosive_cost_usd_kg']
+        results['cost_explosives'] = cost_explosives_total
+        kpis['total_explosive_kg'] = total_explosive_kg
+        cost_drill_acc_total = p['tonnes_blasted_period'] * p['cost_drill_acc_per_t_blasted']
+        results['cost_drill_accessories'] = cost_drill_acc_total
+        cost_pv_total = cost_explosives_total + cost_drill_acc_total
+        results['cost_drill_blast_total'] = cost_pv_total
+
+        # --- Carga, Acarreo, Proceso (mismo recorte min(requerido, disponible)) ---
+        actual_loader_hours_used = np.minimum(required_loader_hours, total_loader_hours_avail)
+        warning_mask[required_loader_hours > total_loader_hours_avail] |= WARN_LOADER_HOURS
+        cost_load_total = actual_loader_hours_used * p['cost_load_per_hr']; results['cost_loading'] = cost_load_total; kpis['actual_loader_hours_used'] = actual_loader_hours_used
+
+        actual_truck_hours_used = np.minimum(required_truck_hours, total_truck_hours_avail)
+        warning_mask[required_truck_hours > total_truck_hours_avail] |= WARN_TRUCK_HOURS
+        cost_haul_total = actual_truck_hours_used * p['cost_haul_per_hr']; results['cost_hauling'] = cost_haul_total; kpis['actual_truck_hours_used'] = actual_truck_hours_used
+
+        actual_plant_hours_used = np.minimum(required_plant_hours, p['plant_op_hours_period'])
+        warning_mask[required_plant_hours > p['plant_op_hours_period']] |= WARN_PLANT_HOURS
+        cost_process_total = actual_plant_hours_used * p['cost_process_per_hr']; results['cost_processing'] = cost_process_total; kpis['actual_plant_hours_used'] = actual_plant_hours_used
+
+        # --- Costos Fijos ---
+        results['cost_maintenance_fixed'] = p['cost_maint_fixed'].copy()
+        results['cost_ga_fixed'] = p['cost_ga_fixed'].copy()
+
+        # --- Costo Total y Unitarios ---
+        total_operational_cost = cost_pv_total + cost_load_total + cost_haul_total + cost_process_total
+        total_cost = total_operational_cost + p['cost_maint_fixed'] + p['cost_ga_fixed']
+        results['total_operational_cost'] = total_operational_cost
+        results['total_cost'] = total_cost
+        results['cost_per_tonne_mined'] = _safe_div(total_cost, actual_tonnes_mined, actual_tonnes_mined != 0)
+        results['cost_per_tonne_processed'] = _safe_div(total_cost, actual_tonnes_processed, actual_tonnes_processed != 0)
+        kpis['cost_per_total_tonne_moved'] = _safe_div(total_cost, actual_total_material_moved, actual_total_material_moved != 0)
+
+        # --- Ingresos y Rentabilidad ---
+        grade_decimal = p['grade_pct'] / 100.0; recovery_decimal = p['recovery_pct'] / 100.0
+        metal_produced_units = actual_tonnes_processed * grade_decimal * recovery_decimal
+        revenue = metal_produced_units * p['metal_price'] / p['exchange_rate']
+        results['revenue'] = revenue; results['metal_produced_units'] = metal_produced_units
+        operating_profit = revenue - total_cost
+        results['operating_profit'] = operating_profit
+        results['profit_per_tonne_processed'] = _safe_div(operating_profit, actual_tonnes_processed, actual_tonnes_processed != 0)
+
+        # --- KPIs Operativos Adicionales ---
+        kpis['actual_tonnes_per_truck_hr'] = _safe_div(actual_total_material_moved, actual_truck_hours_used, actual_truck_hours_used > 0)
+        kpis['actual_tonnes_per_loader_hr'] = _safe_div(actual_total_material_moved, actual_loader_hours_used, actual_loader_hours_used > 0)
+        kpis['actual_tph_plant'] = _safe_div(actual_tonnes_processed, actual_plant_hours_used, actual_plant_hours_used > 0)
+    return results, kpis, warning_mask
@@ -0,0 +1,177 @@
+"""Modelo de bloques: curvas ley-tonelaje y ley de corte óptima.
+
+Un modelo de bloques (CSV, Parquet o .npy estructurado) con tonelaje, ley (%)
+y marca mineral/estéril se ingiere una sola vez, por bloques, a un directorio
+de caché con arreglos binarios que luego se abren como memoria mapeada. En la
+misma pasada se ordenan los bloques de mineral por ley (descendente) y se
+guardan las sumas acumuladas de tonelaje y metal, de modo que para cualquier
+ley de corte el tonelaje de mineral, la ley media y el strip ratio salen de una
+búsqueda binaria, sin volver a leer el archivo ni re-ordenar.
+"""
+import json
+import os
+
+import numpy as np
+
+from .batch import WARN_HAUL_CAPACITY, WARN_LOAD_CAPACITY, calculate_detailed_metrics_batch
+from .model import PARAM_NAMES
+
+_CACHE_VERSION = 1
+_ARRAYS = ('grade_desc', 'cum_tonnes', 'cum_metal')
+
+
+def _source_signature(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def _iter_source_chunks(path, columns, chunk_rows):
+    """Itera (tonelaje, ley, es_mineral) por bloques desde CSV, Parquet o .npy."""
+    tonnage_col, grade_col, ore_col = columns
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        data = np.load(path, mmap_mode='r')
+        names = data.dtype.names or ()
+        if not names: raise ValueError("El .npy debe ser un arreglo estructurado (con nombres de columna)")
+        missing = [c for c in (tonnage_col, grade_col) if c not in names]
+        if missing: raise ValueError(f"Columnas ausentes en el modelo de bloques: {', '.join(missing)} (disponibles: {', '.join(names)})")
+        for start in range(0, len(data), chunk_rows):
+            part = data[start:start + chunk_rows]
+            ore = part[ore_col] if ore_col in names else np.ones(len(part), dtype=bool)
+            yield part[tonnage_col], part[grade_col], ore
+        return
+    import pandas as pd  # import diferido: solo para leer CSV/Parquet
+    if ext == '.parquet':
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        wanted = [c for c in (tonnage_col, grade_col, ore_col) if c in pf.schema_arrow.names]
+        frames = (batch.to_pandas() for batch in pf.iter_batches(batch_size=chunk_rows, columns=wanted))
+    elif ext in ('.csv', '.txt'):
+        frames = pd.read_csv(path, chunksize=chunk_rows)
+    else:
+        raise ValueError(f"Formato de modelo de bloques no soportado: {ext} (use .csv, .parquet o .npy)")
+    for df in frames:
+        ore = df[ore_col].to_numpy() if ore_col in df.columns else np.ones(len(df), dtype=bool)
+        yield df[tonnage_col].to_numpy(), df[grade_col].to_numpy(), ore
+
+
+def _ore_flag(values):
+    """Marca mineral desde bool/0-1 o texto ('ore'/'mineral'/'waste'/'esteril')."""
+    values = np.asarray(values)
+    if values.dtype.kind in 'OUS':
+        return np.isin(np.char.lower(values.astype(str)), ('ore', 'mineral', '1', 'true', 'm'))
+    return values.astype(bool)
+
+
+class BlockModel:
+    """Modelo de bloques con índice ordenado persistido y abierto como memmap."""
+
+    def __init__(self, cache_dir, meta):
+        self.cache_dir = cache_dir
+        self.meta = meta
+        n = meta['n_ore_blocks']
+        self.grade_desc, self.cum_tonnes, self.cum_metal = (
+            np.memmap(os.path.join(cache_dir, name + '.f64'), dtype=np.float64, mode='r', shape=(n,)) if n else np.zeros(0)
+            for name in _ARRAYS)
+        self.total_tonnes = meta['total_tonnes']
+
+    @classmethod
+    def load(cls, path, cache_dir=None, tonnage_col='tonnage', grade_col='grade', ore_col='is_ore',
+             chunk_rows=1_000_000):
+        """Abre el modelo de bloques, ingiriéndolo al caché solo si cambió el archivo."""
+        cache_dir = cache_dir or path + '.bm'
+        meta_path = os.path.join(cache_dir, 'meta.json')
+        signature = _source_signature(path)
+        columns = [tonnage_col, grade_col, ore_col]
+        if os.path.exists(meta_path):
+            with open(meta_path) as f: meta = json.load(f)
+            if meta.get('version') == _CACHE_VERSION and meta.get('source') == signature and meta.get('columns') == columns:
+                return cls(cache_dir, meta)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # 1) Pasada única por bloques: tonelaje y ley de los bloques de mineral a disco
+        raw_t, raw_g = os.path.join(cache_dir, 'ore_tonnes.raw'), os.path.join(cache_dir, 'ore_grade.raw')
+        total_tonnes = 0.0
+        n_blocks = 0
+        with open(raw_t, 'wb') as ft, open(raw_g, 'wb') as fg:
+            for tonnage, grade, ore in _iter_source_chunks(path, columns, chunk_rows):
+                tonnage = np.asarray(tonnage, dtype=np.float64); grade = np.asarray(grade, dtype=np.float64)
+                total_tonnes += float(tonnage.sum()); n_blocks += len(tonnage)
+                mask = _ore_flag(ore)
+                tonnage[mask].tofile(ft); grade[mask].tofile(fg)
+        n_ore = os.path.getsize(raw_g) // 8
+
+        # 2) Orden por ley descendente y sumas acumuladas (se hace una sola vez)
+        if n_ore:
+            grade = np.fromfile(raw_g, dtype=np.float64)
+            order = np.argsort(-grade, kind='stable')
+            grade = grade[order]
+            grade.tofile(os.path.join(cache_dir, 'grade_desc.f64'))
+            tonnes = np.fromfile(raw_t, dtype=np.float64)[order]
+            del order
+            np.cumsum(tonnes * grade / 100.0).tofile(os.path.join(cache_dir, 'cum_metal.f64'))
+            np.cumsum(tonnes).tofile(os.path.join(cache_dir, 'cum_tonnes.f64'))
+        os.remove(raw_t); os.remove(raw_g)
+
+        meta = {'version': _CACHE_VERSION, 'source': signature, 'columns': columns,
+                'n_blocks': n_blocks, 'n_ore_blocks': int(n_ore), 'total_tonnes': total_tonnes}
+        with open(meta_path, 'w') as f: json.dump(meta, f)
+        return cls(cache_dir, meta)
+
+    # --- Curvas Ley-Tonelaje ---
+    def grade_tonnage(self, cutoffs):
+        """Para cada ley de corte (%): tonelaje de mineral, metal, ley media (%) y strip ratio."""
+        cutoffs = np.atleast_1d(np.asarray(cutoffs, dtype=np.float64))
+        # N° de bloques con ley >= corte: búsqueda sobre la vista invertida (ascendente) del
+        # índice ordenado, sin copiar ni recorrer el memmap
+        k = len(self.grade_desc) - np.searchsorted(self.grade_desc[::-1], cutoffs, side='left')
+        idx = np.clip(k - 1, 0, None)
+        has = (k > 0) & (len(self.cum_tonnes) > 0)
+        ore = np.where(has, self.cum_tonnes[idx] if len(self.cum_tonnes) else 0.0, 0.0)
+        metal = np.where(has, self.cum_metal[idx] if len(self.cum_metal) else 0.0, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            head_grade = np.where(ore > 0, metal / ore * 100.0, 0.0)
+            strip = np.where(ore > 0, (self.total_tonnes - ore) / ore, np.inf)
+        return {'cutoff': cutoffs, 'ore_tonnes': ore, 'metal': metal, 'head_grade_pct': head_grade,
+                'waste_tonnes': self.total_tonnes - ore, 'strip_ratio': strip}
+
+    def cutoff_grid(self, n=200):
+        """Grilla de leyes de corte entre 0 y la ley máxima de mineral."""
+        top = float(self.grade_desc[0]) if len(self.grade_desc) else 0.0
+        return np.linspace(0.0, top, n)
+
+
+def inputs_for_cutoff(inputs, curve):
+    """Inputs del modelo (columnas) con ley de cabeza y strip ratio de cada ley de corte.
+
+    Las toneladas voladas se igualan al material movido (mineral + estéril).
+    """
+    n = len(curve['cutoff'])
+    cols = {name: np.full(n, float(inputs[name])) for name in PARAM_NAMES}
+    cols['grade_pct'] = curve['head_grade_pct']
+    cols['strip_ratio'] = curve['strip_ratio']
+    cols['tonnes_blasted_period'] = cols['tonnes_mined_target'] * (1.0 + curve['strip_ratio'])
+    return cols
+
+
+def optimal_cutoff(block_model, inputs, cutoffs=None, respect_capacity=True):
+    """Ley de corte que maximiza el margen total del pit, evaluado en lote.
+
+    Margen del pit = margen operativo por periodo * periodos para agotar el
+    mineral (ore_tonnes / tonnes_mined_target). Con `respect_capacity` se
+    descartan las leyes de corte cuyo material movido excede la capacidad de
+    carga o acarreo. Devuelve (mejor, curva) donde `curva` agrega
+    'operating_profit', 'pit_profit', 'n_periods' y 'feasible'; `mejor` es None
+    si ninguna ley de corte factible deja margen positivo.
+    """
+    curve = block_model.grade_tonnage(block_model.cutoff_grid() if cutoffs is None else cutoffs)
+    results, _kpis, error_mask, warning_mask = calculate_detailed_metrics_batch(inputs_for_cutoff(inputs, curve))
+    feasible = (curve['ore_tonnes'] > 0) & np.isfinite(curve['strip_ratio']) & (error_mask == 0)
+    if respect_capacity: feasible &= (warning_mask & (WARN_LOAD_CAPACITY | WARN_HAUL_CAPACITY)) == 0
+    profit = np.where(feasible, results['operating_profit'], np.nan)
+    n_periods = curve['ore_tonnes'] / float(inputs['tonnes_mined_target'])
+    curve.update(operating_profit=profit, n_periods=n_periods, pit_profit=profit * n_periods, feasible=feasible)
+    if not np.any(curve['pit_profit'] > 0): return None, curve
+    i = int(np.nanargmax(curve['pit_profit']))
+    best = {key: float(values[i]) for key, values in curve.items() if key != 'feasible'}
+    return best, curve
@@ -0,0 +1,89 @@
+"""Capa de cálculo memoizada para las re-ejecuciones de Streamlit.
+
+Streamlit vuelve a correr todo el script en cada cambio de widget. `CachedModel`
+guarda el resultado completo por hash de inputs y, además, memoiza cada sección
+del modelo (voladura, carga, acarreo, proceso, ingresos) por el valor de sus
+dependencias: si solo cambia `metal_price`, únicamente se recalcula la sección
+de ingresos y el ensamblado final. Las figuras se memoizan igual, por los
+valores que dibujan; los juegos de figuras comparativos (muchos escenarios,
+pesados) van en una caché aparte y más chica, por hash del conjunto.
+"""
+from collections import OrderedDict
+
+from .model import PARAM_NAMES, SECTIONS, evaluate_sections, resolve_dependencies
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Caché LRU acotada con contadores de aciertos/fallos."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get_or_compute(self, key, compute):
+        value = self._data.get(key, _MISSING)
+        if value is not _MISSING:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        self._data[key] = value
+        if len(self._data) > self.maxsize: self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CachedModel:
+    """Evaluación incremental de calculate_detailed_metrics con cachés LRU."""
+
+    def __init__(self, maxsize=128, figure_sets_maxsize=8):
+        self.results = LRUCache(maxsize)
+        self.sections = {name: LRUCache(maxsize) for name in SECTIONS}
+        self.figures = LRUCache(maxsize)
+        self.figure_sets = LRUCache(figure_sets_maxsize)
+        self.last_recomputed = []  # secciones recalculadas en la última evaluación
+
+    def _run_section(self, name, fn, p, outputs):
+        args = tuple(resolve_dependencies(SECTIONS[name][1], p, outputs))
+
+        def compute():
+            self.last_recomputed.append(name)
+            return fn(*args)
+        return self.sections[name].get_or_compute(args, compute)
+
+    def evaluate(self, inputs):
+        """Igual que calculate_detailed_metrics(**inputs), reutilizando lo ya calculado."""
+        key = tuple(inputs[name] for name in PARAM_NAMES)
+        self.last_recomputed = []
+        p = dict(zip(PARAM_NAMES, key))
+        results, kpis, errors, warnings = self.results.get_or_compute(key, lambda: evaluate_sections(p, self._run_section))
+        # Copias superficiales: el llamador no debe poder alterar lo cacheado
+        return (dict(results) if results is not None else None, dict(kpis) if kpis is not None else None,
+                list(errors), list(warnings))
+
+    def figure(self, name, data_key, build):
+        """Devuelve la figura `name` cacheada por `data_key` (valores que dibuja)."""
+        return self.figures.get_or_compute((name, data_key), build)
+
+    def figure_set(self, name, data_key, build):
+        """Como figure(), para listas de figuras de muchos escenarios (p.ej. por hash del conjunto y filtros)."""
+        return self.figure_sets.get_or_compute((name, data_key), build)
+
+    def stats(self):
+        """Aciertos/fallos por caché (para diagnóstico)."""
+        caches = {'results': self.results, 'figures': self.figures, 'figure_sets': self.figure_sets}
+        caches.update(('section.' + name, cache) for name, cache in self.sections.items())
+        return {name: {'hits': c.hits, 'misses': c.misses, 'size': len(c)} for name, c in caches.items()}
+
+    def clear(self):
+        for cache in (self.results, self.figures, self.figure_sets, *self.sections.values()): cache.clear()
@@ -0,0 +1,152 @@
+"""Tablas y figuras de la interfaz (requiere pandas y plotly, como la app).
+
+Separadas de app_mineria3.py para poder construirlas y medirlas sin levantar
+Streamlit (ver benchmarks/bench.py).
+
+Los gráficos comparativos tienen tres vistas: barras (una por escenario, para
+pocos escenarios o el top-N), histogramas agregados en el servidor (al
+navegador solo viajan los contenedores) y dispersión WebGL (Scattergl) con
+todos los puntos.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Gráficos de barras comparativos: (columna, título, formato del texto, etiquetas)
+COMPARISON_BARS = (
+    ('Margen Operativo ($)', 'Comparación Margen Operativo', '.2s', None),
+    ('Costo / t Proc. ($/t)', 'Comparación Costo / t Procesada', '.2f', None),
+    ('Costo P&V / t Volada ($/t)', 'Comparación Costo P&V / t Volada', '.2f', {'Costo P&V / t Volada ($/t)': 'Costo P&V (S/./t)'}),
+    ('Factor Carga (kg/t)', 'Comparación Factor de Carga', '.2f', {'Factor Carga (kg/t)': 'Factor Carga (kg/t)'}),
+    ('Ton / hr Camión (t/hr)', 'Comparación Prod. Camiones', '.1f', None),
+    ('Ton / hr Planta (t/hr)', 'Comparación Prod. Planta', '.1f', None),
+)
+
+# Columnas del almacén que necesitan las vistas agregadas
+COMPARISON_COLUMNS = ('id', 'operating_profit', 'cost_per_tonne_processed', 'cost_explosives_total', 'cost_drill_acc_total',
+                      'tonnes_blasted_period', 'load_factor_kg_t', 'actual_tonnes_per_truck_hr', 'actual_tph_plant')
+# Sobre esta cantidad de escenarios las barras (una por escenario) dejan de ser legibles
+BAR_LIMIT = 100
+# Vistas de los gráficos comparativos (etiquetas del selector de la app)
+VIEW_AUTO, VIEW_BARS, VIEW_HIST, VIEW_SCATTER = "Automática", "Barras (Top-N)", "Histogramas", "Dispersión (WebGL)"
+COMPARISON_VIEWS = (VIEW_AUTO, VIEW_BARS, VIEW_HIST, VIEW_SCATTER)
+
+# Formato de la tabla comparativa
+COMPARISON_FORMAT = {
+    "Margen Operativo ($)": "S/. {:,.0f}",
+    "Costo / t Proc. ($/t)": "S/. {:,.2f}",
+    "Costo P&V / t Volada ($/t)": "S/. {:,.2f}",
+    "Factor Carga (kg/t)": "{:.2f}",
+    "Ton / hr Camión (t/hr)": "{:,.1f}",
+    "Ton / hr Planta (t/hr)": "{:,.1f}",
+    "Precio Metal ($)": "S/. {:,.2f}",
+}
+
+
+def build_comparison_frame(page):
+    """Tabla comparativa a partir de una página del almacén (columnas, sin bucle por fila)."""
+    sc = pd.DataFrame(page)
+    # Calcular Costo P&V total / t volada para mostrar
+    pv_cost = sc['cost_explosives_total'].fillna(0) + sc['cost_drill_acc_total'].fillna(0)
+    ton_blasted = sc['tonnes_blasted_period'].fillna(0)
+    pv_cost_per_ton_blasted = (pv_cost / ton_blasted.where(ton_blasted != 0)).fillna(0)
+    return pd.DataFrame({
+        "Escenario": sc['name'],
+        "Margen Operativo ($)": sc['operating_profit'],
+        "Costo / t Proc. ($/t)": sc['cost_per_tonne_processed'],
+        "Costo P&V / t Volada ($/t)": pv_cost_per_ton_blasted, # Nueva Métrica
+        "Factor Carga (kg/t)": sc['load_factor_kg_t'], # Nuevo Input
+        "Ton / hr Camión (t/hr)": sc['actual_tonnes_per_truck_hr'],
+        "Ton / hr Planta (t/hr)": sc['actual_tph_plant'],
+        "Precio Metal ($)": sc['metal_price'],
+    })
+
+
+def comparison_metrics(columns):
+    """Las seis métricas de COMPARISON_BARS como arreglos, desde column_arrays(COMPARISON_COLUMNS)."""
+    pv_cost = np.nan_to_num(columns['cost_explosives_total']) + np.nan_to_num(columns['cost_drill_acc_total'])
+    ton_blasted = np.nan_to_num(columns['tonnes_blasted_period'])
+    pv_cost_per_ton_blasted = np.divide(pv_cost, ton_blasted, out=np.zeros_like(pv_cost), where=ton_blasted != 0)
+    values = (columns['operating_profit'], columns['cost_per_tonne_processed'], pv_cost_per_ton_blasted,
+              columns['load_factor_kg_t'], columns['actual_tonnes_per_truck_hr'], columns['actual_tph_plant'])
+    return {spec[0]: np.asarray(v, dtype=np.float64) for spec, v in zip(COMPARISON_BARS, values)}
+
+
+def build_comparison_histograms(metrics, bins=40):
+    """Histograma por métrica, agrupado con NumPy (la figura trae `bins` barras, no N puntos)."""
+    figs = []
+    for column, title, _text_auto, labels in COMPARISON_BARS:
+        values = metrics[column][np.isfinite(metrics[column])]
+        counts, edges = np.histogram(values, bins=bins) if len(values) else (np.zeros(0), np.zeros(1))
+        fig = go.Figure(go.Bar(x=0.5 * (edges[:-1] + edges[1:]), y=counts, width=np.diff(edges),
+                               customdata=np.column_stack([edges[:-1], edges[1:]]) if len(counts) else None,
+                               hovertemplate="%{customdata[0]:,.4g} – %{customdata[1]:,.4g}: %{y:,} escenarios<extra></extra>"))
+        fig.update_layout(title=f"{title} (distribución de {len(values):,} escenarios)", bargap=0.02,
+                          xaxis_title=(labels or {}).get(column, column), yaxis_title="N° Escenarios")
+        figs.append(fig)
+    return figs
+
+
+def build_comparison_scatter(ids, metrics):
+    """Dispersión WebGL por métrica: un punto por escenario (x = id de guardado)."""
+    figs = []
+    for column, title, _text_auto, labels in COMPARISON_BARS:
+        fig = go.Figure(go.Scattergl(x=ids, y=metrics[column], mode='markers', marker=dict(size=3, opacity=0.6),
+                                     hovertemplate="Escenario #%{x}: %{y:,.4g}<extra></extra>"))
+        fig.update_layout(title=title, xaxis_title="Escenario (orden de guardado)", yaxis_title=(labels or {}).get(column, column))
+        figs.append(fig)
+    return figs
+
+
+def resolve_comparison_view(view, n_scenarios, top_n):
+    """(vista, top-N) efectivos: 'Automática' grafica todos como barras hasta BAR_LIMIT y si no, histogramas."""
+    if view != VIEW_AUTO: return view, top_n
+    return (VIEW_BARS, n_scenarios) if n_scenarios <= BAR_LIMIT else (VIEW_HIST, top_n)
+
+
+def comparison_view_key(set_hash, filters, view, top_n, order_by, descending):
+    """Clave del juego de figuras comparativas: conjunto guardado, filtros, vista (y orden/top-N de las barras)."""
+    return (set_hash, tuple(sorted(filters.items())), view, (top_n, order_by, descending) if view == VIEW_BARS else None)
+
+
+def build_comparison_view(store, view, filters, top_n, order_by, descending):
+    """Figuras comparativas de la vista ya resuelta, leyendo del almacén solo lo que necesita."""
+    if view == VIEW_BARS:
+        top_page = store.page(limit=top_n, order_by=order_by, descending=descending, filters=filters)
+        return build_comparison_bars(build_comparison_frame(top_page)) if len(top_page['id']) > 1 else []
+    columns = store.column_arrays(COMPARISON_COLUMNS, filters=filters)
+    if view == VIEW_HIST: return build_comparison_histograms(comparison_metrics(columns))
+    return build_comparison_scatter(columns['id'], comparison_metrics(columns))
+
+
+def build_comparison_bars(df_comparison):
+    """Los seis gráficos de barras comparativos, en el orden de COMPARISON_BARS.
+
+    Mismo resultado que px.bar(..., text_auto=..., labels=...) armado con
+    go.Bar, sin el costo de plotly.express (se arma en cada cambio de página).
+    """
+    figs = []
+    for column, title, text_auto, labels in COMPARISON_BARS:
+        fig = go.Figure(go.Bar(x=df_comparison['Escenario'], y=df_comparison[column], texttemplate=f"%{{y:{text_auto}}}",
+                               hovertemplate=f"Escenario=%{{x}}<br>{(labels or {}).get(column, column)}=%{{y}}<extra></extra>"))
+        fig.update_layout(title=title, xaxis_title='Escenario', yaxis_title=(labels or {}).get(column, column), barmode='relative')
+        figs.append(fig)
+    return figs
+
+
+def build_op_costs_pie(values):
+    """Torta de costos operacionales variables (None si no hay costos > 0)."""
+    cost_op_data = {'Componente': ['Perf. & Acc.', 'Explosivos', 'Carga', 'Acarreo', 'Procesamiento'], 'Valor': list(values)}
+    df_op_costs = pd.DataFrame(cost_op_data).query("Valor > 0")
+    if df_op_costs.empty: return None
+    fig_op_costs = px.pie(df_op_costs, values='Valor', names='Componente', title='Costos Operacionales Variables', hole=0.3)
+    fig_op_costs.update_traces(textposition='inside', textinfo='percent+label')
+    return fig_op_costs
+
+
+def build_waterfall(values):
+    """Cascada Ingresos -> Margen Operativo."""
+    waterfall_data = {'Concepto': ['Ingresos', 'Costo Operacional', 'Costos Fijos (M&GA)', 'Margen Operativo'], 'Valor': list(values)}
+    df_waterfall = pd.DataFrame(waterfall_data); fig_waterfall = go.Figure(go.Waterfall(name="Rentabilidad", orientation="v", measure=["absolute", "relative", "relative", "total"], x=df_waterfall['Concepto'], y=df_waterfall['Valor'], textposition="outside", increasing={"marker": {"color": "green"}}, decreasing={"marker": {"color": "red"}}, totals={"marker": {"color": "blue"}} )); fig_waterfall.update_layout(title="Ingresos -> Margen Operativo", showlegend=False)
+    return fig_waterfall
@@ -0,0 +1,103 @@
+"""CLI para evaluar un archivo de escenarios sin la interfaz Streamlit.
+
+Uso:
+    python -m mineria escenarios.csv -o resultados.parquet --workers 8
+
+Cada fila del archivo de entrada es un escenario con columnas de PARAM_NAMES
+(las que falten se completan con DEFAULT_INPUTS). La salida agrega los
+resultados, KPIs y las máscaras de error/advertencia de cada fila.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import ERROR_FLAGS, WARNING_FLAGS, calculate_detailed_metrics_batch, decode_flags
+from .model import DEFAULT_INPUTS, PARAM_NAMES
+
+
+def _evaluate_chunk(columns):
+    """Evalúa un bloque (dict nombre -> arreglo) y devuelve las columnas de salida."""
+    results, kpis, error_mask, warning_mask = calculate_detailed_metrics_batch(columns)
+    out = dict(results)
+    out.update((key, value) for key, value in kpis.items() if key not in out and key not in columns)
+    out['error_mask'] = error_mask
+    out['warning_mask'] = warning_mask
+    return out
+
+
+def evaluate_columns(columns, n_rows, workers=None, chunk_size=200_000):
+    """Evalúa columnas de escenarios repartiendo bloques en un pool de procesos."""
+    bounds = [(start, min(start + chunk_size, n_rows)) for start in range(0, n_rows, chunk_size)]
+    chunks = ({name: col[a:b] for name, col in columns.items()} for a, b in bounds)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(bounds) <= 1:
+        parts = [_evaluate_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as pool:
+            parts = list(pool.map(_evaluate_chunk, chunks))
+    if not parts: return {}
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+def _read_table(path):
+    import pandas as pd  # import diferido: mantiene rápido el arranque del módulo
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet': return pd.read_parquet(path)
+    if ext in ('.csv', '.txt'): return pd.read_csv(path)
+    raise ValueError(f"Formato de entrada no soportado: {ext} (use .csv o .parquet)")
+
+
+def _write_table(df, path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet': df.to_parquet(path, index=False)
+    elif ext in ('.csv', '.txt'): df.to_csv(path, index=False)
+    else: raise ValueError(f"Formato de salida no soportado: {ext} (use .csv o .parquet)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m mineria', description="Evalúa escenarios mineros en lote (CSV/Parquet).")
+    parser.add_argument('input', help="Archivo de escenarios (.csv o .parquet), una fila por escenario")
+    parser.add_argument('-o', '--output', required=True, help="Archivo de resultados (.csv o .parquet)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Procesos del pool (por defecto: n° de CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=200_000, help="Filas por bloque enviado a cada proceso")
+    parser.add_argument('--messages', action='store_true', help="Agregar columnas de texto 'errors' y 'warnings'")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    t0 = time.perf_counter()
+    try:
+        df = _read_table(args.input)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"Error leyendo {args.input}: {e}", file=sys.stderr)
+        return 1
+
+    missing = [name for name in PARAM_NAMES if name not in df.columns]
+    if missing: print(f"Columnas ausentes, se usan valores por defecto: {', '.join(missing)}", file=sys.stderr)
+    columns = {name: (df[name].to_numpy(dtype=np.float64) if name in df.columns else np.full(len(df), float(DEFAULT_INPUTS[name])))
+               for name in PARAM_NAMES}
+
+    out = evaluate_columns(columns, len(df), workers=args.workers, chunk_size=args.chunk_size)
+    # Las salidas reemplazan columnas homónimas del archivo (p.ej. resultados de una corrida anterior);
+    # solo se conservan los inputs
+    for key, value in out.items():
+        if key not in PARAM_NAMES: df[key] = value
+    if args.messages and out:
+        # Se decodifica una vez por máscara distinta, no por fila
+        for col, mask_key, flags in (('errors', 'error_mask', ERROR_FLAGS), ('warnings', 'warning_mask', WARNING_FLAGS)):
+            uniq, inverse = np.unique(out[mask_key], return_inverse=True)
+            df[col] = np.array(['; '.join(decode_flags(m, flags)) for m in uniq], dtype=object)[inverse]
+
+    try:
+        _write_table(df, args.output)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"Error escribiendo {args.output}: {e}", file=sys.stderr)
+        return 1
+    n_err = int((out.get('error_mask', np.zeros(0)) != 0).sum())
+    print(f"{len(df):,} escenarios evaluados ({n_err:,} con error) en {time.perf_counter() - t0:.2f} s -> {args.output}", file=sys.stderr)
+    return 0
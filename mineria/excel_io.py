@@ -0,0 +1,156 @@
+"""Importación y exportación de libros Excel de escenarios (openpyxl en streaming).
+
+El libro de entrada tiene una fila por escenario y encabezados con las claves
+del escenario guardado (`name` y PARAM_NAMES, o sus etiquetas de la barra
+lateral); las columnas de resultados que traiga se ignoran y se recalculan. Se
+lee en modo solo lectura y se procesa por bloques: cada bloque se valida y se
+evalúa con el motor vectorizado y se anexa al almacén en una transacción. La
+exportación recorre el almacén por bloques y escribe en modo solo escritura,
+con todos los resultados, KPIs, errores y advertencias. La memoria usada no
+depende del tamaño del libro.
+"""
+import numpy as np
+import openpyxl
+
+from .batch import ERROR_FLAGS, WARNING_FLAGS, calculate_detailed_metrics_batch, decode_flags
+from .model import DEFAULT_INPUTS, PARAM_LABELS, PARAM_NAMES
+
+SHEET_NAME = 'Escenarios'
+_HEADER_ALIASES = {label.lower(): name for name, label in PARAM_LABELS.items()}
+_HEADER_ALIASES.update({name.lower(): name for name in PARAM_NAMES}, name='name', escenario='name', nombre='name')
+
+
+def _to_float(values):
+    """Columna de celdas -> float64 (vacías, no numéricas o booleanas quedan en NaN)."""
+    # VERDADERO/FALSO no es una cantidad: se descarta antes de convertir (np.array lo pasaría a 1.0/0.0)
+    values = [None if isinstance(v, bool) else v for v in values]
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try: out[i] = float(v)
+            except (TypeError, ValueError): pass
+        return out
+
+
+def read_scenario_book(source, chunk_rows=20_000, sheet=None):
+    """Genera (info, bloque) leyendo el libro en modo solo lectura.
+
+    `bloque` es un dict con 'row' (n° de fila en Excel), 'name' y una columna
+    float64 por cada nombre de PARAM_NAMES; los inputs que no traiga el libro
+    se completan con DEFAULT_INPUTS y se informan en `info['missing']`.
+    """
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else (wb[SHEET_NAME] if SHEET_NAME in wb.sheetnames else wb.worksheets[0])
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None: raise ValueError("El libro está vacío")
+        index = {}
+        for i, cell in enumerate(header):
+            key = _HEADER_ALIASES.get(str(cell).strip().lower()) if cell is not None else None
+            if key and key not in index: index[key] = i
+        if not any(name in index for name in PARAM_NAMES):
+            raise ValueError("El encabezado no tiene ninguna columna de inputs del escenario")
+        info = {'missing': [name for name in PARAM_NAMES if name not in index], 'columns': len(header)}
+
+        def flush(buffer):
+            # buffer: (n° de fila en Excel, valores); las filas vacías saltadas no corren la numeración
+            n = len(buffer)
+            chunk = {'row': np.array([row_number for row_number, _r in buffer], dtype=np.int64)}
+            buffer = [r for _row_number, r in buffer]
+            name_i = index.get('name')
+            chunk['name'] = [(str(r[name_i]) if name_i is not None and name_i < len(r) and r[name_i] is not None
+                              else f"Importado {row_number}") for row_number, r in zip(chunk['row'], buffer)]
+            for name in PARAM_NAMES:
+                i = index.get(name)
+                chunk[name] = (_to_float([r[i] if i < len(r) else None for r in buffer]) if i is not None
+                               else np.full(n, float(DEFAULT_INPUTS[name])))
+            return chunk
+
+        buffer = []
+        for row_number, row in enumerate(rows, start=2):  # en solo lectura los huecos llegan como filas de None
+            if row is None or all(v is None for v in row): continue  # filas vacías
+            buffer.append((row_number, row))
+            if len(buffer) >= chunk_rows:
+                yield info, flush(buffer)
+                buffer = []
+        if buffer: yield info, flush(buffer)
+    finally:
+        wb.close()
+
+
+def import_scenario_book(source, store, chunk_rows=20_000, max_reported=100, owner=None):
+    """Valida, evalúa en lote y anexa al almacén los escenarios del libro.
+
+    Las filas con celdas vacías/no numéricas o que no pasan las validaciones
+    del modelo no se importan. Devuelve un resumen: filas leídas, importadas,
+    inválidas, inputs completados por defecto y el detalle de las primeras
+    `max_reported` filas rechazadas. `owner`: dueño de los escenarios
+    importados (ver ScenarioStore.clear).
+    """
+    summary = {'rows': 0, 'imported': 0, 'invalid': 0, 'missing': [], 'rejected': []}
+    for info, chunk in read_scenario_book(source, chunk_rows=chunk_rows):
+        summary['missing'] = info['missing']
+        params = {name: chunk[name] for name in PARAM_NAMES}
+        results, kpis, error_mask, _w = calculate_detailed_metrics_batch(params)
+        non_numeric = np.zeros(len(chunk['row']), dtype=bool)
+        for name in PARAM_NAMES: non_numeric |= np.isnan(params[name])
+        valid = (error_mask == 0) & ~non_numeric
+        summary['rows'] += len(valid)
+        bad = np.nonzero(~valid)[0]
+        for i in bad[:max(max_reported - len(summary['rejected']), 0)]:
+            messages = [f"Valor vacío o no numérico en {name}" for name in PARAM_NAMES if np.isnan(params[name][i])]
+            messages += decode_flags(error_mask[i], ERROR_FLAGS) if not messages else []
+            summary['rejected'].append({'row': int(chunk['row'][i]), 'name': chunk['name'][i], 'errors': messages})
+        summary['invalid'] += len(bad)
+        if valid.any():
+            keep = np.nonzero(valid)[0]
+            store.append_columns([chunk['name'][i] for i in keep], {name: col[keep] for name, col in params.items()},
+                                 {k: v[keep] for k, v in results.items()}, {k: v[keep] for k, v in kpis.items()},
+                                 owner=owner)
+            summary['imported'] += len(keep)
+    return summary
+
+
+def export_scenario_book(store, target, chunk_rows=10_000):
+    """Escribe todos los escenarios del almacén en un libro (modo solo escritura).
+
+    Columnas: id, name, inputs, todos los resultados y KPIs (recalculados en
+    lote desde los inputs guardados) y los textos de errores y advertencias.
+    Devuelve el número de filas escritas.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    header = None
+    n = 0
+    for page in store.iter_chunks(('id', 'name') + PARAM_NAMES, chunk_rows=chunk_rows):
+        params = {name: np.array(page[name], dtype=np.float64) for name in PARAM_NAMES}
+        results, kpis, error_mask, warning_mask = calculate_detailed_metrics_batch(params)
+        outputs = dict(results)
+        outputs.update((k, v) for k, v in kpis.items() if k not in outputs and k not in params)
+        if header is None:
+            header = ['id', 'name'] + list(PARAM_NAMES) + list(outputs) + ['errors', 'warnings']
+            ws.append(header)
+        # Mensajes decodificados una vez por máscara distinta
+        messages = {}
+        for mask, flags in ((error_mask, ERROR_FLAGS), (warning_mask, WARNING_FLAGS)):
+            for value in np.unique(mask): messages[(flags, value)] = "; ".join(decode_flags(value, flags))
+        columns = [page['id'], page['name']] + [params[c].tolist() for c in PARAM_NAMES]
+        columns += [np.where(np.isnan(v), None, v).tolist() for v in outputs.values()]
+        columns += [[messages[(ERROR_FLAGS, m)] for m in error_mask], [messages[(WARNING_FLAGS, m)] for m in warning_mask]]
+        for row in zip(*columns): ws.append(row)
+        n += len(page['id'])
+    if header is None: ws.append(['id', 'name'] + list(PARAM_NAMES))
+    wb.save(target)
+    return n
+
+
+def write_template(target):
+    """Libro de ejemplo: encabezados de entrada y una fila con DEFAULT_INPUTS."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    ws.append(['name'] + list(PARAM_NAMES))
+    ws.append(['Escenario Base'] + [DEFAULT_INPUTS[name] for name in PARAM_NAMES])
+    wb.save(target)
@@ -0,0 +1,133 @@
+"""Dimensionamiento de flota y horas de planta como MILP (PuLP/CBC).
+
+Busca `truck_count`, `loader_count` y `plant_op_hours_period` que cumplen los
+targets de material movido y alimentación a planta con el menor costo total.
+Con los targets fijos los ingresos no dependen de la flota, así que el menor
+costo es también el mayor margen operativo: no hay un objetivo aparte.
+
+Los costos por hora del modelo dependen de la flota en forma no lineal
+(horas requeridas = movido / (tasa * n)); como n es entero y acotado, cada
+alternativa de n se representa con una binaria cuyo coeficiente es el costo
+exacto que daría calculate_detailed_metrics. Con las horas por equipo cobradas
+una sola vez, el modelo original siempre abarata al agregar equipos, por eso se
+admiten costos de posesión por unidad (`truck_unit_cost`, `loader_unit_cost`)
+y por hora de planta disponible (`plant_hour_cost`).
+
+El problema construido se reutiliza: si solo cambian costos se reemplaza
+la función objetivo y se re-resuelve con arranque en caliente desde la
+solución anterior, y si solo cambian precios no se re-resuelve; la matriz de restricciones solo se reconstruye si cambian
+targets, tasas, horas o rangos.
+"""
+import math
+import time
+
+import pulp
+
+from .model import calculate_detailed_metrics
+
+# Inputs que definen la estructura del MILP (si cambian, se reconstruye)
+_STRUCTURAL_INPUTS = (
+    'tonnes_mined_target', 'strip_ratio', 'plant_feed_target',
+    'truck_op_hours_period', 'truck_payload', 'avg_cycle_time_min',
+    'loader_op_hours_period', 'loader_rate_tph', 'plant_throughput_tph',
+)
+
+
+class FleetOptimizer:
+    """Optimizador de flota reutilizable entre re-ejecuciones (una instancia por sesión)."""
+
+    def __init__(self, truck_range=(1, 60), loader_range=(1, 20), plant_hours_max=744.0):
+        self.truck_range = truck_range
+        self.loader_range = loader_range
+        self.plant_hours_max = plant_hours_max
+        self._key = None
+        self._prob = None
+        self._last = None
+        self.builds = 0
+        self.solves = 0
+
+    # --- Construcción ---
+    def _build(self, p):
+        moved = p['tonnes_mined_target'] + p['tonnes_mined_target'] * p['strip_ratio']
+        phth = 60.0 / p['avg_cycle_time_min'] * p['truck_payload']
+        prob = pulp.LpProblem("dimensionamiento_flota", pulp.LpMinimize)
+        trucks = range(self.truck_range[0], self.truck_range[1] + 1)
+        loaders = range(self.loader_range[0], self.loader_range[1] + 1)
+        y = {n: pulp.LpVariable(f"camiones_{n}", cat='Binary') for n in trucks}
+        z = {m: pulp.LpVariable(f"cargadores_{m}", cat='Binary') for m in loaders}
+        h = pulp.LpVariable("horas_planta", lowBound=0, upBound=self.plant_hours_max)
+        prob += pulp.lpSum(y.values()) == 1, "una_flota_camiones"
+        prob += pulp.lpSum(z.values()) == 1, "una_flota_cargadores"
+        # --- Capacidades (mismas expresiones que el modelo) ---
+        prob += pulp.lpSum(n * p['truck_op_hours_period'] * phth * y[n] for n in trucks) >= moved, "cap_acarreo"
+        prob += pulp.lpSum(m * p['loader_op_hours_period'] * p['loader_rate_tph'] * z[m] for m in loaders) >= moved, "cap_carga"
+        prob += h * p['plant_throughput_tph'] >= p['plant_feed_target'], "cap_planta"
+        # Horas usadas por alternativa (tramo libre, garantizado por las restricciones de capacidad)
+        self._truck_hours = {n: moved / (phth * n) for n in trucks}
+        self._loader_hours = {m: moved / (p['loader_rate_tph'] * m) for m in loaders}
+        self._prob, self._y, self._z, self._h = prob, y, z, h
+        self.builds += 1
+
+    def _set_objective(self, p, truck_unit_cost, loader_unit_cost, plant_hour_cost):
+        # Costos que no dependen de las decisiones (P&V, proceso, fijos) quedan fuera: no alteran el óptimo
+        self._prob.setObjective(
+            pulp.lpSum((self._truck_hours[n] * p['cost_haul_per_hr'] + truck_unit_cost * n) * v for n, v in self._y.items())
+            + pulp.lpSum((self._loader_hours[m] * p['cost_load_per_hr'] + loader_unit_cost * m) * v for m, v in self._z.items())
+            + (plant_hour_cost + 1e-6) * self._h)  # 1e-6: entre óptimos empatados, menos horas de planta
+
+    # --- Resolución ---
+    def optimize(self, inputs, truck_unit_cost=0.0, loader_unit_cost=0.0, plant_hour_cost=0.0):
+        """Resuelve y devuelve un dict con la flota óptima y sus resultados del modelo."""
+        t0 = time.perf_counter()
+        p = dict(inputs)
+        key = (self.truck_range, self.loader_range, self.plant_hours_max) + tuple(float(p[k]) for k in _STRUCTURAL_INPUTS)
+        rebuilt = key != self._key
+        if rebuilt:
+            self._build(p)
+            self._key = key
+            self._last = None
+        cost_key = (float(p['cost_haul_per_hr']), float(p['cost_load_per_hr']), truck_unit_cost, loader_unit_cost, plant_hour_cost)
+
+        if self._last is not None and cost_key == self._last['cost_key']:
+            # Solo cambiaron precios u otros inputs fuera del objetivo: el óptimo no cambia
+            status_name, warm = 'Optimal', False
+        else:
+            status_name, warm = self._solve(p, cost_key, truck_unit_cost, loader_unit_cost, plant_hour_cost)
+        out = {'status': status_name, 'rebuilt': rebuilt, 'warm_start': warm}
+        if status_name != 'Optimal':
+            out['solve_time_s'] = time.perf_counter() - t0
+            return out
+
+        truck_count, loader_count = self._last['truck_count'], self._last['loader_count']
+        # Horas de planta enteras (como el widget), redondeadas hacia arriba para mantener la capacidad
+        plant_hours_int = math.ceil(self._last['plant_hours_var'] - 1e-9)
+
+        p.update(truck_count=truck_count, loader_count=loader_count, plant_op_hours_period=plant_hours_int)
+        results, kpis, errors, warnings = calculate_detailed_metrics(**p)
+        ownership = truck_unit_cost * truck_count + loader_unit_cost * loader_count + plant_hour_cost * plant_hours_int
+        out.update(truck_count=truck_count, loader_count=loader_count, plant_op_hours_period=plant_hours_int,
+                   results=results, kpis=kpis, errors=errors, warnings=warnings,
+                   ownership_cost=ownership,
+                   total_cost_with_ownership=(results['total_cost'] + ownership) if results else None,
+                   solve_time_s=time.perf_counter() - t0)
+        return out
+
+    def _solve(self, p, cost_key, truck_unit_cost, loader_unit_cost, plant_hour_cost):
+        """Fija el objetivo y resuelve; devuelve (estado, usó_arranque_en_caliente)."""
+        self._set_objective(p, truck_unit_cost, loader_unit_cost, plant_hour_cost)
+        warm = self._last is not None
+        if warm:
+            # Arranque en caliente: la solución anterior sigue siendo factible (mismas restricciones)
+            for n, v in self._y.items(): v.setInitialValue(1 if n == self._last['truck_count'] else 0)
+            for m, v in self._z.items(): v.setInitialValue(1 if m == self._last['loader_count'] else 0)
+            self._h.setInitialValue(self._last['plant_hours_var'])
+        status = self._prob.solve(pulp.PULP_CBC_CMD(msg=False, warmStart=warm))
+        self.solves += 1
+        status_name = pulp.LpStatus[status]
+        if status_name == 'Optimal':
+            self._last = {'truck_count': next(n for n, v in self._y.items() if v.value() > 0.5),
+                          'loader_count': next(m for m, v in self._z.items() if v.value() > 0.5),
+                          'plant_hours_var': self._h.value(), 'cost_key': cost_key}
+        else:
+            self._last = None
+        return status_name, warm
@@ -0,0 +1,190 @@
+"""Punto de equilibrio / búsqueda de objetivo en lote.
+
+Para cada escenario busca el valor de UN input que lleva una salida a un
+objetivo: `operating_profit`, `cost_per_tonne_processed` o `margin_pct`
+(margen operativo / ingresos * 100).
+
+Como función de un solo input x, el modelo es suave por tramos: los únicos
+quiebres son los recortes min(requerido, disponible) de horas de carga,
+acarreo y planta. Entre quiebres, las tres salidas tienen la forma
+a + b*x + c/x (lineal en precios, leyes y costos; con 1/x en tasas, flota y
+tipo de cambio), y también la tienen las diferencias requerido - disponible.
+Entonces, para todas las filas a la vez:
+
+1. Los quiebres se obtienen en forma cerrada: se ajusta a + b*x + c/x a cada
+   diferencia requerido - disponible con tres evaluaciones y se resuelve la
+   cuadrática.
+2. Los quiebres parten (lo, hi) en tramos. Se recorren desde el que contiene
+   el valor actual hacia los más lejanos; en cada tramo se ajusta la salida
+   con tres evaluaciones del motor vectorizado (una sola llamada) y se
+   resuelve la cuadrática dentro del tramo. Solo siguen las filas sin raíz.
+3. Cada raíz se refina con un nuevo ajuste centrado en ella (extrapolar
+   desde lejos amplifica el redondeo) y se verifica con el modelo.
+
+No hay bisección: el número de llamadas al motor está acotado por la
+cantidad de tramos (a lo sumo 7) más los refinamientos.
+"""
+import numpy as np
+
+from .batch import as_columns, calculate_detailed_metrics_batch, capacity_hours
+from .model import PARAM_NAMES
+
+OUTPUTS = ('operating_profit', 'cost_per_tonne_processed', 'margin_pct')
+OUTPUT_LABELS = {'operating_profit': 'Margen Operativo ($)', 'cost_per_tonne_processed': 'Costo / t Procesada ($/t)',
+                 'margin_pct': 'Margen / Ingresos (%)'}
+_STEP = 1e-3  # paso relativo de los puntos del ajuste
+_NOISE = 1e-8  # coeficientes relativos menores se consideran ruido de redondeo
+_POLISH = 2  # refinamientos de la raíz
+
+
+def _output(results, output):
+    if output == 'margin_pct':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(results['revenue'] != 0, results['operating_profit'] / results['revenue'] * 100.0, np.nan)
+    return results[output]
+
+
+def _scale(results, output):
+    """Magnitud de los términos que forman la salida (para la tolerancia)."""
+    if output == 'operating_profit': return np.abs(results['revenue']) + np.abs(results['total_cost'])
+    if output == 'cost_per_tonne_processed': return np.abs(results['cost_per_tonne_processed'])
+    return np.full(len(results['revenue']), 100.0)
+
+
+def _with(cols, rows, variable, values):
+    """Columnas de las filas `rows` (pueden repetirse) con `variable` reemplazada por `values`."""
+    sub = {name: col[rows] for name, col in cols.items() if name != variable}
+    sub[variable] = values
+    return sub
+
+
+def _stencil(x, h):
+    return np.concatenate([x, x * (1 + h), x * (1 - h)])
+
+
+def _fit_roots(x, f, h, lo, hi):
+    """Raíces de f(x*u) = a + B*u + C/u dentro de (lo, hi), ajustado con u = 1, 1+h, 1-h.
+
+    `f` trae las tres evaluaciones apiladas (centro, +h, -h). Devuelve un
+    arreglo (n, 2) con NaN donde no hay raíz. Los coeficientes por debajo del
+    ruido de redondeo se anulan para no inventar raíces cuando el tramo es
+    lineal (C = 0) o hiperbólico puro (B = 0).
+    """
+    f0, fp, fm = np.split(f, 3)
+    with np.errstate(all='ignore'):
+        C = (fp + fm - 2.0 * f0) * (1.0 - h * h) / (2.0 * h * h)
+        B = (fp - fm) / (2.0 * h) + C / (1.0 - h * h)
+        a = f0 - B - C
+        size = np.abs(a) + np.abs(B) + np.abs(C)
+        C = np.where(np.abs(C) <= _NOISE * size, 0.0, C)
+        B = np.where(np.abs(B) <= _NOISE * size, 0.0, B)
+        # B*u^2 + a*u + C = 0 con la fórmula estable
+        sq = np.sqrt(a * a - 4.0 * B * C)
+        q = -0.5 * (a + np.where(a >= 0, sq, -sq))
+        r1 = np.where(B != 0, q / B, np.nan)
+        r2 = np.where(C == 0, np.where(B != 0, -a / B, np.nan), C / q)
+        roots = np.stack([r1, r2], axis=1) * x[:, None]
+        # Tramo plano justo en el objetivo: cualquier x sirve, se toma el centro
+        roots[:, 0] = np.where((B == 0) & (C == 0) & (a == 0), x, roots[:, 0])
+    return np.where(np.isfinite(roots) & (roots > lo[:, None]) & (roots < hi[:, None]), roots, np.nan)
+
+
+def _solve_in(cols, rows, variable, xs, a, b, output, target):
+    """Ajusta la salida en xs (dentro del tramo (a, b)) y devuelve (raíces (m, 2), evaluaciones)."""
+    with np.errstate(all='ignore'):
+        h = np.minimum(_STEP, 0.5 * np.minimum((xs - a) / xs, (b - xs) / xs))
+    p = _with(cols, np.tile(rows, 3), variable, _stencil(xs, h))
+    f = _output(calculate_detailed_metrics_batch(p)[0], output) - np.tile(target[rows], 3)
+    return _fit_roots(xs, f, h, a, b), len(f)
+
+
+def _nearest(roots, x):
+    """La raíz de cada fila más cercana a x (NaN si no hay)."""
+    dist = np.where(np.isnan(roots), np.inf, np.abs(roots - x[:, None]))
+    k = np.argmin(dist, axis=1)
+    return roots[np.arange(len(k)), k]
+
+
+def _kinks(cols, variable, x, lo, hi):
+    """Valores de `variable` donde cambia algún recorte de horas (n, 6), ordenados, NaN al final."""
+    p = _with(cols, np.tile(np.arange(len(x)), 3), variable, _stencil(x, _STEP))
+    with np.errstate(all='ignore'):
+        gaps = [required - available for required, available in capacity_hours(p)]
+    return np.sort(np.concatenate([_fit_roots(x, gap, _STEP, lo, hi) for gap in gaps], axis=1), axis=1)
+
+
+def goal_seek(params, variable, target, output='operating_profit', bounds=(0.0, np.inf), rtol=1e-9):
+    """Resuelve `variable` para que `output` = `target` en cada escenario.
+
+    `params`: dict/DataFrame de columnas de PARAM_NAMES (o escalares), como el
+    motor en lote. `target` puede ser escalar o un arreglo por fila. La raíz
+    se busca en (bounds[0], bounds[1]); si hay varias se devuelve la del tramo
+    más cercano al valor actual. Devuelve un dict de arreglos: 'solution' (NaN
+    sin solución), 'converged', 'base' (valor actual), 'residual' (salida -
+    objetivo en la solución) y 'evaluations' (filas evaluadas en total).
+    """
+    if variable not in PARAM_NAMES: raise ValueError(f"Input desconocido: {variable}")
+    if output not in OUTPUTS: raise ValueError(f"Salida no soportada: {output}")
+    cols, n = as_columns(params)
+    target = np.broadcast_to(np.asarray(target, dtype=np.float64), (n,))
+    lo = np.full(n, float(bounds[0])); hi = np.full(n, float(bounds[1]))
+    base = np.array(cols[variable], dtype=np.float64)
+    # Punto de partida dentro de (lo, hi)
+    x0 = np.where((base > lo) & (base < hi), base,
+                  np.where(np.isfinite(hi), 0.5 * (lo + hi), np.maximum(2.0 * lo, 1.0)))
+
+    # 1) Quiebres y tramos: edges[:, j] .. edges[:, j + 1]
+    kinks = _kinks(cols, variable, x0, lo, hi)
+    edges = np.concatenate([lo[:, None], np.where(np.isnan(kinks), hi[:, None], kinks), hi[:, None]], axis=1)
+    left, right = edges[:, :-1], edges[:, 1:]
+    # Orden de visita: distancia relativa del tramo al valor actual; vacíos al final
+    with np.errstate(all='ignore'):
+        gap = np.where(x0[:, None] < left, left / x0[:, None] - 1.0,
+                       np.where(x0[:, None] > right, 1.0 - right / x0[:, None], 0.0))
+    gap = np.where(right > left, gap, np.inf)
+    order = np.argsort(gap, axis=1, kind='stable')
+
+    # 2) Tramo por tramo, solo las filas que aún no tienen raíz
+    solution = np.full(n, np.nan)
+    sol_lo, sol_hi = np.full(n, np.nan), np.full(n, np.nan)
+    evaluations = 3 * n
+    pending = np.arange(n)
+    for rank in range(order.shape[1]):
+        j = order[pending, rank]
+        usable = np.isfinite(gap[pending, j])
+        pending, j = pending[usable], j[usable]
+        if not len(pending): break
+        a, b = left[pending, j], right[pending, j]
+        # Punto del ajuste: el valor actual si está en el tramo; si no, uno interior
+        with np.errstate(all='ignore'):
+            inner = np.where(np.isinf(b), 2.0 * a, np.where(a > 0, np.sqrt(a * b), 0.5 * b))
+        xs = np.where((x0[pending] > a) & (x0[pending] < b), x0[pending], inner)
+        roots, count = _solve_in(cols, pending, variable, xs, a, b, output, target)
+        evaluations += count
+        # Dentro del tramo, la más cercana al valor actual
+        root = _nearest(roots, base[pending])
+        found = ~np.isnan(root)
+        rows = pending[found]
+        solution[rows], sol_lo[rows], sol_hi[rows] = root[found], a[found], b[found]
+        pending = pending[~found]
+
+    # 3) Verificación y refinamiento de las filas fuera de tolerancia
+    residual = np.full(n, np.nan)
+    converged = np.zeros(n, dtype=bool)
+    rows = np.nonzero(~np.isnan(solution))[0]
+    for attempt in range(_POLISH + 1):
+        if not len(rows): break
+        results = calculate_detailed_metrics_batch(_with(cols, rows, variable, solution[rows]))[0]
+        evaluations += len(rows)
+        residual[rows] = _output(results, output) - target[rows]
+        ok = np.abs(residual[rows]) <= rtol * (_scale(results, output) + np.abs(target[rows]))
+        converged[rows[ok]] = True
+        rows = rows[~ok]
+        if not len(rows) or attempt == _POLISH: break
+        roots, count = _solve_in(cols, rows, variable, solution[rows], sol_lo[rows], sol_hi[rows], output, target)
+        evaluations += count
+        root = _nearest(roots, solution[rows])
+        solution[rows] = np.where(np.isnan(root), solution[rows], root)
+    solution[~converged] = np.nan
+    return {'solution': solution, 'converged': converged, 'base': base, 'residual': residual,
+            'evaluations': evaluations}
@@ -0,0 +1,289 @@
+"""Cola local de trabajos largos en segundo plano (pool de procesos).
+
+Un JobRunner vive una vez por proceso del servidor (la app lo crea con
+st.cache_resource) y lo comparten todas las sesiones. Cada trabajo se parte
+en bloques que se envían a un pool de procesos (pool.py); los callbacks de
+los futuros fusionan cada bloque terminado en el resultado parcial del
+trabajo, de modo que la interfaz puede leer el progreso y los parciales sin
+esperar ni bloquearse.
+
+Tipos de trabajo (ambos sobre el motor vectorizado):
+
+- 'sweep': barrido de una grilla de 1 o 2 inputs alrededor de un escenario
+  base; el resultado tiene las columnas de salida del almacén por punto y se
+  puede guardar como escenarios (`save_to_store`).
+- 'montecarlo': los bloques de run_monte_carlo; el parcial es el resumen de
+  los bloques ya fusionados.
+
+Los trabajos se identifican por un hash del tipo y de la especificación (con
+el hash de inputs del escenario base): enviar lo mismo otra vez, desde la misma
+sesión o desde otra, devuelve el trabajo existente (en curso o terminado) en
+lugar de repetir el cálculo. Cada sesión que lo envió queda como dueña;
+cancelar solo detiene el cálculo cuando no quedan dueños. Los bloques ya
+tomados por un proceso terminan igual; su resultado se descarta.
+
+Orden de locks: primero el del JobRunner y después el del trabajo, nunca al
+revés (los callbacks sueltan el del trabajo antes de podar la lista).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from .batch import calculate_detailed_metrics_batch
+from .model import PARAM_LABELS, PARAM_NAMES, inputs_hash
+from .montecarlo import _merge_aggregates, _run_chunk, monte_carlo_plan, summarize_monte_carlo
+from .pool import process_pool
+from .store import OUTPUT_COLUMNS
+
+JOB_KINDS = ('sweep', 'montecarlo')
+STATUS_LABELS = {'running': 'En curso', 'done': 'Terminado', 'cancelled': 'Cancelado', 'failed': 'Error'}
+SWEEP_MAX_ROWS = 250_000  # puntos por barrido (el parcial vive en memoria del servidor)
+SWEEP_CHUNK_ROWS = 10_000
+MC_CHUNK_SIZE = 100_000  # más chico que en run_monte_carlo: el progreso avanza más seguido
+
+
+def job_key(kind, spec):
+    """Hash (hex) del trabajo: tipo + especificación, con el escenario base por su hash de inputs."""
+    canonical = dict(spec)
+    if 'base' in canonical: canonical['base'] = inputs_hash(canonical['base'])
+    if canonical.get('correlations'):
+        canonical['correlations'] = sorted([list(pair), float(rho)] for pair, rho in canonical['correlations'].items())
+    text = json.dumps([kind, canonical], sort_keys=True, default=float)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+# --- Barrido de grilla ---
+def sweep_axes(spec):
+    """[(input, valores)] de la grilla; valida inputs, pasos y tamaño total."""
+    axes = []
+    for name, lo, hi, steps in spec['axes']:
+        if name not in PARAM_NAMES: raise ValueError(f"Input desconocido: {name}")
+        if int(steps) < 1: raise ValueError(f"{name}: se necesita al menos un paso")
+        axes.append((name, np.linspace(float(lo), float(hi), int(steps))))
+    if not 1 <= len(axes) <= 2: raise ValueError("El barrido admite uno o dos inputs")
+    if len({name for name, _v in axes}) != len(axes): raise ValueError("Los inputs del barrido deben ser distintos")
+    n = int(np.prod([len(v) for _n, v in axes]))
+    if n > SWEEP_MAX_ROWS: raise ValueError(f"El barrido tiene {n:,} puntos (máximo {SWEEP_MAX_ROWS:,})")
+    return axes
+
+
+def _sweep_params(base, axes, rows):
+    """Columnas de inputs para los puntos `rows` de la grilla (orden: primer input más lento)."""
+    params = {name: base[name] for name in PARAM_NAMES}
+    coords = np.unravel_index(rows, [len(values) for _n, values in axes])
+    for (name, values), index in zip(axes, coords): params[name] = values[index]
+    return params
+
+
+def _run_sweep_chunk(task):
+    """Evalúa los puntos [start, stop) de la grilla (ejecutado en el pool)."""
+    base, axes, start, stop = task
+    results, kpis, error_mask, _w = calculate_detailed_metrics_batch(_sweep_params(base, axes, np.arange(start, stop)))
+    blocks = {'results': results, 'kpis': kpis}
+    out = {column: blocks[block][key] for column, (block, key) in OUTPUT_COLUMNS.items()}
+    out['error_mask'] = error_mask
+    return out
+
+
+def _plan(kind, spec):
+    """(tareas, función del pool, estado inicial del resultado) para un trabajo."""
+    if kind == 'sweep':
+        base = {name: float(spec['base'][name]) for name in PARAM_NAMES}
+        axes = sweep_axes(spec)
+        n = int(np.prod([len(v) for _n, v in axes]))
+        tasks = [(base, axes, start, min(start + SWEEP_CHUNK_ROWS, n)) for start in range(0, n, SWEEP_CHUNK_ROWS)]
+        state = {'base': base, 'axes': axes, 'computed': np.zeros(n, dtype=bool),
+                 'error_mask': np.zeros(n, dtype=np.int64),
+                 'columns': {column: np.full(n, np.nan) for column in OUTPUT_COLUMNS}}
+        return tasks, _run_sweep_chunk, state
+    if kind == 'montecarlo':
+        tasks, total = monte_carlo_plan(spec['base'], spec['distributions'], spec['n_draws'], spec.get('correlations'),
+                                        chunk_size=spec.get('chunk_size', MC_CHUNK_SIZE), seed=spec.get('seed', 0))
+        return tasks, _run_chunk, total
+    raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+
+
+def _merge(kind, state, task, part):
+    if kind == 'sweep':
+        _base, _axes, start, stop = task
+        for column, values in part.items():
+            if column != 'error_mask': state['columns'][column][start:stop] = values
+        state['error_mask'][start:stop] = part['error_mask']
+        state['computed'][start:stop] = True
+    else:
+        _merge_aggregates(state, part)
+
+
+class Job:
+    """Un trabajo de la cola: especificación, progreso, dueños y resultado (parcial o final)."""
+
+    def __init__(self, job_id, kind, spec, label, total):
+        self.id = job_id
+        self.kind = kind
+        self.spec = spec
+        self.label = label
+        self.status = 'running'
+        self.error = None
+        self.total = total  # bloques
+        self.done = 0
+        self.owners = set()
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.state = None
+        self.saved = 0  # escenarios ya guardados desde este trabajo (se guarda una sola vez)
+        self.futures = []
+        self.pool = None  # pool al que se enviaron los bloques
+        self.lock = threading.RLock()  # un futuro ya terminado llama al callback en el mismo hilo
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.submitted_at
+
+    def partial(self):
+        """Resultado con los bloques terminados hasta ahora (el final cuando status == 'done')."""
+        with self.lock:
+            if self.state is None or not self.done: return None
+            if self.kind == 'montecarlo': return summarize_monte_carlo(self.state)
+            return self.state
+
+
+class JobRunner:
+    """Cola de trabajos sobre un pool de procesos compartido; ver el docstring del módulo."""
+
+    def __init__(self, max_workers=None, keep_finished=32):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.keep_finished = keep_finished
+        self._executor = None
+        self._jobs = OrderedDict()  # id -> Job, en orden de envío
+        self._lock = threading.RLock()
+
+    def _pool(self):
+        # Con self._lock tomado. El pool se crea al primer trabajo (y de nuevo si un proceso murió)
+        if self._executor is None: self._executor = process_pool(self.max_workers)
+        return self._executor
+
+    def submit(self, kind, spec, owner=None, label=None):
+        """Encola un trabajo y devuelve su id; si ya existe uno igual (no cancelado ni fallido), lo reutiliza."""
+        if kind not in JOB_KINDS: raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        job_id = job_key(kind, spec)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in ('running', 'done'):
+                job.owners.add(owner)
+                return job_id
+            tasks, fn, state = _plan(kind, spec)
+            job = Job(job_id, kind, spec, label or kind, len(tasks))
+            job.owners.add(owner)
+            job.state = state
+            self._jobs[job_id] = job
+            self._jobs.move_to_end(job_id)
+            pool = job.pool = self._pool()
+            with job.lock:
+                for task in tasks:
+                    future = pool.submit(fn, task)
+                    job.futures.append(future)
+                    future.add_done_callback(lambda f, task=task: self._on_done(job, task, f))
+            if not tasks:
+                self._finish(job, 'done')
+                self._prune()
+        return job_id
+
+    def _on_done(self, job, task, future):
+        # Corre en el hilo del pool que recibe los resultados: solo fusiona y actualiza contadores
+        if future.cancelled(): return
+        error = future.exception()
+        with job.lock:
+            if job.status != 'running': return
+            if error is None:
+                _merge(job.kind, job.state, task, future.result())
+                job.done += 1
+                if job.done < job.total: return
+                self._finish(job, 'done')
+            else:
+                job.error = str(error) or type(error).__name__
+                for f in job.futures: f.cancel()
+                self._finish(job, 'failed')
+        if isinstance(error, BrokenProcessPool):
+            # Un proceso murió: el próximo trabajo crea otro pool (salvo que ya se haya reemplazado)
+            with self._lock:
+                if self._executor is job.pool: self._executor = None
+        self._prune()
+
+    def _finish(self, job, status):
+        # Con job.lock tomado: no toca self._lock (el llamador poda después de soltarlo)
+        job.status = status
+        job.finished_at = time.time()
+        job.futures = []
+
+    def _prune(self):
+        """Olvida los trabajos terminados más antiguos por encima de keep_finished."""
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.status != 'running']
+            for job_id in finished[:max(len(finished) - self.keep_finished, 0)]: del self._jobs[job_id]
+
+    def cancel(self, job_id, owner=None):
+        """Quita a `owner` del trabajo; si no quedan dueños (o owner es None) cancela el cálculo.
+
+        Devuelve True si el cálculo se canceló. Un trabajo ya terminado solo
+        desaparece de la lista de ese dueño.
+        """
+        job = self._jobs.get(job_id)
+        if job is None: return False
+        with job.lock:
+            job.owners.discard(owner)
+            if job.status != 'running' or (owner is not None and job.owners): return False
+            for future in job.futures: future.cancel()
+            job.state = None
+            self._finish(job, 'cancelled')
+        self._prune()
+        return True
+
+    def job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        """Trabajos de `owner` (todos si es None), el más reciente primero."""
+        with self._lock: jobs = list(self._jobs.values())
+        return [job for job in reversed(jobs) if owner is None or owner in job.owners]
+
+    def result(self, job_id):
+        """Resultado final de un trabajo terminado (None si no terminó)."""
+        job = self._jobs.get(job_id)
+        return job.partial() if job is not None and job.status == 'done' else None
+
+    def save_to_store(self, job_id, store, prefix=None, owner=None):
+        """Guarda los puntos válidos de un barrido terminado como escenarios; devuelve cuántos (0 si ya se guardó)."""
+        job = self._jobs.get(job_id)
+        result = self.result(job_id)
+        if result is None or job.kind != 'sweep': raise ValueError("Solo se guardan barridos terminados")
+        with job.lock:
+            if job.saved: return 0  # ya guardado (quizás desde otra sesión)
+            keep = np.nonzero(result['computed'] & (result['error_mask'] == 0))[0]
+            if not len(keep): return 0
+            inputs = _sweep_params(result['base'], result['axes'], keep)
+            prefix = prefix or job.label
+            names = [f"{prefix} [" + ", ".join(f"{PARAM_LABELS.get(name, name)}={inputs[name][i]:.6g}" for name, _v in result['axes']) + "]"
+                     for i in range(len(keep))]
+            blocks = {'results': {}, 'kpis': {}}
+            for column, (block, key) in OUTPUT_COLUMNS.items(): blocks[block][key] = result['columns'][column][keep]
+            store.append_columns(names, inputs, blocks['results'], blocks['kpis'], owner=owner)
+            job.saved = len(keep)
+            return len(keep)
+
+    def shutdown(self):
+        """Cancela lo pendiente y cierra el pool."""
+        with self._lock: job_ids = list(self._jobs)
+        for job_id in job_ids: self.cancel(job_id)
+        with self._lock:
+            if self._executor is not None: self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,177 @@
+"""Vida de la mina: plan multi-periodo con canchas de stock, VAN y TIR.
+
+Cada periodo usa los 25 inputs del modelo (targets, precios, flota...) más una
+inversión `capex`; el plan es un dict de columnas de largo T. El desfase entre
+toneladas voladas y material movido, que en un periodo aislado es solo una
+advertencia, aquí es inventario real:
+
+- cancha de material tronado: entra lo volado, sale lo movido; si no alcanza,
+  el movimiento se recorta a lo disponible;
+- cancha de mineral (ROM): entra el mineral minado, sale la alimentación a
+  planta; si no alcanza, la alimentación se recorta.
+
+Ambas canchas siguen S_t = max(0, S_{t-1} + entrada_t - salida_t), que se
+resuelve sin bucle por periodo con sumas y mínimos acumulados. La ley de cada
+periodo se aplica a su alimentación (sin mezcla en cancha).
+
+Los resultados de cada periodo salen del motor vectorizado sobre las
+toneladas reales. Al editar un periodo solo se recalculan ese periodo y los
+siguientes; los anteriores, y el stock con que termina el último de ellos, se
+reutilizan.
+"""
+import numpy as np
+
+from .batch import (ERR_BLASTED, ERR_MINED_TARGET, ERR_PLANT_FEED, WARN_BLAST_MISMATCH,
+                    as_columns, metrics_columns, validation_mask)
+from .model import PARAM_NAMES
+
+SCHEDULE_COLUMNS = PARAM_NAMES + ('capex',)
+# Columnas que la app deja editar por periodo (el resto sigue al escenario base)
+EDITABLE_COLUMNS = ('tonnes_mined_target', 'strip_ratio', 'plant_feed_target', 'tonnes_blasted_period',
+                    'grade_pct', 'metal_price', 'truck_count', 'loader_count', 'capex')
+# En el plan un target en 0 es válido (consumo de cancha, planta detenida)
+_ZERO_ALLOWED = {'tonnes_blasted_period': ERR_BLASTED, 'tonnes_mined_target': ERR_MINED_TARGET,
+                 'plant_feed_target': ERR_PLANT_FEED}
+
+
+def stockpile(initial, inflow, outflow):
+    """Cancha que no puede quedar negativa: S_t = max(0, S_{t-1} + entrada_t - salida_t).
+
+    Devuelve (stock al cierre de cada periodo, salida real de cada periodo).
+    """
+    # Recursión de Lindley en forma cerrada: S_t = C_t - min(0, min_{k<=t} C_k)
+    c = initial + np.cumsum(inflow - outflow)
+    stock = c - np.minimum(np.minimum.accumulate(c), 0.0)
+    previous = np.concatenate(([initial], stock[:-1]))
+    return stock, previous + inflow - stock
+
+
+def npv(cash_flows, rate_per_period):
+    """Valor actual de flujos al cierre de cada periodo (t = 1..T)."""
+    t = np.arange(1, len(cash_flows) + 1)
+    return float(np.sum(np.asarray(cash_flows) / (1.0 + rate_per_period) ** t))
+
+
+def irr(cash_flows, lo=-0.99, hi=10.0, tol=1e-10):
+    """TIR por periodo: primera raíz del VAN en [lo, hi] (NaN si no cambia de signo).
+
+    Se acota la raíz evaluando el VAN en una grilla de tasas (en una sola
+    operación) y luego se refina por bisección.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=np.float64)
+    if not np.all(np.isfinite(cash_flows)): return float('nan')
+    t = np.arange(1, len(cash_flows) + 1)
+    grid = np.concatenate((np.linspace(lo, 0.0, 200, endpoint=False), np.geomspace(1e-6, hi, 400)))
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        values = (cash_flows[None, :] / (1.0 + grid[:, None]) ** t[None, :]).sum(axis=1)
+    sign_change = np.nonzero(np.signbit(values[:-1]) != np.signbit(values[1:]))[0]
+    if not len(sign_change): return float('nan')
+    a, b = grid[sign_change[0]], grid[sign_change[0] + 1]
+    fa = values[sign_change[0]]
+    while b - a > tol:
+        m = 0.5 * (a + b)
+        fm = npv(cash_flows, m)
+        if np.signbit(fm) == np.signbit(fa): a, fa = m, fm
+        else: b = m
+    return 0.5 * (a + b)
+
+
+class LifeOfMine:
+    """Plan de vida de la mina con recálculo incremental desde el primer periodo editado."""
+
+    def __init__(self, base_inputs, n_periods, initial_broken_stock=0.0, initial_ore_stock=0.0):
+        self.n_periods = int(n_periods)
+        if self.n_periods < 1: raise ValueError("Se requiere al menos 1 periodo")
+        base = dict(base_inputs); base.setdefault('capex', 0.0)
+        self.schedule = {name: np.full(self.n_periods, float(base[name])) for name in SCHEDULE_COLUMNS}
+        self.initial_broken_stock = float(initial_broken_stock)
+        self.initial_ore_stock = float(initial_ore_stock)
+        self.outputs = {}
+        self.error_mask = np.zeros(self.n_periods, dtype=np.uint16)
+        self.warning_mask = np.zeros(self.n_periods, dtype=np.uint16)
+        self.last_recomputed = None
+        self._dirty_from = 0
+
+    # --- Edición del plan ---
+    def set_column(self, name, values, start=0):
+        """Reemplaza valores de una columna desde `start`; marca sucio desde el primer cambio."""
+        if name not in self.schedule: raise ValueError(f"Columna de plan desconocida: {name}")
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        current = self.schedule[name][start:start + len(values)]
+        changed = np.nonzero(current != values[:len(current)])[0]
+        if len(changed):
+            current[:] = values[:len(current)]
+            self._dirty_from = min(self._dirty_from, start + int(changed[0]))
+
+    def set_period(self, t, **values):
+        """Edita uno o más inputs del periodo `t` (índice desde 0)."""
+        for name, value in values.items(): self.set_column(name, [value], start=t)
+
+    def update_columns(self, columns):
+        """Aplica varias columnas completas (p.ej. una tabla editada); solo se marca lo que cambió."""
+        for name, values in columns.items(): self.set_column(name, values)
+
+    def set_initial_stocks(self, broken=None, ore=None):
+        for attr, value in (('initial_broken_stock', broken), ('initial_ore_stock', ore)):
+            if value is not None and float(value) != getattr(self, attr):
+                setattr(self, attr, float(value)); self._dirty_from = 0
+
+    # --- Cálculo ---
+    def evaluate(self):
+        """Recalcula desde el primer periodo sucio y devuelve `outputs` (dict de arreglos de largo T)."""
+        k = self._dirty_from
+        if k >= self.n_periods:
+            self.last_recomputed = None
+            return self.outputs
+        sched = {name: values[k:] for name, values in self.schedule.items()}
+        p, n = as_columns(sched)
+        errors = validation_mask(p, n)
+        for name, bit in _ZERO_ALLOWED.items(): errors[p[name] == 0] &= ~np.uint16(bit)
+
+        # --- Canchas (stock al cierre del periodo anterior como punto de partida) ---
+        broken0 = self.outputs['broken_stock'][k - 1] if k else self.initial_broken_stock
+        ore0 = self.outputs['ore_stock'][k - 1] if k else self.initial_ore_stock
+        strip = p['strip_ratio']
+        broken_stock, moved = stockpile(broken0, p['tonnes_blasted_period'], p['tonnes_mined_target'] * (1.0 + strip))
+        ore_mined = moved / (1.0 + strip)
+        ore_stock, processed = stockpile(ore0, ore_mined, p['plant_feed_target'])
+
+        # --- Modelo de costos sobre las toneladas reales ---
+        actual = dict(p, tonnes_mined_target=ore_mined, plant_feed_target=processed)
+        results, kpis, warnings = metrics_columns(actual, n)
+        warnings &= ~np.uint16(WARN_BLAST_MISMATCH)  # el desfase ahora es inventario en cancha
+        cash_flow = results['operating_profit'] - sched['capex']
+
+        period = {'blasted': p['tonnes_blasted_period'], 'moved': moved, 'ore_mined': ore_mined, 'processed': processed,
+                  'broken_stock': broken_stock, 'ore_stock': ore_stock,
+                  'moved_shortfall': p['tonnes_mined_target'] * (1.0 + strip) - moved,
+                  'feed_shortfall': p['plant_feed_target'] - processed,
+                  'capex': sched['capex'], 'cash_flow': cash_flow}
+        period.update(results); period.update(kpis)
+        failed = errors != 0
+        for key, values in period.items():
+            out = self.outputs.get(key)
+            if out is None: out = self.outputs[key] = np.full(self.n_periods, np.nan)
+            out[k:] = values
+            if key not in ('broken_stock', 'ore_stock'): out[k:][failed] = np.nan
+        self.error_mask[k:] = errors
+        self.warning_mask[k:] = np.where(failed, 0, warnings)
+        self.last_recomputed = (k, self.n_periods)
+        self._dirty_from = self.n_periods
+        return self.outputs
+
+    def financials(self, discount_rate_pct=8.0, periods_per_year=12):
+        """VAN (tasa anual), TIR anual y totales del plan ya evaluado."""
+        if self._dirty_from < self.n_periods: self.evaluate()
+        cash_flow = self.outputs['cash_flow']
+        rate = (1.0 + discount_rate_pct / 100.0) ** (1.0 / periods_per_year) - 1.0
+        t = np.arange(1, self.n_periods + 1)
+        discounted = cash_flow / (1.0 + rate) ** t
+        period_irr = irr(cash_flow)
+        cumulative = np.cumsum(cash_flow)
+        payback = np.nonzero(cumulative >= 0)[0]
+        return {'npv': float(discounted.sum()), 'irr_pct': ((1.0 + period_irr) ** periods_per_year - 1.0) * 100.0,
+                'discounted_cash_flow': discounted, 'cumulative_cash_flow': cumulative,
+                'payback_period': int(payback[0]) + 1 if len(payback) and np.all(np.isfinite(cumulative)) else None,
+                'total_metal': float(np.nansum(self.outputs['metal_produced_units'])),
+                'total_processed': float(np.nansum(self.outputs['processed']))}
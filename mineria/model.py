@@ -0,0 +1,291 @@
+"""Modelo de cálculo detallado y esquema de escenario (solo depende de NumPy)."""
+import hashlib
+
+import numpy as np
+
+# --- Esquema del Escenario ---
+# Orden de los parámetros = orden posicional de calculate_detailed_metrics
+PARAM_NAMES = (
+    # Targets
+    'tonnes_mined_target', 'strip_ratio', 'plant_feed_target',
+    # Voladura
+    'tonnes_blasted_period', 'load_factor_kg_t', 'explosive_cost_usd_kg',
+    # Flota Carga/Acarreo
+    'truck_count', 'truck_op_hours_period', 'truck_payload', 'avg_cycle_time_min',
+    'loader_count', 'loader_op_hours_period', 'loader_rate_tph',
+    # Planta
+    'plant_op_hours_period', 'plant_throughput_tph',
+    # Metalurgia y Mercado
+    'grade_pct', 'recovery_pct', 'metal_price', 'exchange_rate',
+    # Costos Unitarios y Fijos
+    'cost_drill_acc_per_t_blasted',
+    'cost_load_per_hr', 'cost_haul_per_hr', 'cost_process_per_hr',
+    'cost_maint_fixed', 'cost_ga_fixed',
+)
+
+# Etiquetas para mostrar cada parámetro (mismas que la barra lateral de la app)
+PARAM_LABELS = {
+    'tonnes_mined_target': "Target Toneladas Minadas (Ore)", 'strip_ratio': "Strip Ratio (Waste/Ore)",
+    'plant_feed_target': "Target Alimentación Planta (Ore)",
+    'tonnes_blasted_period': "Toneladas Totales Voladas / Periodo", 'load_factor_kg_t': "Factor Carga Explosivo (kg/t volada)",
+    'explosive_cost_usd_kg': "Costo Explosivo ($/kg)",
+    'truck_count': "N° Camiones Operativos", 'truck_op_hours_period': "Horas Op. Totales Flota / Periodo",
+    'truck_payload': "Carga Útil Camión (t)", 'avg_cycle_time_min': "Tiempo Ciclo Prom. Camión (min)",
+    'loader_count': "N° Cargadores Operativos", 'loader_op_hours_period': "Horas Op. Totales Loaders / Periodo",
+    'loader_rate_tph': "Tasa Carga (t/hr por Loader)",
+    'plant_op_hours_period': "Horas Op. Planta / Periodo", 'plant_throughput_tph': "Throughput Prom. (t/hr)",
+    'grade_pct': "Ley de Cabeza (%)", 'recovery_pct': "Recuperación Metalúrgica (%)",
+    'metal_price': "Precio del Metal ($/unidad)", 'exchange_rate': "Tipo de Cambio (MonedaLocal/USD)",
+    'cost_drill_acc_per_t_blasted': "Costo Perf. & Acc. ($/t volada)",
+    'cost_load_per_hr': "Costo Carga ($/hr Loader)", 'cost_haul_per_hr': "Costo Acarreo ($/hr Camión)",
+    'cost_process_per_hr': "Costo Proceso ($/hr Planta)",
+    'cost_maint_fixed': "Costo Mantención Fija ($/Periodo)", 'cost_ga_fixed': "Costo G&A Fijo ($/Periodo)",
+}
+
+# Valores por defecto de un escenario (también usados por la app)
+DEFAULT_INPUTS = {
+    # Targets
+    'tonnes_mined_target': 120000,
+    'strip_ratio': 3.0,
+    'plant_feed_target': 100000,
+    # --- NUEVO: Voladura ---
+    'tonnes_blasted_period': 480000, # Ejemplo: (Ore + Waste) = 120k * (1+3)
+    'load_factor_kg_t': 0.35, # kg de explosivo por tonelada volada
+    'explosive_cost_usd_kg': 1.20, # $/kg de explosivo
+    # Flota
+    'truck_count': 10, 'truck_op_hours_period': 6000, 'truck_payload': 100, 'avg_cycle_time_min': 30.0,
+    'loader_count': 3, 'loader_op_hours_period': 1800, 'loader_rate_tph': 500,
+    # Planta
+    'plant_op_hours_period': 650, 'plant_throughput_tph': 160,
+    # Metalurgia y Mercado
+    'grade_pct': 1.0, 'recovery_pct': 85.0, 'metal_price': 3.50, 'exchange_rate': 1.0,
+    # Costos Unitarios y Fijos
+    # --- AJUSTADO: Costo P&V ahora es solo Perforación y Accesorios ---
+    'cost_drill_acc_per_t_blasted': 0.80, # $/tonelada VOLADA (sin explosivo)
+    'cost_load_per_hr': 250.0, 'cost_haul_per_hr': 300.0, 'cost_process_per_hr': 5000.0,
+    'cost_maint_fixed': 200000.0, 'cost_ga_fixed': 300000.0,
+}
+
+
+def inputs_hash(inputs):
+    """Hash estable (hex) de los parámetros de un escenario, en el orden de PARAM_NAMES."""
+    return inputs_hash_rows(np.array([[float(inputs[name]) for name in PARAM_NAMES]]))[0]
+
+
+def inputs_hash_rows(matrix):
+    """inputs_hash para cada fila de una matriz (N, len(PARAM_NAMES))."""
+    matrix = np.ascontiguousarray(np.asarray(matrix, dtype=np.float64) + 0.0)  # +0.0 normaliza -0.0
+    return [hashlib.sha1(row.tobytes()).hexdigest() for row in matrix]
+
+
+# --- Secciones del Modelo ---
+# Cada sección depende solo de sus argumentos, de modo que una capa de caché
+# (ver mineria/cache.py) puede memoizarlas por separado y recalcular únicamente
+# las afectadas cuando cambia un input.
+
+def _section_material(tonnes_mined_target, strip_ratio, plant_feed_target, tonnes_blasted_period):
+    """Toneladas reales movidas/procesadas y consistencia con lo volado."""
+    # --- Determinación de Toneladas Reales (sin cambios) ---
+    actual_tonnes_mined = tonnes_mined_target
+    actual_waste_moved = actual_tonnes_mined * strip_ratio
+    actual_total_material_moved = actual_tonnes_mined + actual_waste_moved
+    actual_tonnes_processed = plant_feed_target
+    # Advertencia si las toneladas voladas no coinciden con el material movido target
+    # (Puede ser intencional si hay cambios de inventario en cancha)
+    blast_warning = None
+    if not np.isclose(tonnes_blasted_period, actual_total_material_moved):
+        blast_warning = f"Toneladas Voladas ({tonnes_blasted_period:,.0f}t) != Material Movido Target ({actual_total_material_moved:,.0f}t)"
+    return {'mined': actual_tonnes_mined, 'moved': actual_total_material_moved,
+            'processed': actual_tonnes_processed, 'blast_warning': blast_warning}
+
+
+def _section_drill_blast(tonnes_blasted_period, load_factor_kg_t, explosive_cost_usd_kg, cost_drill_acc_per_t_blasted):
+    """Costo de Perforación y Voladura detallado."""
+    # 1. Costo Explosivos
+    total_explosive_kg = tonnes_blasted_period * load_factor_kg_t
+    cost_explosives_total = total_explosive_kg * explosive_cost_usd_kg
+    # 2. Costo Perforación y Accesorios (basado en ton voladas)
+    cost_drill_acc_total = tonnes_blasted_period * cost_drill_acc_per_t_blasted
+    # 3. Costo Total P&V
+    cost_pv_total = cost_explosives_total + cost_drill_acc_total
+    return {'cost': cost_pv_total,
+            'results': {'cost_explosives': cost_explosives_total, 'cost_drill_accessories': cost_drill_acc_total,
+                        'cost_drill_blast_total': cost_pv_total},
+            'kpis': {'total_explosive_kg': total_explosive_kg}}
+
+
+def _section_loading(actual_total_material_moved, loader_count, loader_op_hours_period, loader_rate_tph, cost_load_per_hr):
+    """Capacidad, horas usadas y costo de Carga."""
+    total_loader_hours_avail = loader_count * loader_op_hours_period
+    potential_tonnes_loaded = total_loader_hours_avail * loader_rate_tph
+    capacity_warning = f"Movido ({actual_total_material_moved:,.0f}t) > Cap. Carga ({potential_tonnes_loaded:,.0f}t)" if actual_total_material_moved > potential_tonnes_loaded else None
+    required_loader_hours = actual_total_material_moved / (loader_rate_tph * loader_count) if (loader_rate_tph * loader_count) > 0 else float('inf')
+    actual_loader_hours_used = min(required_loader_hours, total_loader_hours_avail)
+    hours_warning = "Hr carga req > disp." if required_loader_hours > total_loader_hours_avail else None
+    cost_load_total = actual_loader_hours_used * cost_load_per_hr
+    return {'cost': cost_load_total, 'hours_used': actual_loader_hours_used,
+            'capacity_warning': capacity_warning, 'hours_warning': hours_warning,
+            'results': {'cost_loading': cost_load_total},
+            'kpis': {'potential_tonnes_loaded': potential_tonnes_loaded, 'total_loader_hours_avail': total_loader_hours_avail,
+                     'actual_loader_hours_used': actual_loader_hours_used}}
+
+
+def _section_hauling(actual_total_material_moved, truck_count, truck_op_hours_period, truck_payload, avg_cycle_time_min, cost_haul_per_hr):
+    """Capacidad, horas usadas y costo de Acarreo."""
+    total_truck_hours_avail = truck_count * truck_op_hours_period
+    trips_per_truck_hour = 60.0 / avg_cycle_time_min
+    potential_tonnes_hauled_per_truck_hour = trips_per_truck_hour * truck_payload
+    potential_tonnes_hauled = total_truck_hours_avail * potential_tonnes_hauled_per_truck_hour
+    capacity_warning = f"Movido ({actual_total_material_moved:,.0f}t) > Cap. Acarreo ({potential_tonnes_hauled:,.0f}t)" if actual_total_material_moved > potential_tonnes_hauled else None
+    required_truck_hours = actual_total_material_moved / (potential_tonnes_hauled_per_truck_hour * truck_count) if (potential_tonnes_hauled_per_truck_hour * truck_count) > 0 else float('inf')
+    actual_truck_hours_used = min(required_truck_hours, total_truck_hours_avail)
+    hours_warning = "Hr acarreo req > disp." if required_truck_hours > total_truck_hours_avail else None
+    cost_haul_total = actual_truck_hours_used * cost_haul_per_hr
+    return {'cost': cost_haul_total, 'hours_used': actual_truck_hours_used,
+            'capacity_warning': capacity_warning, 'hours_warning': hours_warning,
+            'results': {'cost_hauling': cost_haul_total},
+            'kpis': {'potential_tonnes_hauled': potential_tonnes_hauled, 'total_truck_hours_avail': total_truck_hours_avail,
+                     'trips_per_truck_hour': trips_per_truck_hour, 'potential_tph_per_truck': potential_tonnes_hauled_per_truck_hour,
+                     'actual_truck_hours_used': actual_truck_hours_used}}
+
+
+def _section_processing(actual_tonnes_processed, plant_op_hours_period, plant_throughput_tph, cost_process_per_hr):
+    """Capacidad, horas usadas y costo de Proceso."""
+    potential_tonnes_processed = plant_op_hours_period * plant_throughput_tph
+    capacity_warning = f"Procesado ({actual_tonnes_processed:,.0f}t) > Cap. Proceso ({potential_tonnes_processed:,.0f}t)" if actual_tonnes_processed > potential_tonnes_processed else None
+    required_plant_hours = actual_tonnes_processed / plant_throughput_tph if plant_throughput_tph > 0 else float('inf')
+    actual_plant_hours_used = min(required_plant_hours, plant_op_hours_period)
+    hours_warning = "Hr planta req > disp." if required_plant_hours > plant_op_hours_period else None
+    cost_process_total = actual_plant_hours_used * cost_process_per_hr
+    return {'cost': cost_process_total, 'hours_used': actual_plant_hours_used,
+            'capacity_warning': capacity_warning, 'hours_warning': hours_warning,
+            'results': {'cost_processing': cost_process_total},
+            'kpis': {'potential_tonnes_processed': potential_tonnes_processed, 'plant_op_hours_period': plant_op_hours_period,
+                     'actual_plant_hours_used': actual_plant_hours_used}}
+
+
+def _section_revenue(actual_tonnes_processed, grade_pct, recovery_pct, metal_price, exchange_rate):
+    """Metal producido e Ingresos."""
+    grade_decimal = grade_pct / 100.0; recovery_decimal = recovery_pct / 100.0
+    metal_produced_units = actual_tonnes_processed * grade_decimal * recovery_decimal
+    revenue = metal_produced_units * metal_price / exchange_rate
+    return {'revenue': revenue, 'metal_produced_units': metal_produced_units}
+
+
+# Secciones en orden de evaluación: nombre -> (función, dependencias). Las
+# dependencias son inputs del escenario o salidas de secciones previas.
+SECTIONS = {
+    'material': (_section_material, ('tonnes_mined_target', 'strip_ratio', 'plant_feed_target', 'tonnes_blasted_period')),
+    'drill_blast': (_section_drill_blast, ('tonnes_blasted_period', 'load_factor_kg_t', 'explosive_cost_usd_kg', 'cost_drill_acc_per_t_blasted')),
+    'loading': (_section_loading, ('material.moved', 'loader_count', 'loader_op_hours_period', 'loader_rate_tph', 'cost_load_per_hr')),
+    'hauling': (_section_hauling, ('material.moved', 'truck_count', 'truck_op_hours_period', 'truck_payload', 'avg_cycle_time_min', 'cost_haul_per_hr')),
+    'processing': (_section_processing, ('material.processed', 'plant_op_hours_period', 'plant_throughput_tph', 'cost_process_per_hr')),
+    'revenue': (_section_revenue, ('material.processed', 'grade_pct', 'recovery_pct', 'metal_price', 'exchange_rate')),
+}
+
+
+def validate_inputs(p):
+    """Validaciones básicas; devuelve la lista de errores (vacía si es válido)."""
+    errors = []
+    if p['tonnes_blasted_period'] <= 0: errors.append("Toneladas Voladas debe ser > 0")
+    if p['load_factor_kg_t'] <= 0: errors.append("Factor Carga Explosivo debe ser > 0")
+    if p['explosive_cost_usd_kg'] < 0: errors.append("Costo Explosivo no puede ser negativo")
+    if p['cost_drill_acc_per_t_blasted'] < 0: errors.append("Costo Perf.&Acc. no puede ser negativo")
+    if p['tonnes_mined_target'] <= 0: errors.append("Target Toneladas Minadas debe ser > 0")
+    if p['strip_ratio'] < 0: errors.append("Strip Ratio no puede ser negativo")
+    if p['plant_feed_target'] <= 0: errors.append("Target Alimentación Planta debe ser > 0")
+    if p['avg_cycle_time_min'] <= 0: errors.append("Tiempo Ciclo Camión debe ser > 0")
+    #... (añadir más validaciones si es necesario)
+    return errors
+
+
+def _call_section(name, fn, p, outputs):
+    """Ejecuta la sección `name` resolviendo sus dependencias (sin caché)."""
+    return fn(*resolve_dependencies(SECTIONS[name][1], p, outputs))
+
+
+def resolve_dependencies(deps, p, outputs):
+    """Valores de las dependencias: 'seccion.clave' o nombre de input."""
+    values = []
+    for dep in deps:
+        section, _, key = dep.partition('.')
+        values.append(outputs[section][key] if key else p[dep])
+    return values
+
+
+def evaluate_sections(p, run_section=_call_section):
+    """Evalúa el modelo por secciones; `run_section` permite memoizarlas.
+
+    Devuelve (results, kpis, errors, warnings), igual que calculate_detailed_metrics.
+    """
+    errors = validate_inputs(p)
+    warnings = []
+    if errors: return None, None, errors, warnings
+    try:
+        out = {}
+        for name, (fn, _deps) in SECTIONS.items():
+            out[name] = run_section(name, fn, p, out)
+            if name == 'processing':
+                # --- Advertencias de Capacidad y Horas (mismo orden que la versión original) ---
+                warnings = [w for w in (out['loading']['capacity_warning'], out['hauling']['capacity_warning'],
+                                        out['processing']['capacity_warning'], out['material']['blast_warning'],
+                                        out['loading']['hours_warning'], out['hauling']['hours_warning'],
+                                        out['processing']['hours_warning']) if w]
+        mat, db, ld, hl, pr, rv = (out[name] for name in SECTIONS)
+
+        results = {}
+        kpis = {}
+        for section in (db, ld, hl, pr):
+            results.update(section['results']); kpis.update(section['kpis'])
+
+        # --- Costos Fijos (sin cambios) ---
+        results['cost_maintenance_fixed'] = p['cost_maint_fixed']
+        results['cost_ga_fixed'] = p['cost_ga_fixed']
+
+        # --- Costo Total y Unitarios (usando nuevo costo P&V) ---
+        actual_tonnes_mined, actual_total_material_moved, actual_tonnes_processed = mat['mined'], mat['moved'], mat['processed']
+        total_operational_cost = db['cost'] + ld['cost'] + hl['cost'] + pr['cost']
+        total_cost = total_operational_cost + p['cost_maint_fixed'] + p['cost_ga_fixed']
+        results['total_operational_cost'] = total_operational_cost
+        results['total_cost'] = total_cost
+        results['cost_per_tonne_mined'] = total_cost / actual_tonnes_mined if actual_tonnes_mined else 0
+        results['cost_per_tonne_processed'] = total_cost / actual_tonnes_processed if actual_tonnes_processed else 0
+        kpis['cost_per_total_tonne_moved'] = total_cost / actual_total_material_moved if actual_total_material_moved else 0
+
+        # --- Ingresos y Rentabilidad (sin cambios) ---
+        results['revenue'] = rv['revenue']; results['metal_produced_units'] = rv['metal_produced_units']
+        operating_profit = rv['revenue'] - total_cost
+        results['operating_profit'] = operating_profit
+        results['profit_per_tonne_processed'] = operating_profit / actual_tonnes_processed if actual_tonnes_processed else 0
+
+        # --- KPIs Operativos Adicionales (sin cambios) ---
+        kpis['actual_tonnes_per_truck_hr'] = actual_total_material_moved / hl['hours_used'] if hl['hours_used'] > 0 else 0
+        kpis['actual_tonnes_per_loader_hr'] = actual_total_material_moved / ld['hours_used'] if ld['hours_used'] > 0 else 0
+        kpis['actual_tph_plant'] = actual_tonnes_processed / pr['hours_used'] if pr['hours_used'] > 0 else 0
+
+        return results, kpis, errors, warnings
+
+    except Exception as e:
+        return None, None, [f"Error inesperado en cálculo: {e}"], warnings
+
+
+# --- Modelo de Cálculo Detallado ---
+def calculate_detailed_metrics(
+    # Targets
+    tonnes_mined_target, strip_ratio, plant_feed_target,
+    # === NUEVO: Voladura ===
+    tonnes_blasted_period, load_factor_kg_t, explosive_cost_usd_kg,
+    # Flota Carga/Acarreo
+    truck_count, truck_op_hours_period, truck_payload, avg_cycle_time_min,
+    loader_count, loader_op_hours_period, loader_rate_tph,
+    # Planta
+    plant_op_hours_period, plant_throughput_tph,
+    # Metalurgia y Mercado
+    grade_pct, recovery_pct, metal_price, exchange_rate,
+    # Costos Unitarios y Fijos
+    # === AJUSTADO ===
+    cost_drill_acc_per_t_blasted, # Costo Perforación y Accesorios por ton volada
+    cost_load_per_hr, cost_haul_per_hr, cost_process_per_hr,
+    cost_maint_fixed, cost_ga_fixed):
+    """Calcula métricas financieras y operativas desde parámetros detallados."""
+    return evaluate_sections(dict(locals()))
@@ -0,0 +1,275 @@
+"""Modo de riesgo Monte Carlo sobre el motor vectorizado.
+
+Las variables inciertas (precio, ley, recuperación, tiempo de ciclo, factor de
+carga, tipo de cambio, ...) se muestrean por bloques de tamaño fijo, con
+correlación vía cópula gaussiana, y cada bloque se reduce a agregados
+fusionables (sketch de cuantiles, histograma, conteos). La memoria queda
+acotada por `chunk_size` sin importar el número total de sorteos, y los bloques
+se reparten en un pool de procesos.
+"""
+import os
+
+import numpy as np
+
+from .batch import PARAM_NAMES, calculate_detailed_metrics_batch
+from .pool import process_pool
+
+# Variables pensadas para el modo de riesgo (se acepta cualquiera de PARAM_NAMES)
+MC_VARIABLES = (
+    'metal_price', 'grade_pct', 'recovery_pct',
+    'avg_cycle_time_min', 'load_factor_kg_t', 'exchange_rate',
+)
+
+# Límites físicos: las muestras se recortan a estos rangos (el resto >= 0)
+_BOUNDS = {'grade_pct': (0.0, 100.0), 'recovery_pct': (0.0, 100.0)}
+
+
+# --- Sketch de Cuantiles (tipo KLL, fusionable) ---
+class QuantileSketch:
+    """Sketch de cuantiles en memoria acotada, fusionable entre procesos.
+
+    Cada nivel i guarda a lo más `k` valores ordenados con peso 2**i; al
+    desbordar, el nivel se compacta tomando uno de cada dos elementos (con
+    desfase aleatorio) y se promueve al nivel siguiente.
+    """
+
+    def __init__(self, k=4096, seed=None):
+        self.k = k
+        self.levels = []
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _insert(self, level, items):
+        """Inserta valores ordenados en `level`, compactando hacia arriba."""
+        while True:
+            while len(self.levels) <= level: self.levels.append(np.empty(0))
+            if len(self.levels[level]):
+                items = np.sort(np.concatenate([self.levels[level], items]), kind='mergesort')
+            if len(items) <= self.k:
+                self.levels[level] = items
+                return
+            # Si es impar, el último elemento queda en el nivel actual
+            keep = items[-1:] if len(items) % 2 else items[:0]
+            body = items[:len(items) - len(keep)]
+            self.levels[level] = keep
+            items = body[self._rng.integers(2)::2]
+            level += 1
+
+    def update(self, values):
+        """Agrega un bloque de valores (NaN se ignoran)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values): return
+        self.count += len(values)
+        values = np.sort(values)
+        # Un bloque grande se compacta directamente hasta el nivel que le
+        # corresponde (compactar un arreglo ordenado lo mantiene ordenado)
+        level = 0
+        while len(values) > self.k:
+            values = values[self._rng.integers(2)::2]
+            level += 1
+        self._insert(level, values)
+
+    def merge(self, other):
+        """Fusiona otro sketch en este (in-place)."""
+        for level, items in enumerate(other.levels):
+            if len(items): self._insert(level, items)
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Cuantil(es) aproximado(s) para q en [0, 1]."""
+        items = [lv for lv in self.levels if len(lv)]
+        if not items: return np.full(np.shape(q), np.nan) if np.ndim(q) else float('nan')
+        values = np.concatenate(items)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** i) for i, lv in enumerate(self.levels) if len(lv)])
+        order = np.argsort(values, kind='mergesort')
+        values, cum = values[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cum, np.asarray(q) * cum[-1], side='left')
+        out = values[np.clip(idx, 0, len(values) - 1)]
+        return out if np.ndim(q) else float(out)
+
+
+# --- Muestreo ---
+def _norm_cdf(z):
+    """CDF normal estándar vectorizada (erfc de Numerical Recipes, err. rel. < 1.2e-7)."""
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.5 * x)
+    poly = -x * x - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277))))))))
+    erfc = t * np.exp(poly)
+    return np.where(z >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def _transform(spec, z):
+    """Convierte normales estándar `z` a la distribución `spec` (CDF inversa)."""
+    kind, *args = spec
+    if kind == 'normal':
+        mean, sd = args
+        return mean + sd * z
+    if kind == 'lognormal':
+        mu, sigma = args  # parámetros del log
+        return np.exp(mu + sigma * z)
+    u = _norm_cdf(z)
+    if kind == 'uniform':
+        low, high = args
+        return low + (high - low) * u
+    if kind == 'triangular':
+        low, mode, high = args
+        span = high - low
+        fc = (mode - low) / span if span else 0.5
+        left = low + np.sqrt(u * span * (mode - low))
+        right = high - np.sqrt((1.0 - u) * span * (high - mode))
+        return np.where(u < fc, left, right)
+    raise ValueError(f"Distribución no soportada: {kind}")
+
+
+def _validate(distributions, correlations):
+    """Valida las distribuciones y arma el factor de Cholesky de la correlación."""
+    names = list(distributions)
+    unknown = [n for n in names if n not in PARAM_NAMES]
+    if unknown: raise ValueError(f"Parámetros desconocidos: {', '.join(unknown)}")
+    for name, spec in distributions.items():
+        _transform(spec, np.zeros(1))  # falla temprano si la distribución es inválida
+    corr = np.eye(len(names))
+    for (a, b), rho in (correlations or {}).items():
+        if a not in distributions or b not in distributions:
+            raise ValueError(f"Correlación entre variables sin distribución: {a}, {b}")
+        i, j = names.index(a), names.index(b)
+        corr[i, j] = corr[j, i] = rho
+    try:
+        chol = np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        raise ValueError("La matriz de correlación no es definida positiva")
+    return names, chol
+
+
+def sample_inputs(distributions, n, rng, names=None, chol=None):
+    """Muestra `n` valores por variable (dict nombre -> arreglo)."""
+    if names is None: names, chol = _validate(distributions, None)
+    z = rng.standard_normal((n, len(names))) @ chol.T
+    samples = {}
+    for i, name in enumerate(names):
+        low, high = _BOUNDS.get(name, (0.0, np.inf))
+        samples[name] = np.clip(_transform(distributions[name], z[:, i]), low, high)
+    return samples
+
+
+# --- Reducción por Bloques ---
+def _new_aggregate(hist_edges, k, seed):
+    return {
+        'hist_edges': hist_edges, 'n': 0, 'n_invalid': 0, 'n_loss': 0, 'sum_profit': 0.0,
+        'profit': QuantileSketch(k, seed), 'margin_pct': QuantileSketch(k, seed),
+        'cost_per_tonne': QuantileSketch(k, seed),
+        'hist_counts': np.zeros(len(hist_edges) - 1, dtype=np.int64), 'underflow': 0, 'overflow': 0,
+    }
+
+
+def _merge_aggregates(acc, part):
+    for key in ('n', 'n_invalid', 'n_loss', 'sum_profit', 'underflow', 'overflow', 'hist_counts'):
+        acc[key] = acc[key] + part[key]
+    for key in ('profit', 'margin_pct', 'cost_per_tonne'):
+        acc[key].merge(part[key])
+    return acc
+
+
+def _run_chunk(task):
+    """Evalúa un bloque de sorteos y lo reduce a un agregado (ejecutado en el pool)."""
+    base_params, distributions, names, chol, n, seed_seq, hist_edges, k = task
+    rng = np.random.default_rng(seed_seq)
+    params = dict(base_params)
+    params.update(sample_inputs(distributions, n, rng, names, chol))
+    results, _kpis, error_mask, _warnings = calculate_detailed_metrics_batch(params)
+
+    agg = _new_aggregate(hist_edges, k, rng.integers(2**32))
+    valid = error_mask == 0
+    profit = results['operating_profit'][valid]
+    revenue = results['revenue'][valid]
+    cost_pt = results['cost_per_tonne_processed'][valid]
+    agg['n'] = n
+    agg['n_invalid'] = int(n - valid.sum())
+    agg['n_loss'] = int((profit < 0).sum())
+    agg['sum_profit'] = float(profit.sum())
+    agg['profit'].update(profit)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        agg['margin_pct'].update(np.where(revenue != 0, profit / revenue * 100.0, np.nan))
+    agg['cost_per_tonne'].update(cost_pt)
+    agg['hist_counts'] = np.histogram(cost_pt, bins=hist_edges)[0]
+    agg['underflow'] = int((cost_pt < hist_edges[0]).sum())
+    agg['overflow'] = int((cost_pt > hist_edges[-1]).sum())
+    return agg
+
+
+def monte_carlo_plan(base_params, distributions, n_draws=1_000_000, correlations=None,
+                     chunk_size=250_000, seed=None, hist_bins=50, hist_range=None, sketch_k=4096):
+    """Bloques de una simulación: (tareas para _run_chunk, agregado inicial vacío).
+
+    Mismos argumentos que run_monte_carlo. Cada tarea es independiente (su
+    propia semilla) y su resultado se fusiona con _merge_aggregates; el
+    agregado parcial se puede resumir en cualquier momento con
+    summarize_monte_carlo.
+    """
+    missing = [name for name in PARAM_NAMES if name not in base_params and name not in distributions]
+    if missing: raise ValueError(f"Faltan parámetros: {', '.join(missing)}")
+    names, chol = _validate(distributions, correlations)
+    base = {name: base_params[name] for name in PARAM_NAMES if name not in distributions}
+    seed_seq = np.random.SeedSequence(seed)
+
+    if hist_range is None:
+        # Bloque piloto para fijar los bordes del histograma (fuera de rango -> under/overflow)
+        pilot = dict(base)
+        pilot.update(sample_inputs(distributions, min(chunk_size, 20_000), np.random.default_rng(seed_seq.spawn(1)[0]), names, chol))
+        results, _k, error_mask, _w = calculate_detailed_metrics_batch(pilot)
+        cost_pt = results['cost_per_tonne_processed'][error_mask == 0]
+        lo, hi = np.percentile(cost_pt, [0.1, 99.9]) if len(cost_pt) else (0.0, 1.0)
+        pad = (hi - lo) * 0.1 or 1.0
+        hist_range = (lo - pad, hi + pad)
+    hist_edges = np.linspace(hist_range[0], hist_range[1], hist_bins + 1)
+
+    sizes = [chunk_size] * (n_draws // chunk_size)
+    if n_draws % chunk_size: sizes.append(n_draws % chunk_size)
+    tasks = [(base, distributions, names, chol, n, s, hist_edges, sketch_k)
+             for n, s in zip(sizes, seed_seq.spawn(len(sizes)))]
+    return tasks, _new_aggregate(hist_edges, sketch_k, seed)
+
+
+def run_monte_carlo(base_params, distributions, n_draws=1_000_000, correlations=None,
+                    chunk_size=250_000, seed=None, n_workers=None, hist_bins=50,
+                    hist_range=None, sketch_k=4096):
+    """Ejecuta la simulación Monte Carlo y devuelve un dict de estadísticos.
+
+    - `base_params`: dict con los 25 parámetros escalares del escenario base.
+    - `distributions`: dict nombre -> spec, con spec uno de
+      ('normal', media, sd), ('lognormal', mu, sigma), ('uniform', min, max),
+      ('triangular', min, moda, max).
+    - `correlations`: dict {(var_a, var_b): rho} (cópula gaussiana).
+    - `n_workers`: procesos del pool (1 = en el proceso actual).
+    - `hist_range`: (min, max) del histograma de costo/t procesada; si es None se
+      fija con un bloque piloto.
+    """
+    tasks, total = monte_carlo_plan(base_params, distributions, n_draws, correlations, chunk_size, seed,
+                                    hist_bins, hist_range, sketch_k)
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1 or len(tasks) == 1:
+        for task in tasks: _merge_aggregates(total, _run_chunk(task))
+    else:
+        with process_pool(min(n_workers, len(tasks))) as pool:
+            for part in pool.map(_run_chunk, tasks): _merge_aggregates(total, part)
+    return summarize_monte_carlo(total)
+
+
+def summarize_monte_carlo(total):
+    """Estadísticos de un agregado (completo o parcial) de run_monte_carlo."""
+    hist_edges = total['hist_edges']
+    n_valid = total['n'] - total['n_invalid']
+    q = [0.10, 0.50, 0.90]
+    p10, p50, p90 = total['profit'].quantile(q)
+    return {
+        'n_draws': total['n'], 'n_valid': n_valid, 'n_invalid': total['n_invalid'],
+        'p10_operating_profit': float(p10), 'p50_operating_profit': float(p50), 'p90_operating_profit': float(p90),
+        'margin_pct_p10_p50_p90': [float(v) for v in total['margin_pct'].quantile(q)],
+        'mean_operating_profit': total['sum_profit'] / n_valid if n_valid else float('nan'),
+        'prob_loss': total['n_loss'] / n_valid if n_valid else float('nan'),
+        'cost_per_tonne_p10_p50_p90': [float(v) for v in total['cost_per_tonne'].quantile(q)],
+        'hist_edges': hist_edges, 'hist_counts': total['hist_counts'],
+        'hist_underflow': total['underflow'], 'hist_overflow': total['overflow'],
+    }
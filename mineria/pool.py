@@ -0,0 +1,16 @@
+"""Pool de procesos para los cálculos lanzados desde la app.
+
+El servidor de Streamlit tiene varios hilos; un `fork` de ese proceso copia
+los locks tomados por otros hilos y el hijo puede quedar bloqueado. Los pools
+arrancan sus procesos con 'forkserver' (un proceso limpio del que se bifurcan
+los demás) o, donde no existe (Windows), con 'spawn'.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def process_pool(max_workers):
+    """ProcessPoolExecutor cuyos procesos no se bifurcan del proceso actual."""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(START_METHOD))
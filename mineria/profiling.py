@@ -0,0 +1,121 @@
+"""Instrumentación de cada re-ejecución de la app (tiempos por fase y memoria).
+
+Un RerunProfiler se crea al inicio de cada re-ejecución. `lap(nombre)` cierra
+el tramo secuencial en curso (barra lateral, resultados, comparativo...) y
+`phase(nombre)` mide un bloque puntual (cálculo, cada figura, estilo de una
+tabla). Desactivado, `phase` devuelve siempre el mismo contexto vacío y `lap`
+retorna de inmediato, por lo que el costo es despreciable.
+
+Al terminar, `finish()` arma un registro JSON (fases, cachés, memoria de
+session_state) que se emite por el logger `mineria.profiling` y, si está
+definida la variable MINERIA_PROFILE_LOG, se anexa a ese archivo (JSON Lines).
+"""
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+logger = logging.getLogger('mineria.profiling')
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class RerunProfiler:
+    """Tiempos por fase de una re-ejecución; sin efecto si `enabled` es False."""
+
+    def __init__(self, enabled=False, log_path=None):
+        self.enabled = enabled
+        self.log_path = log_path if log_path is not None else os.environ.get('MINERIA_PROFILE_LOG')
+        self.phases = []  # (nombre, segundos, tipo) en orden de ejecución
+        self._t0 = self._last = time.perf_counter()
+
+    def lap(self, name):
+        """Cierra el tramo secuencial que empezó en el lap anterior (o al crear el perfilador)."""
+        if not self.enabled: return
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last, 'lap'))
+        self._last = now
+
+    def phase(self, name):
+        """Contexto que mide un bloque puntual (anidado dentro de un tramo)."""
+        if not self.enabled: return _NULL_CONTEXT
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - t0, 'phase'))
+
+    def finish(self, run=None, cache_stats=None, session_state=None, previous_cache_stats=None):
+        """Registro de la re-ejecución (dict); lo emite como JSON. None si está desactivado.
+
+        Los contadores de `cache_stats` son acumulados; `cache_hits` y
+        `cache_misses` son los de esta re-ejecución, descontando la foto
+        `previous_cache_stats` tomada al terminar la anterior.
+        """
+        if not self.enabled: return None
+        record = {'timestamp': time.time(), 'run': run, 'total_s': time.perf_counter() - self._t0,
+                  'phases': [{'name': n, 'seconds': s, 'kind': k} for n, s, k in self.phases]}
+        if cache_stats is not None:
+            record['cache'] = cache_stats
+            delta = cache_delta(cache_stats, previous_cache_stats)
+            record['cache_hits'] = sum(c['hits'] for c in delta.values())
+            record['cache_misses'] = sum(c['misses'] for c in delta.values())
+        if session_state is not None:
+            sizes = {str(key): deep_sizeof(value) for key, value in session_state.items()}
+            record['session_state_bytes'] = sum(sizes.values())
+            record['session_state_top'] = dict(sorted(sizes.items(), key=lambda kv: -kv[1])[:10])
+        line = json.dumps(record, default=float)
+        logger.info(line)
+        if self.log_path:
+            with open(self.log_path, 'a') as f: f.write(line + '\n')
+        return record
+
+
+def cache_delta(current, previous=None):
+    """Aciertos/fallos por caché desde la foto `previous` (la misma forma que CachedModel.stats()).
+
+    Un caché nuevo, o cuyos contadores bajaron (se volvió a crear), cuenta desde cero.
+    """
+    previous = previous or {}
+    delta = {}
+    for name, c in current.items():
+        p = previous.get(name, {})
+        reset = c['hits'] < p.get('hits', 0) or c['misses'] < p.get('misses', 0)
+        delta[name] = {key: c[key] - (0 if reset else p.get(key, 0)) for key in ('hits', 'misses')}
+    return delta
+
+
+def deep_sizeof(obj, _seen=None):
+    """Tamaño aproximado en bytes de un objeto y lo que contiene.
+
+    Cuenta arreglos NumPy por `nbytes`, DataFrames/Series con memory_usage(deep)
+    y recorre dicts, secuencias y atributos de objetos (una vez cada uno).
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen: return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):  # DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'dtype'):  # Series
+        return int(obj.memory_usage(deep=True))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))): return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(v, seen) for v in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    if hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, s), seen) for s in obj.__slots__ if hasattr(obj, s))
+    return size
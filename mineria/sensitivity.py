@@ -0,0 +1,164 @@
+"""Sensibilidad analítica del modelo (derivadas, elasticidades, tornado y spider).
+
+El modelo es lineal por tramos en casi todos los inputs: los únicos quiebres son
+los recortes `min(horas requeridas, horas disponibles)` de carga, acarreo y
+planta. Para el tramo activo de cada recorte las derivadas de
+`operating_profit` y `cost_per_tonne_processed` se obtienen en forma cerrada,
+sin re-ejecutar el modelo. El tornado y el spider evalúan sus puntos en una
+sola llamada al motor vectorizado.
+"""
+import numpy as np
+
+from .batch import calculate_detailed_metrics_batch
+from .model import PARAM_NAMES, validate_inputs
+
+OUTPUTS = ('operating_profit', 'cost_per_tonne_processed')
+
+
+def _clamp_region(required, available):
+    """'free' si manda lo requerido, 'clamped' si manda lo disponible (como min())."""
+    return 'free' if required <= available else 'clamped'
+
+
+def sensitivities(inputs):
+    """Derivadas y elasticidades exactas en el punto `inputs` (dict de PARAM_NAMES).
+
+    Devuelve (table, info): `table[nombre]` tiene 'd_operating_profit',
+    'd_cost_per_tonne_processed' y las elasticidades 'e_*' (dy/dx * x / y);
+    `info` trae los valores base, el tramo de cada recorte ('free'/'clamped') y
+    si el punto está justo en un quiebre (derivada por un solo lado).
+    """
+    p = {name: float(inputs[name]) for name in PARAM_NAMES}
+    errors = validate_inputs(p)
+    if not errors and p['exchange_rate'] == 0: errors = ["Tipo de Cambio debe ser distinto de 0"]
+    if errors: raise ValueError("; ".join(errors))
+
+    M, s, F, B = p['tonnes_mined_target'], p['strip_ratio'], p['plant_feed_target'], p['tonnes_blasted_period']
+    V = M + M * s  # material movido
+    dV = {'tonnes_mined_target': 1.0 + s, 'strip_ratio': M}
+    d_cost = dict.fromkeys(PARAM_NAMES, 0.0)  # d(total_cost)/dx
+    regions, at_kink = {}, {}
+
+    # --- Perforación y Voladura (lineal) ---
+    lf, ec, cd = p['load_factor_kg_t'], p['explosive_cost_usd_kg'], p['cost_drill_acc_per_t_blasted']
+    d_cost['tonnes_blasted_period'] += lf * ec + cd
+    d_cost['load_factor_kg_t'] += B * ec
+    d_cost['explosive_cost_usd_kg'] += B * lf
+    d_cost['cost_drill_acc_per_t_blasted'] += B
+
+    # --- Carga ---
+    nL, hL, rL, cL = p['loader_count'], p['loader_op_hours_period'], p['loader_rate_tph'], p['cost_load_per_hr']
+    avail = nL * hL
+    required = V / (rL * nL) if rL * nL > 0 else float('inf')
+    regions['loading'] = _clamp_region(required, avail); at_kink['loading'] = required == avail
+    if regions['loading'] == 'free':
+        hours = required
+        for name, dv in dV.items(): d_cost[name] += dv * cL / (rL * nL)
+        d_cost['loader_rate_tph'] += -hours * cL / rL
+        d_cost['loader_count'] += -hours * cL / nL
+    else:
+        hours = avail
+        d_cost['loader_count'] += hL * cL
+        d_cost['loader_op_hours_period'] += nL * cL
+    d_cost['cost_load_per_hr'] += hours
+    cost_load = hours * cL
+
+    # --- Acarreo ---
+    nT, hT, P, ct, cH = p['truck_count'], p['truck_op_hours_period'], p['truck_payload'], p['avg_cycle_time_min'], p['cost_haul_per_hr']
+    phth = 60.0 / ct * P
+    avail = nT * hT
+    required = V / (phth * nT) if phth * nT > 0 else float('inf')
+    regions['hauling'] = _clamp_region(required, avail); at_kink['hauling'] = required == avail
+    if regions['hauling'] == 'free':
+        hours = required
+        for name, dv in dV.items(): d_cost[name] += dv * cH / (phth * nT)
+        d_cost['avg_cycle_time_min'] += hours * cH / ct
+        d_cost['truck_payload'] += -hours * cH / P
+        d_cost['truck_count'] += -hours * cH / nT
+    else:
+        hours = avail
+        d_cost['truck_count'] += hT * cH
+        d_cost['truck_op_hours_period'] += nT * cH
+    d_cost['cost_haul_per_hr'] += hours
+    cost_haul = hours * cH
+
+    # --- Planta ---
+    hP, tph, cP = p['plant_op_hours_period'], p['plant_throughput_tph'], p['cost_process_per_hr']
+    required = F / tph if tph > 0 else float('inf')
+    regions['processing'] = _clamp_region(required, hP); at_kink['processing'] = required == hP
+    if regions['processing'] == 'free':
+        hours = required
+        d_cost['plant_feed_target'] += cP / tph
+        d_cost['plant_throughput_tph'] += -hours * cP / tph
+    else:
+        hours = hP
+        d_cost['plant_op_hours_period'] += cP
+    d_cost['cost_process_per_hr'] += hours
+    cost_process = hours * cP
+
+    # --- Costos Fijos ---
+    d_cost['cost_maint_fixed'] += 1.0
+    d_cost['cost_ga_fixed'] += 1.0
+    total_cost = (B * lf * ec + B * cd) + cost_load + cost_haul + cost_process + p['cost_maint_fixed'] + p['cost_ga_fixed']
+
+    # --- Ingresos: R = F * g/100 * r/100 * precio / tc ---
+    g, r, price, fx = p['grade_pct'], p['recovery_pct'], p['metal_price'], p['exchange_rate']
+    revenue = F * (g / 100.0) * (r / 100.0) * price / fx
+    d_rev = dict.fromkeys(PARAM_NAMES, 0.0)
+    d_rev['plant_feed_target'] = (g / 100.0) * (r / 100.0) * price / fx
+    d_rev['grade_pct'] = F / 100.0 * (r / 100.0) * price / fx
+    d_rev['recovery_pct'] = F * (g / 100.0) / 100.0 * price / fx
+    d_rev['metal_price'] = F * (g / 100.0) * (r / 100.0) / fx
+    d_rev['exchange_rate'] = -revenue / fx
+
+    # --- Salidas ---
+    profit = revenue - total_cost
+    cost_pt = total_cost / F
+    table = {}
+    for name in PARAM_NAMES:
+        d_profit = d_rev[name] - d_cost[name]
+        d_cpt = d_cost[name] / F - (total_cost / F ** 2 if name == 'plant_feed_target' else 0.0)
+        x = p[name]
+        table[name] = {
+            'd_operating_profit': d_profit, 'd_cost_per_tonne_processed': d_cpt,
+            'e_operating_profit': d_profit * x / profit if profit else float('nan'),
+            'e_cost_per_tonne_processed': d_cpt * x / cost_pt if cost_pt else float('nan'),
+        }
+    info = {'operating_profit': profit, 'cost_per_tonne_processed': cost_pt,
+            'regions': regions, 'at_kink': at_kink}
+    return table, info
+
+
+def tornado(inputs, pct=10.0, output='operating_profit', names=PARAM_NAMES):
+    """Valores de `output` con cada input en -pct% y +pct% (exactos, una llamada en lote).
+
+    Devuelve una lista de dicts ordenada por amplitud de la oscilación
+    (mayor primero): name, low, high, swing. Las filas inválidas quedan en NaN.
+    """
+    if output not in OUTPUTS: raise ValueError(f"Salida no soportada: {output}")
+    names = list(names)
+    base = np.array([float(inputs[n]) for n in PARAM_NAMES])
+    rows = np.repeat(base[None, :], 2 * len(names), axis=0)
+    for i, name in enumerate(names):
+        j = PARAM_NAMES.index(name)
+        rows[2 * i, j] *= 1 - pct / 100.0
+        rows[2 * i + 1, j] *= 1 + pct / 100.0
+    values = calculate_detailed_metrics_batch(rows)[0][output]
+    table = [{'name': name, 'low': values[2 * i], 'high': values[2 * i + 1],
+              'swing': abs(values[2 * i + 1] - values[2 * i])} for i, name in enumerate(names)]
+    return sorted(table, key=lambda row: -np.nan_to_num(row['swing'], nan=-1.0))
+
+
+def spider(inputs, names, pct_range=20.0, steps=9, output='operating_profit'):
+    """Barrido spider: `output` vs variación % de cada input (una llamada en lote).
+
+    Devuelve (pcts, {nombre: arreglo de valores}).
+    """
+    if output not in OUTPUTS: raise ValueError(f"Salida no soportada: {output}")
+    pcts = np.linspace(-pct_range, pct_range, steps)
+    base = np.array([float(inputs[n]) for n in PARAM_NAMES])
+    rows = np.repeat(base[None, :], len(names) * steps, axis=0)
+    for i, name in enumerate(names):
+        rows[i * steps:(i + 1) * steps, PARAM_NAMES.index(name)] *= 1 + pcts / 100.0
+    values = calculate_detailed_metrics_batch(rows)[0][output]
+    return pcts, {name: values[i * steps:(i + 1) * steps] for i, name in enumerate(names)}
@@ -0,0 +1,248 @@
+"""Almacén persistente de escenarios guardados (SQLite, una columna por campo).
+
+Reemplaza la lista de dicts en `st.session_state`: los escenarios sobreviven al
+fin de la sesión, se escriben solo por anexado (en lote, en una transacción),
+están indexados por nombre y por hash de inputs, y se leen por páginas o por
+columnas completas sin reconstruir filas en Python. Los filtros (nombre y
+rangos por columna) se resuelven en SQL. `set_hash()` identifica el conjunto
+de escenarios guardado (cambia con cada anexado o limpieza) para usarlo como
+clave de caché.
+
+El almacén es compartido: cada escenario guarda opcionalmente su dueño (la
+sesión que lo creó), de modo que una sesión pueda limpiar solo lo suyo
+(`clear(owner=...)`); `clear()` sin dueño borra todo.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from .model import PARAM_NAMES, inputs_hash, inputs_hash_rows
+
+# Columnas de salida guardadas: columna -> (bloque, clave) de calculate_detailed_metrics
+OUTPUT_COLUMNS = {
+    'revenue': ('results', 'revenue'), 'total_cost': ('results', 'total_cost'),
+    'operating_profit': ('results', 'operating_profit'),
+    'cost_per_tonne_processed': ('results', 'cost_per_tonne_processed'),
+    'profit_per_tonne_processed': ('results', 'profit_per_tonne_processed'),
+    'actual_tonnes_per_truck_hr': ('kpis', 'actual_tonnes_per_truck_hr'),
+    'actual_tonnes_per_loader_hr': ('kpis', 'actual_tonnes_per_loader_hr'),
+    'actual_tph_plant': ('kpis', 'actual_tph_plant'),
+    'cost_per_total_tonne_moved': ('kpis', 'cost_per_total_tonne_moved'),
+    'cost_explosives_total': ('results', 'cost_explosives'),
+    'cost_drill_acc_total': ('results', 'cost_drill_accessories'),
+}
+META_COLUMNS = ('id', 'name', 'input_hash', 'created_at', 'owner')
+ALL_COLUMNS = META_COLUMNS + PARAM_NAMES + tuple(OUTPUT_COLUMNS)
+_VALUE_COLUMNS = PARAM_NAMES + tuple(OUTPUT_COLUMNS)
+
+
+def scenario_record(name, inputs, results, kpis):
+    """Arma el registro de un escenario (inputs + salidas) como lo guarda la app."""
+    blocks = {'results': results or {}, 'kpis': kpis or {}}
+    record = {'name': name}
+    record.update((key, inputs[key]) for key in PARAM_NAMES)
+    record.update((col, blocks[block].get(key)) for col, (block, key) in OUTPUT_COLUMNS.items())
+    return record
+
+
+class ScenarioStore:
+    """Tabla de escenarios en SQLite con escrituras solo de anexado."""
+
+    def __init__(self, path='escenarios_mineria.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            if path != ':memory:': self._conn.execute("PRAGMA journal_mode=WAL")
+            value_cols = ', '.join(f'"{c}" REAL' for c in _VALUE_COLUMNS)
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS scenarios (id INTEGER PRIMARY KEY, name TEXT, input_hash TEXT, created_at REAL, owner TEXT, {value_cols})")
+            if 'owner' not in [row[1] for row in self._conn.execute("PRAGMA table_info(scenarios)")]:
+                self._conn.execute("ALTER TABLE scenarios ADD COLUMN owner TEXT")  # almacén previo a los dueños
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_scenarios_name ON scenarios(name)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_scenarios_hash ON scenarios(input_hash)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_scenarios_owner ON scenarios(owner)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+            if self._conn.execute("SELECT 1 FROM store_meta WHERE key = 'set_hash'").fetchone() is None:
+                # Almacén previo a store_meta: hash de lo ya guardado
+                rows = self._conn.execute("SELECT name, input_hash FROM scenarios ORDER BY id").fetchall()
+                self._conn.execute("INSERT INTO store_meta VALUES ('set_hash', ?)", (_chain_hash(_EMPTY_SET_HASH, rows) if rows else _EMPTY_SET_HASH,))
+
+    # --- Escritura (solo anexado) ---
+    def append(self, record, owner=None):
+        """Anexa un escenario (dict de scenario_record) y devuelve su id."""
+        return self.append_many([record], owner=owner)[-1]
+
+    def append_many(self, records, owner=None):
+        """Anexa varios escenarios en una sola transacción; devuelve sus ids."""
+        rows = []
+        now = time.time()
+        for rec in records:
+            rows.append((rec.get('name'), rec.get('input_hash') or inputs_hash(rec), now, owner)
+                        + tuple(_to_sql(rec.get(c)) for c in _VALUE_COLUMNS))
+        return self._insert(rows)
+
+    def append_columns(self, names, inputs, results, kpis, owner=None):
+        """Anexa N escenarios dados en columnas (p.ej. salida del motor en lote)."""
+        blocks = {'results': results, 'kpis': kpis}
+        n = len(names)
+        cols = [np.broadcast_to(np.asarray(inputs[c], dtype=np.float64), (n,)) for c in PARAM_NAMES]
+        cols += [np.asarray(blocks[block][key], dtype=np.float64) for block, key in OUTPUT_COLUMNS.values()]
+        matrix = np.column_stack(cols)
+        hashes = inputs_hash_rows(matrix[:, :len(PARAM_NAMES)])
+        # NaN -> NULL de forma vectorizada
+        values = matrix.astype(object)
+        values[np.isnan(matrix)] = None
+        now = time.time()
+        rows = [(name, h, now, owner, *row) for name, h, row in zip(names, hashes, values.tolist())]
+        return self._insert(rows)
+
+    def _insert(self, rows):
+        placeholders = ', '.join('?' * (4 + len(_VALUE_COLUMNS)))
+        cols = _sql_columns(('name', 'input_hash', 'created_at', 'owner') + _VALUE_COLUMNS)
+        with self._lock, self._conn:
+            # Toma el bloqueo de escritura antes de leer MAX(id): otro proceso no puede anexar entre la lectura y el INSERT
+            self._conn.execute("BEGIN IMMEDIATE")
+            first = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM scenarios").fetchone()[0] + 1
+            self._conn.executemany(f"INSERT INTO scenarios ({cols}) VALUES ({placeholders})", rows)
+            self._set_hash(_chain_hash(self._get_hash(), [row[:2] for row in rows]))
+        return list(range(first, first + len(rows)))
+
+    def clear(self, owner=None):
+        """Borra los escenarios de `owner`, o todos (de todas las sesiones) si owner es None.
+
+        Devuelve cuántos se borraron.
+        """
+        with self._lock, self._conn:
+            if owner is None:
+                deleted = self._conn.execute("DELETE FROM scenarios").rowcount
+                self._set_hash(_EMPTY_SET_HASH)
+                return deleted
+            deleted = self._conn.execute("DELETE FROM scenarios WHERE owner = ?", (owner,)).rowcount
+            if deleted:
+                # Un borrado parcial no se puede encadenar: se rehace el hash con lo que queda
+                rows = self._conn.execute("SELECT name, input_hash FROM scenarios ORDER BY id").fetchall()
+                self._set_hash(_chain_hash(_EMPTY_SET_HASH, rows) if rows else _EMPTY_SET_HASH)
+            return deleted
+
+    def _get_hash(self):
+        return self._conn.execute("SELECT value FROM store_meta WHERE key = 'set_hash'").fetchone()[0]
+
+    def _set_hash(self, value):
+        self._conn.execute("UPDATE store_meta SET value = ? WHERE key = 'set_hash'", (value,))
+
+    # --- Lectura ---
+    def set_hash(self):
+        """Hash del conjunto de escenarios guardado (nombres e inputs, en orden de id)."""
+        with self._lock:
+            return self._get_hash()
+
+    def count(self, filters=None):
+        where, args = _where(filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM scenarios{where}", args).fetchone()[0]
+
+    def page(self, offset=0, limit=100, order_by='id', descending=False, columns=None, filters=None):
+        """Una página de escenarios como dict columna -> lista.
+
+        `filters`: {'name': texto contenido en el nombre, 'owner': dueño exacto,
+        columna: (mín, máx)} (None en un extremo = sin límite); se aplica también
+        en count() y column_arrays().
+        """
+        columns = _check_columns(columns or ALL_COLUMNS)
+        if order_by not in ALL_COLUMNS: raise ValueError(f"Columna de orden desconocida: {order_by}")
+        where, args = _where(filters)
+        sql = (f"SELECT {_sql_columns(columns)} FROM scenarios{where} "
+               f"ORDER BY \"{order_by}\" {'DESC' if descending else 'ASC'}, id LIMIT ? OFFSET ?")
+        with self._lock:
+            rows = self._conn.execute(sql, args + [int(limit), int(offset)]).fetchall()
+        return {c: [row[i] for row in rows] for i, c in enumerate(columns)}
+
+    def column_arrays(self, columns, filters=None):
+        """Columnas completas como arreglos NumPy (numéricas en float64)."""
+        columns = _check_columns(columns)
+        where, args = _where(filters)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_sql_columns(columns)} FROM scenarios{where} ORDER BY id", args).fetchall()
+        out = {}
+        for i, c in enumerate(columns):
+            values = [row[i] for row in rows]
+            out[c] = np.array(values, dtype=object if c in ('name', 'input_hash', 'owner') else np.float64)
+        return out
+
+    def iter_chunks(self, columns=None, chunk_rows=10_000):
+        """Recorre todos los escenarios por bloques (dict columna -> lista), en orden de id.
+
+        Pagina por id (no por OFFSET), así cada bloque cuesta lo mismo sin
+        importar cuántos escenarios haya antes.
+        """
+        columns = _check_columns(columns or ALL_COLUMNS)
+        sql = f"SELECT id, {_sql_columns(columns)} FROM scenarios WHERE id > ? ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, (last_id, int(chunk_rows))).fetchall()
+            if not rows: return
+            last_id = rows[-1][0]
+            yield {c: [row[i + 1] for row in rows] for i, c in enumerate(columns)}
+
+    def find_by_hash(self, input_hash):
+        """Ids de los escenarios con el hash de inputs dado."""
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT id FROM scenarios WHERE input_hash = ? ORDER BY id", (input_hash,))]
+
+    def find_by_name(self, name):
+        """Ids de los escenarios con el nombre dado."""
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT id FROM scenarios WHERE name = ? ORDER BY id", (name,))]
+
+    def close(self):
+        self._conn.close()
+
+
+def _check_columns(columns):
+    unknown = [c for c in columns if c not in ALL_COLUMNS]
+    if unknown: raise ValueError(f"Columnas desconocidas: {', '.join(unknown)}")
+    return tuple(columns)
+
+
+def _sql_columns(columns):
+    return ', '.join(f'"{c}"' for c in columns)
+
+
+def _where(filters):
+    """Cláusula WHERE (con parámetros) para los filtros de page/count/column_arrays."""
+    clauses, args = [], []
+    for key, value in (filters or {}).items():
+        if key == 'name':
+            if not value: continue
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            args.append('%' + value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+            continue
+        if key == 'owner':
+            clauses.append("owner = ?"); args.append(value)
+            continue
+        _check_columns((key,))
+        low, high = value
+        if low is not None: clauses.append(f'"{key}" >= ?'); args.append(float(low))
+        if high is not None: clauses.append(f'"{key}" <= ?'); args.append(float(high))
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), args
+
+
+def _chain_hash(previous, rows):
+    """Encadena el hash del conjunto con filas (name, input_hash) anexadas."""
+    h = hashlib.sha1(previous.encode())
+    for name, input_hash in rows: h.update(f"{name}\x1f{input_hash}\x1e".encode())
+    return h.hexdigest()
+
+
+_EMPTY_SET_HASH = _chain_hash('', [])
+
+
+def _to_sql(value):
+    """None y NaN se guardan como NULL."""
+    if value is None: return None
+    value = float(value)
+    return None if np.isnan(value) else value
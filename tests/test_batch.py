@@ -0,0 +1,70 @@
+"""Paridad exacta del motor en lote con calculate_detailed_metrics (escalar)."""
+import re
+
+import numpy as np
+import pytest
+
+from mineria import (DEFAULT_INPUTS, ERROR_FLAGS, PARAM_NAMES, WARNING_FLAGS, calculate_detailed_metrics,
+                     calculate_detailed_metrics_batch, decode_flags)
+
+
+def _random_columns(n, seed=0):
+    """Escenarios muy dispersos (incluye negativos, ceros y recortes de capacidad)."""
+    rng = np.random.default_rng(seed)
+    cols = {name: DEFAULT_INPUTS[name] * rng.uniform(-0.3, 2.5, n) for name in PARAM_NAMES}
+    cols['exchange_rate'][:5] = 0.0
+    cols['plant_throughput_tph'][5:10] = 0.0
+    cols['loader_count'][10:15] = 0.0
+    return cols
+
+
+def _without_figures(warnings):
+    """Las advertencias escalares llevan cifras entre paréntesis: 'Movido (1,000t) > Cap. Carga (900t)'."""
+    return [re.sub(r' \([^)]*\)', '', w) for w in warnings]
+
+
+def test_batch_matches_scalar_bit_exact():
+    cols = _random_columns(2000)
+    results, kpis, error_mask, warning_mask = calculate_detailed_metrics_batch(cols)
+    n_valid = 0
+    for i in range(2000):
+        res, kp, errors, warnings = calculate_detailed_metrics(**{name: float(cols[name][i]) for name in PARAM_NAMES})
+        # El error inesperado escalar agrega el texto de la excepción
+        decoded = decode_flags(error_mask[i], ERROR_FLAGS)
+        assert len(decoded) == len(errors) and all(e.startswith(d) for d, e in zip(decoded, errors)), (i, errors)
+        assert decode_flags(warning_mask[i], WARNING_FLAGS) == _without_figures(warnings), (i, warnings)
+        if errors:
+            assert res is None
+            continue
+        n_valid += 1
+        for key, value in res.items():
+            assert value == results[key][i] or (np.isnan(value) and np.isnan(results[key][i])), (i, key)
+        for key, value in kp.items():
+            assert value == kpis[key][i], (i, key)
+    # La muestra cubre filas válidas e inválidas
+    assert 0 < n_valid < 2000
+
+
+def test_default_inputs_single_row():
+    results, kpis, errors, warnings = calculate_detailed_metrics(**DEFAULT_INPUTS)
+    b_results, b_kpis, error_mask, warning_mask = calculate_detailed_metrics_batch(DEFAULT_INPUTS)
+    assert not errors and error_mask.tolist() == [0]
+    assert {key: b_results[key][0] for key in results} == results
+    assert {key: b_kpis[key][0] for key in kpis} == kpis
+    assert decode_flags(warning_mask[0]) == _without_figures(warnings)
+
+
+def test_matrix_input_and_broadcasting():
+    cols = _random_columns(50, seed=1)
+    matrix = np.column_stack([cols[name] for name in PARAM_NAMES])
+    from_matrix = calculate_detailed_metrics_batch(matrix)[0]['operating_profit']
+    from_dict = calculate_detailed_metrics_batch(cols)[0]['operating_profit']
+    np.testing.assert_array_equal(from_matrix, from_dict)
+    # Un solo input en arreglo, el resto escalares
+    mixed = dict(DEFAULT_INPUTS, metal_price=np.array([3.0, 3.5, 4.0]))
+    assert len(calculate_detailed_metrics_batch(mixed)[0]['revenue']) == 3
+
+
+def test_missing_parameter_raises():
+    with pytest.raises(ValueError):
+        calculate_detailed_metrics_batch({name: 1.0 for name in PARAM_NAMES[1:]})
@@ -0,0 +1,81 @@
+"""Modelo de bloques: curvas ley-tonelaje contra un cálculo directo, caché y ley de corte óptima."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from mineria import DEFAULT_INPUTS
+from mineria.block_model import BlockModel, optimal_cutoff
+
+
+def _blocks(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    grade = np.round(rng.lognormal(-0.6, 0.7, n), 2)  # redondeo: muchas leyes repetidas (empates)
+    return pd.DataFrame({'tonnage': rng.uniform(5_000, 20_000, n), 'grade': grade, 'is_ore': rng.random(n) < 0.6})
+
+
+def _brute_force(df, cutoff):
+    ore = df[df['is_ore'] & (df['grade'] >= cutoff)]
+    tonnes = ore['tonnage'].sum()
+    metal = (ore['tonnage'] * ore['grade'] / 100.0).sum()
+    return tonnes, metal
+
+
+def test_grade_tonnage_matches_brute_force(tmp_path):
+    df = _blocks()
+    df.to_csv(tmp_path / 'bm.csv', index=False)
+    bm = BlockModel.load(str(tmp_path / 'bm.csv'), chunk_rows=700)
+    ore_grades = np.unique(df.loc[df['is_ore'], 'grade'])
+    cutoffs = np.concatenate([[0.0, -1.0, ore_grades.max() + 1.0], ore_grades[::7], ore_grades[::11] + 0.005])
+    curve = bm.grade_tonnage(cutoffs)
+    for i, cutoff in enumerate(cutoffs):
+        tonnes, metal = _brute_force(df, cutoff)
+        assert curve['ore_tonnes'][i] == pytest.approx(tonnes, rel=1e-9, abs=1e-6)
+        assert curve['metal'][i] == pytest.approx(metal, rel=1e-9, abs=1e-9)
+        assert curve['waste_tonnes'][i] == pytest.approx(df['tonnage'].sum() - tonnes, rel=1e-9)
+        if tonnes: assert curve['head_grade_pct'][i] == pytest.approx(metal / tonnes * 100.0, rel=1e-9)
+        else: assert curve['strip_ratio'][i] == np.inf
+    assert bm.meta['n_blocks'] == len(df) and bm.meta['n_ore_blocks'] == int(df['is_ore'].sum())
+
+
+def test_cache_is_reused_and_invalidated(tmp_path):
+    path = tmp_path / 'bm.npy'
+    df = _blocks(500)
+    data = np.zeros(len(df), dtype=[('tonnage', 'f8'), ('grade', 'f8'), ('is_ore', '?')])
+    for name in data.dtype.names: data[name] = df[name]
+    np.save(path, data)
+    first = BlockModel.load(str(path))
+    assert BlockModel.load(str(path)).meta == first.meta
+    np.save(path, data[:100])
+    assert BlockModel.load(str(path)).meta['n_blocks'] == 100
+
+
+def test_npy_requires_named_columns(tmp_path):
+    plain = tmp_path / 'plain.npy'
+    np.save(plain, np.ones((10, 3)))
+    with pytest.raises(ValueError, match="estructurado"):
+        BlockModel.load(str(plain))
+    named = tmp_path / 'named.npy'
+    np.save(named, np.zeros(10, dtype=[('tonnage', 'f8'), ('au', 'f8')]))
+    with pytest.raises(ValueError, match="grade"):
+        BlockModel.load(str(named))
+
+
+def test_unsupported_format(tmp_path):
+    path = tmp_path / 'bm.xlsx'
+    path.write_bytes(b'')
+    with pytest.raises(ValueError, match="no soportado"):
+        BlockModel.load(str(path))
+
+
+def test_optimal_cutoff_is_best_feasible_point(tmp_path):
+    _blocks().to_csv(tmp_path / 'bm.csv', index=False)
+    bm = BlockModel.load(str(tmp_path / 'bm.csv'))
+    inputs = dict(DEFAULT_INPUTS, metal_price=8000.0)  # $/t de metal: con el precio por defecto no hay margen
+    best, curve = optimal_cutoff(bm, inputs)
+    assert best is not None
+    assert best['pit_profit'] == pytest.approx(np.nanmax(curve['pit_profit']))
+    assert curve['feasible'][list(curve['cutoff']).index(best['cutoff'])]
+    assert np.all(np.isnan(curve['pit_profit'][~curve['feasible']]))
+    # Con mejor precio conviene bajar la ley de corte
+    assert optimal_cutoff(bm, dict(inputs, metal_price=12000.0))[0]['cutoff'] <= best['cutoff']
+    assert optimal_cutoff(bm, DEFAULT_INPUTS)[0] is None
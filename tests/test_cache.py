@@ -0,0 +1,66 @@
+"""Cachés LRU de resultados, secciones y figuras entre re-ejecuciones."""
+from mineria import DEFAULT_INPUTS, calculate_detailed_metrics
+from mineria.cache import CachedModel, LRUCache
+from mineria.model import SECTIONS
+
+
+def test_identical_inputs_hit():
+    model = CachedModel()
+    first = model.evaluate(DEFAULT_INPUTS)
+    assert first == calculate_detailed_metrics(**DEFAULT_INPUTS)
+    assert sorted(model.last_recomputed) == sorted(SECTIONS)
+    again = model.evaluate(dict(DEFAULT_INPUTS))
+    assert again == first and model.last_recomputed == []
+    assert (model.results.hits, model.results.misses) == (1, 1)
+    again[0]['operating_profit'] = 0.0  # copia: no altera lo cacheado
+    assert model.evaluate(DEFAULT_INPUTS)[0]['operating_profit'] == first[0]['operating_profit']
+
+
+def test_changed_input_recomputes_only_dependent_sections():
+    model = CachedModel()
+    model.evaluate(DEFAULT_INPUTS)
+    changed = dict(DEFAULT_INPUTS, metal_price=4.0)
+    out = model.evaluate(changed)
+    assert model.last_recomputed == ['revenue']
+    assert out == calculate_detailed_metrics(**changed)
+    assert model.results.misses == 2
+    model.evaluate(dict(DEFAULT_INPUTS, cost_haul_per_hr=310.0))
+    assert model.last_recomputed == ['hauling']
+
+
+def test_lru_eviction_at_capacity():
+    cache = LRUCache(maxsize=2)
+    calls = []
+
+    def compute(key):
+        return lambda: calls.append(key) or key
+
+    for key in ('a', 'b', 'a', 'c'): cache.get_or_compute(key, compute(key))  # 'a' se usó último: sale 'b'
+    assert len(cache) == 2 and calls == ['a', 'b', 'c']
+    cache.get_or_compute('a', compute('a'))
+    cache.get_or_compute('b', compute('b'))
+    assert calls == ['a', 'b', 'c', 'b'] and (cache.hits, cache.misses) == (2, 4)
+
+    model = CachedModel(maxsize=2)
+    for price in (3.0, 3.1, 3.2): model.evaluate(dict(DEFAULT_INPUTS, metal_price=price))
+    model.evaluate(dict(DEFAULT_INPUTS, metal_price=3.0))  # desalojado
+    assert len(model.results) == 2 and model.results.misses == 4 and model.last_recomputed == ['revenue']
+
+
+def test_same_figure_object_returned():
+    model = CachedModel()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return object()
+
+    fig = model.figure('torta', (1.0, 2.0), build)
+    assert model.figure('torta', (1.0, 2.0), build) is fig and len(builds) == 1
+    assert model.figure('torta', (1.0, 2.5), build) is not fig
+    assert model.figure('cascada', (1.0, 2.0), build) is not fig and len(builds) == 3
+    figs = model.figure_set('comparativo', ('hash', ()), lambda: [object(), object()])
+    assert model.figure_set('comparativo', ('hash', ()), lambda: []) is figs
+    model.clear()
+    assert model.figure('torta', (1.0, 2.0), build) is not fig
+    assert model.stats()['figures'] == {'hits': 1, 'misses': 4, 'size': 1}
@@ -0,0 +1,73 @@
+"""Vistas comparativas: barras hasta BAR_LIMIT, histogramas/Scattergl sobre eso y clave de caché."""
+import numpy as np
+import pytest
+
+from mineria import DEFAULT_INPUTS, PARAM_NAMES, calculate_detailed_metrics_batch
+from mineria.cache import CachedModel
+from mineria.charts import (BAR_LIMIT, COMPARISON_BARS, VIEW_AUTO, VIEW_BARS, VIEW_HIST, VIEW_SCATTER, build_comparison_view,
+                            comparison_view_key, resolve_comparison_view)
+from mineria.store import ScenarioStore
+
+
+@pytest.fixture
+def store():
+    store = ScenarioStore(':memory:')
+    rng = np.random.default_rng(0)
+    n = BAR_LIMIT + 1
+    cols = {name: DEFAULT_INPUTS[name] * rng.uniform(0.8, 1.2, n) for name in PARAM_NAMES}
+    results, kpis, _e, _w = calculate_detailed_metrics_batch(cols)
+    store.append_columns([f"Escenario {i}" for i in range(n)], cols, results, kpis)
+    yield store
+    store.close()
+
+
+def test_automatic_view_switches_above_bar_limit():
+    assert resolve_comparison_view(VIEW_AUTO, BAR_LIMIT, 50) == (VIEW_BARS, BAR_LIMIT)
+    assert resolve_comparison_view(VIEW_AUTO, BAR_LIMIT + 1, 50) == (VIEW_HIST, 50)
+    assert resolve_comparison_view(VIEW_SCATTER, 10, 50) == (VIEW_SCATTER, 50)  # elegida a mano: se respeta
+
+
+def test_views_build_expected_traces(store):
+    # BAR_LIMIT + 1 escenarios: la vista automática agrega en histogramas (40 contenedores, no N barras)
+    view, top_n = resolve_comparison_view(VIEW_AUTO, store.count({}), 50)
+    hist = build_comparison_view(store, view, {}, top_n, 'operating_profit', True)
+    assert len(hist) == len(COMPARISON_BARS) and all(len(fig.data[0].x) == 40 for fig in hist)
+    assert "101 escenarios" in hist[0].layout.title.text
+
+    # Un filtro que deja pocos escenarios vuelve a las barras, de todos y en el orden pedido
+    name_filter = {'name': 'Escenario 1'}  # 'Escenario 1', 'Escenario 10'... : 12 de los 101
+    view, top_n = resolve_comparison_view(VIEW_AUTO, store.count(name_filter), 50)
+    bars = build_comparison_view(store, view, name_filter, top_n, 'operating_profit', True)
+    assert view == VIEW_BARS and len(bars[0].data[0].x) == store.count(name_filter)
+    assert list(bars[0].data[0].y) == sorted(bars[0].data[0].y, reverse=True)
+    top = build_comparison_view(store, VIEW_BARS, {}, BAR_LIMIT, 'operating_profit', True)
+    assert len(top[0].data[0].x) == BAR_LIMIT
+
+    scatter = build_comparison_view(store, VIEW_SCATTER, {}, 50, 'operating_profit', True)
+    assert all(fig.data[0].type == 'scattergl' and len(fig.data[0].y) == BAR_LIMIT + 1 for fig in scatter)
+
+
+def test_figure_set_key_misses_on_filter_change(store):
+    model = CachedModel()
+    builds = []
+
+    def figures(filters):
+        key = comparison_view_key(store.set_hash(), filters, VIEW_HIST, 50, 'operating_profit', True)
+
+        def build():
+            builds.append(filters)
+            return build_comparison_view(store, VIEW_HIST, filters, 50, 'operating_profit', True)
+        return model.figure_set('comparativo', key, build)
+
+    first = figures({})
+    assert figures({}) is first and len(builds) == 1
+    # Top-N y orden no cuentan para los histogramas
+    assert comparison_view_key('h', {}, VIEW_HIST, 10, 'a', False) == comparison_view_key('h', {}, VIEW_HIST, 50, 'b', True)
+    assert comparison_view_key('h', {}, VIEW_BARS, 10, 'a', False) != comparison_view_key('h', {}, VIEW_BARS, 50, 'a', False)
+    filtered = figures({'name': 'Escenario 1'})
+    assert filtered is not first and len(builds) == 2
+    assert comparison_view_key('h', {'a': 1, 'b': 2}, VIEW_HIST, 1, 'x', True) == comparison_view_key('h', {'b': 2, 'a': 1}, VIEW_HIST, 1, 'x', True)
+    # Un escenario nuevo cambia el hash del conjunto: también es un fallo
+    results, kpis, _e, _w = calculate_detailed_metrics_batch(DEFAULT_INPUTS)
+    store.append_columns(["Otro"], {name: np.array([float(DEFAULT_INPUTS[name])]) for name in PARAM_NAMES}, results, kpis)
+    assert figures({}) is not first and len(builds) == 3
@@ -0,0 +1,31 @@
+"""CLI de evaluación en lote (CSV)."""
+import numpy as np
+import pandas as pd
+
+from mineria import DEFAULT_INPUTS, calculate_detailed_metrics
+from mineria.cli import main
+
+
+def test_cli_overwrites_stale_outputs(tmp_path):
+    source, target = tmp_path / 'in.csv', tmp_path / 'out.csv'
+    df = pd.DataFrame([DEFAULT_INPUTS, dict(DEFAULT_INPUTS, metal_price=5.0)])
+    df['operating_profit'] = -1.0  # resultado viejo de una corrida anterior
+    df.to_csv(source, index=False)
+    assert main([str(source), '-o', str(target), '-w', '1', '--messages']) == 0
+    out = pd.read_csv(target)
+    expected = [calculate_detailed_metrics(**row)[0]['operating_profit'] for row in df.drop(columns='operating_profit').to_dict('records')]
+    np.testing.assert_allclose(out['operating_profit'], expected, rtol=1e-12)
+    assert out['metal_price'].tolist() == [DEFAULT_INPUTS['metal_price'], 5.0]
+    assert (out['error_mask'] == 0).all()
+
+
+def test_cli_fills_missing_inputs_and_flags_errors(tmp_path):
+    source, target = tmp_path / 'in.csv', tmp_path / 'out.csv'
+    pd.DataFrame({'metal_price': [3.5, 4.0], 'tonnes_blasted_period': [480000, 0]}).to_csv(source, index=False)
+    assert main([str(source), '-o', str(target), '-w', '1', '--messages']) == 0
+    out = pd.read_csv(target)
+    assert out['error_mask'].tolist()[0] == 0 and out['error_mask'].tolist()[1] != 0
+    assert 'Toneladas Voladas' in out['errors'][1]
+    # Inputs ausentes completados con DEFAULT_INPUTS; la fila con error queda sin resultados
+    assert np.isclose(out['operating_profit'][0], calculate_detailed_metrics(**DEFAULT_INPUTS)[0]['operating_profit'])
+    assert np.isnan(out['operating_profit'][1])
@@ -0,0 +1,88 @@
+"""Libros Excel de escenarios: encabezados, filas rechazadas, filas vacías e ida y vuelta."""
+import numpy as np
+import openpyxl
+import pytest
+
+from mineria import DEFAULT_INPUTS, PARAM_NAMES, calculate_detailed_metrics, calculate_detailed_metrics_batch
+from mineria.excel_io import _to_float, export_scenario_book, import_scenario_book, read_scenario_book, write_template
+from mineria.model import PARAM_LABELS
+from mineria.store import ScenarioStore
+
+
+@pytest.fixture
+def store():
+    store = ScenarioStore(':memory:')
+    yield store
+    store.close()
+
+
+def _book(path, header, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Escenarios'
+    ws.append(header)
+    for row in rows: ws.append(row)
+    wb.save(path)
+    return path
+
+
+def test_header_aliases_and_defaults(tmp_path):
+    # Etiquetas de la barra lateral, claves en otro caso y 'Nombre'; lo que falta toma DEFAULT_INPUTS
+    header = ['Nombre', PARAM_LABELS['metal_price'], 'GRADE_PCT', 'columna ajena']
+    path = _book(tmp_path / 'a.xlsx', header, [['Alto', 5.0, 1.2, 'x'], [None, 4.0, 0.9, None]])
+    (info, chunk), = read_scenario_book(path)
+    assert info['missing'] == [name for name in PARAM_NAMES if name not in ('metal_price', 'grade_pct')]
+    assert chunk['name'] == ['Alto', 'Importado 3']
+    np.testing.assert_array_equal(chunk['metal_price'], [5.0, 4.0])
+    np.testing.assert_array_equal(chunk['grade_pct'], [1.2, 0.9])
+    np.testing.assert_array_equal(chunk['truck_count'], DEFAULT_INPUTS['truck_count'])
+
+
+def test_header_without_inputs_raises(tmp_path):
+    with pytest.raises(ValueError, match="encabezado"):
+        list(read_scenario_book(_book(tmp_path / 'b.xlsx', ['foo', 'bar'], [[1, 2]])))
+
+
+def test_blank_rows_are_skipped_and_row_numbers_kept(tmp_path, store):
+    header = ['name', 'metal_price', 'tonnes_blasted_period']
+    rows = [['A', 3.5, 480000], ['B', 3.6, 480000], ['C', 3.7, 480000], ['D', 3.8, 480000],
+            [None, None, None],  # fila 6 vacía
+            ['E', 3.9, 0],  # fila 7: error del modelo
+            [None, 4.0, 'abc'],  # fila 8: no numérico, sin nombre
+            ['G', True, 480000]]  # fila 9: booleano
+    path = _book(tmp_path / 'c.xlsx', header, rows)
+    summary = import_scenario_book(path, store, chunk_rows=3)  # varios bloques, el vacío en medio
+    assert summary['rows'] == 7 and summary['imported'] == 4 and summary['invalid'] == 3
+    rejected = {r['row']: r for r in summary['rejected']}
+    assert sorted(rejected) == [7, 8, 9]
+    assert rejected[7]['name'] == 'E' and 'Toneladas Voladas' in rejected[7]['errors'][0]
+    assert rejected[8]['name'] == 'Importado 8' and rejected[8]['errors'] == ["Valor vacío o no numérico en tonnes_blasted_period"]
+    assert rejected[9]['errors'] == ["Valor vacío o no numérico en metal_price"]
+    assert store.page(0, 10)['name'] == ['A', 'B', 'C', 'D']
+
+
+def test_bools_are_rejected_regardless_of_chunk():
+    assert np.isnan(_to_float([3.5, True])[1])
+    assert np.isnan(_to_float(['x', True])).all()
+    np.testing.assert_array_equal(_to_float([1, 2.5, '3']), [1.0, 2.5, 3.0])
+
+
+def test_export_import_roundtrip(tmp_path, store):
+    write_template(tmp_path / 'template.xlsx')
+    assert import_scenario_book(tmp_path / 'template.xlsx', store)['imported'] == 1
+    rng = np.random.default_rng(0)
+    # Excel guarda 15 dígitos significativos: inputs con pocos decimales, como los que se tipean
+    cols = {name: np.round(DEFAULT_INPUTS[name] * rng.uniform(0.8, 1.2, 25), 3) for name in PARAM_NAMES}
+    results, kpis, _e, _w = calculate_detailed_metrics_batch(cols)
+    store.append_columns([f"S{i}" for i in range(25)], cols, results, kpis)
+    assert export_scenario_book(store, tmp_path / 'out.xlsx', chunk_rows=7) == 26
+
+    again = ScenarioStore(':memory:')
+    summary = import_scenario_book(tmp_path / 'out.xlsx', again)  # las columnas de resultados se ignoran
+    assert summary['imported'] == 26 and summary['invalid'] == 0 and summary['missing'] == []
+    columns = ('name', 'input_hash', 'operating_profit')
+    original, copy = store.column_arrays(columns), again.column_arrays(columns)
+    assert list(copy['name']) == list(original['name']) and list(copy['input_hash']) == list(original['input_hash'])
+    np.testing.assert_array_equal(copy['operating_profit'], original['operating_profit'])
+    assert copy['operating_profit'][0] == calculate_detailed_metrics(**DEFAULT_INPUTS)[0]['operating_profit']
+    again.close()
@@ -0,0 +1,63 @@
+"""Dimensionamiento de flota (MILP) contra búsqueda exhaustiva, infactibilidad y re-solves en caliente."""
+import math
+
+import pytest
+
+pulp = pytest.importorskip('pulp')
+
+from mineria import DEFAULT_INPUTS, calculate_detailed_metrics  # noqa: E402
+from mineria.fleet_opt import FleetOptimizer  # noqa: E402
+
+UNIT_COSTS = {'truck_unit_cost': 20000.0, 'loader_unit_cost': 50000.0, 'plant_hour_cost': 0.0}
+
+
+def _brute_force(inputs, unit_costs=UNIT_COSTS, trucks=range(1, 61), loaders=range(1, 21)):
+    """(costo con posesión, camiones, cargadores) mínimo entre las flotas que cumplen los targets."""
+    p = dict(inputs)
+    moved = p['tonnes_mined_target'] * (1 + p['strip_ratio'])
+    p['plant_op_hours_period'] = math.ceil(p['plant_feed_target'] / p['plant_throughput_tph'])
+    best = None
+    for n in trucks:
+        if n * p['truck_op_hours_period'] * 60.0 / p['avg_cycle_time_min'] * p['truck_payload'] < moved: continue
+        for m in loaders:
+            if m * p['loader_op_hours_period'] * p['loader_rate_tph'] < moved: continue
+            results = calculate_detailed_metrics(**dict(p, truck_count=n, loader_count=m))[0]
+            cost = results['total_cost'] + unit_costs['truck_unit_cost'] * n + unit_costs['loader_unit_cost'] * m
+            if best is None or cost < best[0] - 1e-6: best = (cost, n, m)
+    return best
+
+
+def test_matches_brute_force():
+    out = FleetOptimizer().optimize(DEFAULT_INPUTS, **UNIT_COSTS)
+    cost, trucks, loaders = _brute_force(DEFAULT_INPUTS)
+    assert out['status'] == 'Optimal'
+    assert (out['truck_count'], out['loader_count']) == (trucks, loaders)
+    assert out['total_cost_with_ownership'] == pytest.approx(cost)
+    assert out['plant_op_hours_period'] * DEFAULT_INPUTS['plant_throughput_tph'] >= DEFAULT_INPUTS['plant_feed_target']
+    assert not out['warnings']
+
+
+def test_infeasible_targets():
+    # Con 100 h por camión, dos camiones mueven 40.000 t de las 480.000 del target
+    optimizer = FleetOptimizer(truck_range=(1, 2))
+    assert optimizer.optimize(dict(DEFAULT_INPUTS, truck_op_hours_period=100), **UNIT_COSTS)['status'] == 'Infeasible'
+    out = FleetOptimizer(plant_hours_max=100.0).optimize(DEFAULT_INPUTS, **UNIT_COSTS)
+    assert out['status'] == 'Infeasible' and 'truck_count' not in out
+
+
+def test_reuses_model_and_warm_starts_when_only_costs_change():
+    optimizer = FleetOptimizer()
+    first = optimizer.optimize(DEFAULT_INPUTS, **UNIT_COSTS)
+    assert first['rebuilt'] and not first['warm_start'] and optimizer.builds == optimizer.solves == 1
+    # Solo precios: mismo óptimo, sin re-resolver
+    same = optimizer.optimize(dict(DEFAULT_INPUTS, metal_price=5.0), **UNIT_COSTS)
+    assert not same['rebuilt'] and optimizer.solves == 1 and same['truck_count'] == first['truck_count']
+    # Solo costos: mismo MILP, nuevo objetivo y arranque en caliente
+    inputs = dict(DEFAULT_INPUTS, cost_haul_per_hr=900.0)
+    costs = dict(UNIT_COSTS, truck_unit_cost=1000.0)
+    warm = optimizer.optimize(inputs, **costs)
+    assert not warm['rebuilt'] and warm['warm_start'] and optimizer.builds == 1 and optimizer.solves == 2
+    assert (warm['truck_count'], warm['loader_count']) == _brute_force(inputs, costs)[1:]
+    # Un target distinto reconstruye
+    assert optimizer.optimize(dict(DEFAULT_INPUTS, tonnes_mined_target=150000), **UNIT_COSTS)['rebuilt']
+    assert optimizer.builds == 2
@@ -0,0 +1,75 @@
+"""Búsqueda de objetivo en lote: residuos, cobertura contra una grilla densa y errores."""
+import numpy as np
+import pytest
+
+from mineria import DEFAULT_INPUTS, PARAM_NAMES, calculate_detailed_metrics_batch
+from mineria.goal_seek import OUTPUTS, _output, goal_seek
+
+TARGETS = {'operating_profit': 0.0, 'cost_per_tonne_processed': 50.0, 'margin_pct': 20.0}
+N = 30
+GRID = np.geomspace(1e-3, 1e3, 2001)  # múltiplos del valor actual
+
+
+@pytest.fixture(scope='module')
+def cols():
+    rng = np.random.default_rng(0)
+    base = dict(DEFAULT_INPUTS, metal_price=6000.0)  # con margen positivo: hay raíces que buscar
+    return {name: base[name] * rng.uniform(0.5, 1.5, N) for name in PARAM_NAMES}
+
+
+def _grid_has_root(cols, variable, output, target):
+    """Por fila: ¿la salida cruza el objetivo en la grilla densa (entre puntos válidos)?"""
+    rows = np.repeat(np.arange(N), len(GRID))
+    dense = {name: values[rows] for name, values in cols.items()}
+    dense[variable] = cols[variable][rows] * np.tile(GRID, N)
+    y = (_output(calculate_detailed_metrics_batch(dense)[0], output) - target).reshape(N, len(GRID))
+    valid = np.isfinite(y)
+    crossing = valid[:, 1:] & valid[:, :-1] & (np.signbit(y[:, 1:]) != np.signbit(y[:, :-1]))
+    return crossing.any(axis=1) | (y == 0).any(axis=1)
+
+
+@pytest.mark.parametrize('output', OUTPUTS)
+@pytest.mark.parametrize('variable', PARAM_NAMES)
+def test_solutions_hit_target_and_none_are_missed(cols, variable, output):
+    target = TARGETS[output]
+    res = goal_seek(cols, variable, target, output)
+    ok = res['converged']
+    np.testing.assert_array_equal(np.isnan(res['solution']), ~ok)
+    np.testing.assert_array_equal(res['base'], cols[variable])
+    # Las soluciones se verifican con el modelo, dentro de la tolerancia relativa
+    solved = dict(cols, **{variable: np.where(ok, res['solution'], cols[variable])})
+    results = calculate_detailed_metrics_batch(solved)[0]
+    error = _output(results, output) - target
+    scale = {'operating_profit': np.abs(results['revenue']) + np.abs(results['total_cost']),
+             'cost_per_tonne_processed': np.abs(results['cost_per_tonne_processed']), 'margin_pct': np.full(N, 100.0)}[output]
+    assert np.all(np.abs(error[ok]) <= 1e-8 * (scale[ok] + abs(target)))
+    assert np.all(res['solution'][ok] > 0)
+    # Donde la grilla densa encuentra un cruce, goal_seek también encuentra una raíz
+    missed = _grid_has_root(cols, variable, output, target) & ~ok
+    assert not missed.any(), f"sin solución en filas {np.nonzero(missed)[0]}"
+
+
+def test_per_row_targets_and_bounds():
+    cols = {name: np.full(3, float(DEFAULT_INPUTS[name])) for name in PARAM_NAMES}
+    targets = np.array([0.0, 1e6, 2e6])
+    res = goal_seek(cols, 'metal_price', targets)
+    assert res['converged'].all()
+    profit = calculate_detailed_metrics_batch(dict(cols, metal_price=res['solution']))[0]['operating_profit']
+    np.testing.assert_allclose(profit, targets, atol=1e-3)
+    assert np.all(np.diff(res['solution']) > 0)  # más margen exige mejor precio
+    # Fuera de los límites no hay solución
+    bounded = goal_seek(cols, 'metal_price', targets, bounds=(0.0, res['solution'][:2].mean()))
+    assert bounded['converged'].tolist() == [True, False, False]
+    assert bounded['solution'][0] == pytest.approx(res['solution'][0]) and np.isnan(bounded['solution'][1:]).all()
+
+
+def test_unreachable_target():
+    res = goal_seek(DEFAULT_INPUTS, 'metal_price', -1e15)  # el margen con precio 0 es solo -costos
+    assert not res['converged'][0] and np.isnan(res['solution'][0])
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        goal_seek(DEFAULT_INPUTS, 'revenue', 0.0)
+    with pytest.raises(ValueError):
+        goal_seek(DEFAULT_INPUTS, 'metal_price', 0.0, output='revenue')
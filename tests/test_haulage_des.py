@@ -0,0 +1,47 @@
+"""Simulación de eventos discretos de acarreo: caso determinístico, colas y réplicas."""
+import pytest
+
+from mineria import DEFAULT_INPUTS
+from mineria.haulage_des import des_adjusted_inputs, des_params_from_inputs, run_replications, simulate_haulage
+
+
+@pytest.mark.parametrize('truck_count, sim_hours', [(10, 720.0), (10, 2.0), (40, 1.0)])
+def test_zero_variability_without_queues_returns_nominal_cycle(truck_count, sim_hours):
+    # Cargadores y puntos de descarga de sobra: sin colas, el ciclo es exactamente el del modelo
+    inputs = dict(DEFAULT_INPUTS, truck_count=truck_count, loader_count=truck_count)
+    params = des_params_from_inputs(inputs, cv=0.0, sim_hours=sim_hours, dump_points=truck_count)
+    out = simulate_haulage(**params)
+    assert out['effective_cycle_time_min'] == pytest.approx(DEFAULT_INPUTS['avg_cycle_time_min'], rel=1e-12)
+    assert out['nominal_cycle_time_min'] == pytest.approx(DEFAULT_INPUTS['avg_cycle_time_min'])
+    assert out['mean_loader_queue_min'] == 0.0 and out['mean_dump_queue_min'] == 0.0
+    if sim_hours >= 24:
+        per_truck_hr = 60.0 / DEFAULT_INPUTS['avg_cycle_time_min'] * DEFAULT_INPUTS['truck_payload']
+        assert out['actual_tonnes_per_truck_hr'] == pytest.approx(per_truck_hr, rel=1e-3)
+
+
+def test_loader_bottleneck_lengthens_cycle():
+    # 10 camiones x 12 min de carga cada 30 min necesitan 4 cargadores; con 3 la cola fija el ciclo en 40 min
+    params = des_params_from_inputs(DEFAULT_INPUTS, cv=0.0, dump_points=10)
+    out = simulate_haulage(**params)
+    assert out['effective_cycle_time_min'] == pytest.approx(40.0, rel=1e-3)
+    assert out['mean_loader_queue_min'] > 0 and out['loader_utilization'] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_replications_and_adjusted_inputs():
+    params = des_params_from_inputs(DEFAULT_INPUTS, cv=0.25, sim_hours=48.0)
+    a = run_replications(params, n_reps=4, seed=7, n_workers=1)
+    b = run_replications(params, n_reps=4, seed=7, n_workers=1)
+    assert a['summary'] == b['summary'] and len(a['replications']) == 4
+    cycle = a['summary']['effective_cycle_time_min']
+    assert cycle['mean'] > DEFAULT_INPUTS['avg_cycle_time_min'] and cycle['ci95'] > 0
+    adjusted = des_adjusted_inputs(DEFAULT_INPUTS, a['summary'])
+    assert adjusted['avg_cycle_time_min'] == cycle['mean']
+    assert {k: v for k, v in adjusted.items() if k != 'avg_cycle_time_min'} == \
+        {k: v for k, v in DEFAULT_INPUTS.items() if k != 'avg_cycle_time_min'}
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        des_params_from_inputs(dict(DEFAULT_INPUTS, avg_cycle_time_min=10.0))  # menor que la carga (12 min)
+    with pytest.raises(ValueError):
+        simulate_haulage(0, 1, 100, 5, 10, 2, 8)
@@ -0,0 +1,84 @@
+"""Cola de trabajos: reutilización por clave, dueños, cancelación y guardado de barridos."""
+import time
+
+import numpy as np
+import pytest
+
+from mineria import DEFAULT_INPUTS, calculate_detailed_metrics
+from mineria.jobs import JobRunner, job_key
+from mineria.store import ScenarioStore
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_workers=1)
+    yield runner
+    runner.shutdown()
+
+
+def _sweep(steps=5):
+    return {'base': dict(DEFAULT_INPUTS), 'axes': [('metal_price', 3.0, 4.0, steps)]}
+
+
+def _wait(runner, job_id, timeout=60.0):
+    deadline = time.time() + timeout
+    while runner.job(job_id).status == 'running':
+        assert time.time() < deadline, "el trabajo no terminó"
+        time.sleep(0.05)
+    return runner.job(job_id)
+
+
+def test_job_key_ignores_base_order():
+    spec = _sweep()
+    reordered = dict(spec, base=dict(reversed(list(DEFAULT_INPUTS.items()))))
+    assert job_key('sweep', spec) == job_key('sweep', reordered)
+    assert job_key('sweep', spec) != job_key('sweep', _sweep(steps=6))
+
+
+def test_duplicate_submission_reuses_job(runner):
+    first = runner.submit('sweep', _sweep(), owner='a')
+    assert runner.submit('sweep', _sweep(), owner='b') == first
+    job = _wait(runner, first)
+    assert job.status == 'done' and job.owners == {'a', 'b'}
+    assert runner.submit('sweep', _sweep(), owner='c') == first  # terminado: se reutiliza sin recalcular
+    assert [j.id for j in runner.jobs('c')] == [first] and runner.jobs('otra') == []
+    result = runner.result(first)
+    assert result['computed'].all()
+    expected = [calculate_detailed_metrics(**dict(DEFAULT_INPUTS, metal_price=x))[0]['operating_profit'] for x in np.linspace(3.0, 4.0, 5)]
+    np.testing.assert_allclose(result['columns']['operating_profit'], expected, rtol=1e-12)
+
+
+def test_cancel_waits_for_last_owner(runner):
+    spec = {'base': dict(DEFAULT_INPUTS), 'distributions': {'metal_price': ('normal', 3.5, 0.3)},
+            'n_draws': 3_000_000, 'chunk_size': 100_000}
+    job_id = runner.submit('montecarlo', spec, owner='a')
+    runner.submit('montecarlo', spec, owner='b')
+    assert not runner.cancel(job_id, owner='a')  # 'b' todavía lo usa
+    assert runner.job(job_id).status == 'running' and runner.jobs('a') == []
+    assert runner.cancel(job_id, owner='b')
+    job = runner.job(job_id)
+    assert job.status == 'cancelled' and job.state is None and runner.result(job_id) is None
+    # Cancelado: un nuevo envío vuelve a calcular
+    assert runner.submit('montecarlo', dict(spec, n_draws=200_000), owner='a') != job_id
+
+
+def test_save_sweep_to_store(runner):
+    store = ScenarioStore(':memory:')
+    job_id = runner.submit('sweep', _sweep(), owner='a', label='Precio')
+    with pytest.raises(ValueError):
+        runner.save_to_store('no-existe', store)
+    _wait(runner, job_id)
+    assert runner.save_to_store(job_id, store, owner='a') == 5
+    assert runner.save_to_store(job_id, store, owner='a') == 0  # una sola vez
+    page = store.page(0, 10)
+    assert page['name'][0] == 'Precio [Precio del Metal ($/unidad)=3]'
+    assert store.count({'owner': 'a'}) == 5
+    np.testing.assert_allclose(page['operating_profit'], runner.result(job_id)['columns']['operating_profit'])
+    store.close()
+
+
+def test_invalid_jobs_raise(runner):
+    with pytest.raises(ValueError):
+        runner.submit('otro', {})
+    with pytest.raises(ValueError):
+        runner.submit('sweep', {'base': dict(DEFAULT_INPUTS), 'axes': [('revenue', 0, 1, 3)]})
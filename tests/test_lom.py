@@ -0,0 +1,102 @@
+"""Vida de la mina: canchas de stock, VAN/TIR y recálculo incremental."""
+import numpy as np
+import pytest
+
+from mineria import DEFAULT_INPUTS, PARAM_NAMES, calculate_detailed_metrics
+from mineria.lom import LifeOfMine, irr, npv, stockpile
+
+
+def _stockpile_loop(initial, inflow, outflow):
+    stock, out, s = [], [], initial
+    for i, o in zip(inflow, outflow):
+        new = max(0.0, s + i - o)
+        out.append(s + i - new); stock.append(new); s = new
+    return np.array(stock), np.array(out)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_stockpile_matches_period_loop(seed):
+    rng = np.random.default_rng(seed)
+    inflow, outflow = rng.uniform(0, 100, 60), rng.uniform(0, 120, 60)
+    initial = float(rng.uniform(0, 50))
+    stock, out = stockpile(initial, inflow, outflow)
+    ref_stock, ref_out = _stockpile_loop(initial, inflow, outflow)
+    np.testing.assert_allclose(stock, ref_stock, atol=1e-9)
+    np.testing.assert_allclose(out, ref_out, atol=1e-9)
+    assert np.all(stock >= 0) and np.all(out <= outflow + 1e-9)
+
+
+def test_npv_and_irr():
+    flows = [-1000.0, 300.0, 400.0, 500.0]
+    assert npv(flows, 0.0) == pytest.approx(200.0)
+    assert npv([110.0], 0.1) == pytest.approx(100.0)
+    rate = irr(flows)
+    assert npv(flows, rate) == pytest.approx(0.0, abs=1e-6)
+    assert np.isnan(irr([100.0, 200.0]))  # sin cambio de signo
+    assert np.isnan(irr([-100.0, np.nan]))
+
+
+def test_single_period_without_stockpiles_matches_model():
+    lom = LifeOfMine(DEFAULT_INPUTS, 3)  # por defecto lo volado coincide con lo movido
+    out = lom.evaluate()
+    results = calculate_detailed_metrics(**DEFAULT_INPUTS)[0]
+    np.testing.assert_allclose(out['operating_profit'], results['operating_profit'], rtol=1e-12)
+    np.testing.assert_allclose(out['broken_stock'], 0.0)
+    np.testing.assert_allclose(out['cash_flow'], results['operating_profit'], rtol=1e-12)
+
+
+def test_stockpiles_carry_material_between_periods():
+    lom = LifeOfMine(DEFAULT_INPUTS, 4)
+    moved = DEFAULT_INPUTS['tonnes_mined_target'] * (1 + DEFAULT_INPUTS['strip_ratio'])
+    lom.set_period(0, tonnes_blasted_period=moved * 1.5)  # voladura adelantada
+    lom.set_period(1, tonnes_blasted_period=0.0)  # periodo sin voladura: se mueve desde la cancha
+    out = lom.evaluate()
+    assert out['broken_stock'][0] == pytest.approx(moved * 0.5)
+    assert out['moved'][1] == pytest.approx(moved * 0.5) and out['moved_shortfall'][1] == pytest.approx(moved * 0.5)
+    assert lom.error_mask[1] == 0
+    assert out['broken_stock'][1] == pytest.approx(0.0)
+
+
+def test_incremental_evaluate_matches_full_recompute():
+    rng = np.random.default_rng(1)
+    lom = LifeOfMine(DEFAULT_INPUTS, 24, initial_ore_stock=50_000)
+    lom.update_columns({'grade_pct': rng.uniform(0.6, 1.4, 24), 'tonnes_blasted_period': rng.uniform(3e5, 6e5, 24)})
+    lom.evaluate()
+    lom.set_period(10, plant_feed_target=140_000, metal_price=4.0)
+    lom.set_column('capex', [1e6, 2e6], start=15)
+    out = lom.evaluate()
+    assert lom.last_recomputed == (10, 24)
+    fresh = LifeOfMine(DEFAULT_INPUTS, 24, initial_ore_stock=50_000)
+    fresh.update_columns({name: values for name, values in lom.schedule.items()})
+    ref = fresh.evaluate()
+    for key in ref: np.testing.assert_allclose(out[key], ref[key], rtol=1e-12, atol=1e-6, err_msg=key)
+    np.testing.assert_array_equal(lom.warning_mask, fresh.warning_mask)
+    lom.evaluate()
+    assert lom.last_recomputed is None  # nada sucio
+    lom.set_period(5, grade_pct=lom.schedule['grade_pct'][5])  # mismo valor: no marca sucio
+    lom.evaluate()
+    assert lom.last_recomputed is None
+
+
+def test_financials():
+    lom = LifeOfMine(dict(DEFAULT_INPUTS, metal_price=8000.0), 36)
+    lom.set_period(0, capex=5e7)  # se recupera en el periodo 21
+    fin = lom.financials(discount_rate_pct=10.0, periods_per_year=12)
+    cash_flow = lom.outputs['cash_flow']
+    assert fin['npv'] == pytest.approx(npv(cash_flow, 1.1 ** (1 / 12) - 1))
+    monthly = (1 + fin['irr_pct'] / 100) ** (1 / 12) - 1
+    assert abs(npv(cash_flow, monthly)) < 1e-6 * 5e7  # relativo a la inversión
+    cumulative = np.cumsum(cash_flow)
+    assert fin['payback_period'] == 21 and cumulative[20] >= 0 > cumulative[19]
+
+
+def test_invalid_plan():
+    with pytest.raises(ValueError):
+        LifeOfMine(DEFAULT_INPUTS, 0)
+    with pytest.raises(ValueError):
+        LifeOfMine(DEFAULT_INPUTS, 3).set_column('revenue', [1.0])
+    lom = LifeOfMine(DEFAULT_INPUTS, 3)
+    lom.set_period(1, exchange_rate=0.0)
+    out = lom.evaluate()
+    assert lom.error_mask[1] != 0 and np.isnan(out['operating_profit'][1]) and np.isfinite(out['operating_profit'][2])
+    assert set(PARAM_NAMES) <= set(lom.schedule)
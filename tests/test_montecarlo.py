@@ -0,0 +1,75 @@
+"""Sketch de cuantiles y simulación Monte Carlo por bloques."""
+import numpy as np
+import pytest
+
+from mineria import DEFAULT_INPUTS
+from mineria.montecarlo import QuantileSketch, _validate, run_monte_carlo, sample_inputs
+
+
+def test_sketch_exact_below_capacity():
+    values = np.random.default_rng(0).normal(size=1000)
+    sketch = QuantileSketch(k=4096, seed=0)
+    sketch.update(values)
+    assert sketch.count == 1000
+    assert sketch.quantile(0.5) == np.sort(values)[499]
+
+
+def test_sketch_rank_error_and_merge():
+    rng = np.random.default_rng(1)
+    parts = [rng.lognormal(size=200_000) for _ in range(5)]
+    merged = QuantileSketch(k=2048, seed=1)
+    for part in parts:
+        sketch = QuantileSketch(k=2048, seed=2)
+        sketch.update(part)
+        merged.merge(sketch)
+    values = np.sort(np.concatenate(parts))
+    assert merged.count == len(values)
+    q = np.array([0.01, 0.1, 0.5, 0.9, 0.99])
+    # Error de rango del cuantil aproximado
+    ranks = np.searchsorted(values, merged.quantile(q)) / len(values)
+    assert np.max(np.abs(ranks - q)) < 0.01
+
+
+def test_sketch_ignores_nan_and_empty():
+    sketch = QuantileSketch(k=64)
+    assert np.isnan(sketch.quantile(0.5))
+    sketch.update([np.nan, 1.0, 2.0, np.nan, 3.0])
+    assert sketch.count == 3 and sketch.quantile(0.5) == 2.0
+
+
+def test_correlated_sampling():
+    dists = {'metal_price': ('normal', 3.5, 0.3), 'exchange_rate': ('uniform', 0.9, 1.1)}
+    names, chol = _validate(dists, {('metal_price', 'exchange_rate'): 0.8})
+    sample = sample_inputs(dists, 200_000, np.random.default_rng(0), names, chol)
+    assert np.corrcoef(sample['metal_price'], sample['exchange_rate'])[0, 1] > 0.7
+    assert sample['exchange_rate'].min() >= 0.9 and sample['exchange_rate'].max() <= 1.1
+
+
+def test_run_monte_carlo_reproducible():
+    dists = {'metal_price': ('triangular', 3.0, 3.5, 4.0), 'grade_pct': ('normal', 1.0, 0.1)}
+    a = run_monte_carlo(DEFAULT_INPUTS, dists, n_draws=50_000, chunk_size=20_000, seed=3, n_workers=1)
+    b = run_monte_carlo(DEFAULT_INPUTS, dists, n_draws=50_000, chunk_size=20_000, seed=3, n_workers=1)
+    assert a['p50_operating_profit'] == b['p50_operating_profit']
+    assert a['n_draws'] == 50_000 and a['n_valid'] + a['n_invalid'] == 50_000
+    assert a['hist_counts'].sum() + a['hist_underflow'] + a['hist_overflow'] == a['n_valid']
+    assert a['p10_operating_profit'] <= a['p50_operating_profit'] <= a['p90_operating_profit']
+
+
+def test_run_monte_carlo_pool_matches_single_process():
+    # Los bloques se siembran por índice: el pool (forkserver/spawn) da lo mismo que un solo proceso
+    dists = {'metal_price': ('lognormal', np.log(3.5), 0.1)}
+    a = run_monte_carlo(DEFAULT_INPUTS, dists, n_draws=40_000, chunk_size=10_000, seed=5, n_workers=1, hist_range=(0, 100))
+    b = run_monte_carlo(DEFAULT_INPUTS, dists, n_draws=40_000, chunk_size=10_000, seed=5, n_workers=2, hist_range=(0, 100))
+    assert a['p50_operating_profit'] == b['p50_operating_profit']
+    np.testing.assert_array_equal(a['hist_counts'], b['hist_counts'])
+
+
+@pytest.mark.parametrize('distributions, correlations', [
+    ({'metal_price': ('cauchy', 0.0, 1.0)}, None),
+    ({'not_a_param': ('normal', 0.0, 1.0)}, None),
+    ({'metal_price': ('normal', 3.5, 0.3), 'grade_pct': ('normal', 1.0, 0.1)}, {('metal_price', 'exchange_rate'): 0.5}),
+    ({'metal_price': ('normal', 3.5, 0.3), 'grade_pct': ('normal', 1.0, 0.1)}, {('metal_price', 'grade_pct'): 1.5}),
+])
+def test_invalid_specs_raise(distributions, correlations):
+    with pytest.raises(ValueError):
+        run_monte_carlo(DEFAULT_INPUTS, distributions, n_draws=100, correlations=correlations, n_workers=1)
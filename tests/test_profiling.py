@@ -0,0 +1,25 @@
+"""Perfilador de re-ejecuciones: aciertos/fallos de caché por re-ejecución."""
+from mineria import DEFAULT_INPUTS
+from mineria.cache import CachedModel
+from mineria.profiling import RerunProfiler, cache_delta
+
+
+def test_cache_counts_are_per_rerun():
+    model = CachedModel(maxsize=8)
+    model.evaluate(DEFAULT_INPUTS)
+    first = model.stats()
+    record = RerunProfiler(enabled=True, log_path='').finish(run=1, cache_stats=first)
+    assert record['cache_misses'] >= 1
+    for _ in range(3): model.evaluate(DEFAULT_INPUTS)
+    second = model.stats()
+    record = RerunProfiler(enabled=True, log_path='').finish(run=2, cache_stats=second, previous_cache_stats=first)
+    assert record['cache_hits'] == 3 and record['cache_misses'] == 0
+    assert record['cache'] == second  # el detalle por caché sigue siendo acumulado
+
+
+def test_cache_delta_restarts_on_new_cache():
+    previous = {'results': {'hits': 10, 'misses': 4, 'size': 4}}
+    assert cache_delta({'results': {'hits': 2, 'misses': 1, 'size': 1}}, previous) == {'results': {'hits': 2, 'misses': 1}}
+    assert cache_delta({'results': {'hits': 12, 'misses': 4, 'size': 4}, 'figures': {'hits': 1, 'misses': 0, 'size': 0}}, previous) == \
+        {'results': {'hits': 2, 'misses': 0}, 'figures': {'hits': 1, 'misses': 0}}
+    assert RerunProfiler().finish(cache_stats=previous) is None
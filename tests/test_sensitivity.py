@@ -0,0 +1,65 @@
+"""Derivadas analíticas de sensitivities() contra diferencias finitas, y tornado/spider contra el modelo."""
+import numpy as np
+import pytest
+
+from mineria import DEFAULT_INPUTS, PARAM_NAMES, calculate_detailed_metrics, calculate_detailed_metrics_batch
+from mineria.sensitivity import OUTPUTS, sensitivities, spider, tornado
+
+
+def _scenarios():
+    """Valores por defecto y escenarios aleatorios (con recortes libres y activos)."""
+    rng = np.random.default_rng(0)
+    yield dict(DEFAULT_INPUTS)
+    for _ in range(20):
+        yield {name: DEFAULT_INPUTS[name] * rng.uniform(0.5, 1.5) for name in PARAM_NAMES}
+
+
+@pytest.mark.parametrize('inputs', list(_scenarios()))
+def test_derivatives_match_finite_differences(inputs):
+    table, info = sensitivities(inputs)
+    h = 1e-6
+    rows = []
+    for name in PARAM_NAMES:
+        for step in (1 + h, 1 - h):
+            rows.append({**inputs, name: inputs[name] * step})
+    results = calculate_detailed_metrics_batch({name: np.array([r[name] for r in rows]) for name in PARAM_NAMES})[0]
+    for output in OUTPUTS:
+        values = results[output].reshape(len(PARAM_NAMES), 2)
+        base = info[output]
+        for i, name in enumerate(PARAM_NAMES):
+            dx = inputs[name] * h
+            forward, backward = (values[i, 0] - base) / dx, (base - values[i, 1]) / dx
+            scale = abs(base) / abs(inputs[name]) + abs(forward) + abs(backward)
+            if abs(forward - backward) > 1e-4 * scale: continue  # el paso cruza un quiebre
+            assert table[name]['d_' + output] == pytest.approx(0.5 * (forward + backward), abs=1e-5 * scale), (output, name)
+
+
+def test_base_values_and_elasticities():
+    table, info = sensitivities(DEFAULT_INPUTS)
+    results = calculate_detailed_metrics(**DEFAULT_INPUTS)[0]
+    assert info['operating_profit'] == pytest.approx(results['operating_profit'], rel=1e-12)
+    assert info['cost_per_tonne_processed'] == pytest.approx(results['cost_per_tonne_processed'], rel=1e-12)
+    row = table['metal_price']
+    assert row['e_operating_profit'] == pytest.approx(row['d_operating_profit'] * DEFAULT_INPUTS['metal_price'] / info['operating_profit'])
+    assert set(info['regions']) == {'loading', 'hauling', 'processing'}
+
+
+def test_invalid_inputs_raise():
+    with pytest.raises(ValueError):
+        sensitivities(dict(DEFAULT_INPUTS, tonnes_blasted_period=0))
+    with pytest.raises(ValueError):
+        sensitivities(dict(DEFAULT_INPUTS, exchange_rate=0))
+
+
+def test_tornado_and_spider_match_model():
+    rows = tornado(DEFAULT_INPUTS, pct=10.0)
+    assert [r['swing'] for r in rows] == sorted((r['swing'] for r in rows), reverse=True)
+    for r in rows[:5]:
+        low = calculate_detailed_metrics(**dict(DEFAULT_INPUTS, **{r['name']: DEFAULT_INPUTS[r['name']] * 0.9}))[0]
+        assert r['low'] == pytest.approx(low['operating_profit'], rel=1e-12)
+    pcts, values = spider(DEFAULT_INPUTS, ['metal_price', 'grade_pct'], pct_range=20.0, steps=5, output='cost_per_tonne_processed')
+    assert pcts.tolist() == [-20.0, -10.0, 0.0, 10.0, 20.0]
+    base = calculate_detailed_metrics(**DEFAULT_INPUTS)[0]['cost_per_tonne_processed']
+    assert values['metal_price'][2] == pytest.approx(base, rel=1e-12)
+    with pytest.raises(ValueError):
+        tornado(DEFAULT_INPUTS, output='revenue')
@@ -0,0 +1,118 @@
+"""Almacén SQLite de escenarios: anexado, lectura por páginas/columnas, filtros, hash y limpieza."""
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+
+from mineria import DEFAULT_INPUTS, PARAM_NAMES, calculate_detailed_metrics, calculate_detailed_metrics_batch
+from mineria.model import inputs_hash
+from mineria.store import _VALUE_COLUMNS, ScenarioStore, scenario_record
+
+
+@pytest.fixture
+def store():
+    store = ScenarioStore(':memory:')
+    yield store
+    store.close()
+
+
+def _fill(store, n, owner=None, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = {name: DEFAULT_INPUTS[name] * rng.uniform(0.8, 1.2, n) for name in PARAM_NAMES}
+    results, kpis, _e, _w = calculate_detailed_metrics_batch(cols)
+    return store.append_columns([f"Escenario {i}" for i in range(n)], cols, results, kpis, owner=owner), cols
+
+
+def test_append_record_roundtrip(store):
+    results, kpis, _e, _w = calculate_detailed_metrics(**DEFAULT_INPUTS)
+    scenario_id = store.append(scenario_record("Base", DEFAULT_INPUTS, results, kpis))
+    page = store.page(0, 10)
+    assert page['id'] == [scenario_id] and page['name'] == ["Base"]
+    assert page['operating_profit'] == [results['operating_profit']]
+    assert page['input_hash'] == [inputs_hash(DEFAULT_INPUTS)]
+    assert store.find_by_hash(inputs_hash(DEFAULT_INPUTS)) == [scenario_id]
+    assert store.find_by_name("Base") == [scenario_id]
+
+
+def test_append_columns_matches_record_hash(store):
+    ids, cols = _fill(store, 5)
+    hashes = store.column_arrays(('input_hash',))['input_hash']
+    assert len(ids) == 5
+    assert hashes[2] == inputs_hash({name: cols[name][2] for name in PARAM_NAMES})
+
+
+def test_page_order_filters_and_chunks(store):
+    _fill(store, 120)
+    profit = store.column_arrays(('operating_profit',))['operating_profit']
+    top = store.page(0, 10, order_by='operating_profit', descending=True)
+    assert top['operating_profit'] == sorted(profit, reverse=True)[:10]
+    low = float(np.median(profit))
+    assert store.count({'operating_profit': (low, None)}) == int((profit >= low).sum())
+    assert store.count({'name': 'Escenario 1'}) == 1 + 10 + 20  # 1, 10-19, 100-119
+    assert store.count({'name': '%'}) == 0  # comodines escapados
+    chunks = list(store.iter_chunks(('id',), chunk_rows=50))
+    assert [len(c['id']) for c in chunks] == [50, 50, 20]
+    with pytest.raises(ValueError):
+        store.page(order_by='no_such_column')
+
+
+def test_set_hash_tracks_contents(store):
+    empty = store.set_hash()
+    _fill(store, 3, owner='a')
+    after_a = store.set_hash()
+    assert after_a != empty
+    # Mismo contenido en otro almacén -> mismo hash
+    other = ScenarioStore(':memory:')
+    _fill(other, 3, owner='b')
+    assert other.set_hash() == after_a
+    other.close()
+
+
+def test_clear_is_scoped_to_owner(store):
+    _fill(store, 3, owner='a')
+    hash_a = store.set_hash()
+    _fill(store, 4, owner='b', seed=1)
+    assert store.count({'owner': 'b'}) == 4
+    assert store.clear(owner='b') == 4
+    assert store.count() == 3 and store.count({'owner': 'a'}) == 3
+    assert store.set_hash() == hash_a  # el hash se rehace con lo que queda
+    assert store.clear(owner='nobody') == 0
+    assert store.clear() == 3 and store.count() == 0
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    path = str(tmp_path / 'legacy.sqlite')
+    conn = sqlite3.connect(path)
+    value_cols = ', '.join(f'"{c}" REAL' for c in _VALUE_COLUMNS)
+    conn.execute(f"CREATE TABLE scenarios (id INTEGER PRIMARY KEY, name TEXT, input_hash TEXT, created_at REAL, {value_cols})")
+    conn.execute("INSERT INTO scenarios (name, input_hash, created_at) VALUES ('Viejo', 'abc', 0)")
+    conn.commit(); conn.close()
+    store = ScenarioStore(path)
+    assert store.page(0, 10, columns=('name', 'owner')) == {'name': ['Viejo'], 'owner': [None]}
+    _fill(store, 2, owner='a')
+    assert store.clear(owner='a') == 2 and store.count() == 1
+    store.close()
+
+
+def test_concurrent_writers_get_their_own_ids(tmp_path):
+    # Dos conexiones (como dos procesos de la app) anexando a la vez sobre el mismo archivo
+    path = str(tmp_path / 'shared.sqlite')
+    stores = [ScenarioStore(path), ScenarioStore(path)]
+    results, kpis, _e, _w = calculate_detailed_metrics(**DEFAULT_INPUTS)
+    returned = {0: [], 1: []}
+
+    def writer(k):
+        for i in range(40):
+            records = [scenario_record(f"w{k}-{i}-{j}", DEFAULT_INPUTS, results, kpis) for j in range(3)]
+            returned[k].append((records, stores[k].append_many(records, owner=str(k))))
+
+    threads = [threading.Thread(target=writer, args=(k,)) for k in (0, 1)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    page = stores[0].page(0, 1000, columns=('id', 'name'))
+    names = dict(zip(page['id'], page['name']))
+    assert len(names) == 240
+    for records, ids in returned[0] + returned[1]:
+        assert [names[i] for i in ids] == [rec['name'] for rec in records]
+    for store in stores: store.close()